@@ -1,14 +1,40 @@
+import os
+
 from flask import Flask
 from flask_bootstrap import Bootstrap5
+from jinja2 import FileSystemBytecodeCache
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     app.config.from_object("config.Config")
+    if test_config:
+        app.config.update(test_config)
     
     bootstrap = Bootstrap5(app)
+
+    # Compiled templates are shared on disk, so a new worker skips the Jinja compile step
+    if app.config['TEMPLATE_CACHE_DIR']:
+        os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
     
     # Import and register routes
     from routes import register_routes
     register_routes(app)
+
+    # Fingerprinted static assets at /assets/ and the static_url() template global
+    from static_assets import init_static_assets
+    init_static_assets(app)
+
+    # Request timing, /metrics and the debug profiler
+    from metrics import init_metrics
+    init_metrics(app)
+
+    # Rate limits and load shedding, after the metrics hooks so rejections are counted
+    from admission import init_admission
+    init_admission(app)
+
+    if app.config['PRECOMPILE_TEMPLATES']:
+        for name in app.jinja_loader.list_templates():
+            app.jinja_env.get_template(name)
     
     return app
\ No newline at end of file
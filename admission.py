@@ -0,0 +1,199 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import flash, g, jsonify, make_response, redirect, render_template, request
+
+
+class TokenBucket:
+    """`rate` tokens a second, holding at most `burst`."""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available; 0 when one is now."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """A global token bucket plus one per client; a request needs a token from both.
+
+    Either limit may be left out. Client buckets are kept for the
+    `max_clients` most recently seen clients, so a client that is evicted
+    comes back with a full bucket.
+    """
+
+    def __init__(self, rate=None, burst=None, client_rate=None, client_burst=None, max_clients=10000):
+        now = time.monotonic()
+        self.client_rate = client_rate
+        self.client_burst = client_burst or client_rate
+        self.max_clients = max_clients
+        self.rejected = 0
+        self._global = TokenBucket(rate, burst or rate, now) if rate else None
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def admit(self, client):
+        """Take a token for `client`: 0 if admitted, else the seconds until a retry can succeed."""
+        now = time.monotonic()
+        with self._lock:
+            buckets = []
+            if self._global is not None:
+                buckets.append(self._global)
+            if self.client_rate:
+                bucket = self._clients.get(client)
+                if bucket is None:
+                    bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst, now)
+                    if len(self._clients) > self.max_clients:
+                        self._clients.popitem(last=False)
+                else:
+                    self._clients.move_to_end(client)
+                buckets.append(bucket)
+            # Only take tokens once every bucket has one, so a rejected
+            # request costs nothing
+            wait = max((bucket.wait_time(now) for bucket in buckets), default=0.0)
+            if wait:
+                self.rejected += 1
+                return wait
+            for bucket in buckets:
+                bucket.tokens -= 1
+            return 0.0
+
+
+class LoadShedder:
+    """Caps the requests being handled at once at `limit`.
+
+    A request over the cap waits for a slot, but only for `target_delay`
+    seconds; one that waits that long is rejected. After a rejection the
+    queue is taken to be standing, and for the next `interval` seconds
+    requests that find no free slot are rejected at once instead of
+    queueing, so overload is shed early and the requests that do get in
+    see bounded queueing delay.
+    """
+
+    def __init__(self, limit, target_delay, interval=1.0):
+        self.limit = limit
+        self.target_delay = target_delay
+        self.interval = interval
+        self.shed = 0
+        self._active = 0
+        self._waiting = 0
+        self._shed_until = 0.0
+        self._slots = threading.Condition()
+
+    def acquire(self):
+        """Take a slot; False when the request should be shed. Pair a True with release()."""
+        with self._slots:
+            if self._active < self.limit and not self._waiting:
+                self._active += 1
+                return True
+            now = time.monotonic()
+            if now < self._shed_until:
+                self.shed += 1
+                return False
+            deadline = now + self.target_delay
+            self._waiting += 1
+            try:
+                while self._active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        self._shed_until = time.monotonic() + self.interval
+                        return False
+                    self._slots.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+            return True
+
+    def release(self):
+        with self._slots:
+            self._active -= 1
+            self._slots.notify()
+
+    def stats(self):
+        with self._slots:
+            return {'active': self._active, 'waiting': self._waiting, 'shed': self.shed}
+
+
+class AdmissionControl:
+    """Per-endpoint rate limiters and the load shedder, checked before each request."""
+
+    def __init__(self, limiters, shedder=None, exempt=()):
+        # (endpoint, method) -> RateLimiter
+        self.limiters = limiters
+        self.shedder = shedder
+        self.exempt = frozenset(exempt)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from RATE_LIMITS ({endpoint: limits}) and the LOAD_SHEDDING_* settings."""
+        limiters = {}
+        for endpoint, limits in config['RATE_LIMITS'].items():
+            limits = dict(limits)
+            methods = limits.pop('methods', ('GET', 'POST'))
+            limiter = RateLimiter(max_clients=config['RATE_LIMIT_MAX_CLIENTS'], **limits)
+            for method in methods:
+                limiters[(endpoint, method)] = limiter
+        shedder = None
+        if config['LOAD_SHEDDING_MAX_CONCURRENCY']:
+            shedder = LoadShedder(config['LOAD_SHEDDING_MAX_CONCURRENCY'], config['LOAD_SHEDDING_TARGET_DELAY'],
+                                  config['LOAD_SHEDDING_INTERVAL'])
+        return cls(limiters, shedder, config['LOAD_SHEDDING_EXEMPT'])
+
+    def stats(self):
+        limiters = set(self.limiters.values())
+        stats = {'rate_limited': sum(limiter.rejected for limiter in limiters)}
+        if self.shedder is not None:
+            stats.update(self.shedder.stats())
+        return stats
+
+
+def _rejection(status, message, retry_after):
+    if request.method == 'POST' and request.mimetype in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        # A browser form: back to it with the message, rather than a JSON page
+        flash(message, 'error')
+        response = redirect(request.url)
+    elif request.accept_mimetypes.best_match(('application/json', 'text/html')) == 'text/html':
+        response = make_response(render_template("errors/busy.html", message=message), status)
+    else:
+        response = jsonify({'success': False, 'message': message})
+        response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def init_admission(app):
+    """Register rate limiting and load shedding. Call after init_metrics so
+    rejected requests are still counted."""
+    if not app.config['ADMISSION_CONTROL_ENABLED']:
+        return
+    admission = AdmissionControl.from_config(app.config)
+    app.extensions['admission'] = admission
+    shedder = admission.shedder
+
+    @app.before_request
+    def admit_request():
+        endpoint = request.endpoint
+        limiter = admission.limiters.get((endpoint, request.method))
+        if limiter is not None:
+            wait = limiter.admit(request.remote_addr)
+            if wait:
+                return _rejection(429, "Too many requests; try again later", wait)
+        if shedder is not None and endpoint not in admission.exempt:
+            if not shedder.acquire():
+                return _rejection(503, "The server is busy; try again shortly", shedder.interval)
+            g.admission_slot = True
+
+    @app.teardown_request
+    def release_slot(error=None):
+        if g.pop('admission_slot', False):
+            shedder.release()
@@ -0,0 +1,116 @@
+"""Course/location autocomplete: ranking against a brute-force reference, and latency.
+
+Run from the repository root:
+
+    python -m benchmarks.autocomplete --sessions 100000 --limit 10
+
+Builds SearchIndex over the synthetic courses and locations plus a small
+hand-made catalog where many short titles contain the query as a later
+word ('Big Data 0'...) and a longer one starts with it ('Data
+Structures and Algorithms'). Every query's results must equal a full scan
+ranking each value exact > prefix of the value > prefix of a later word >
+infix, shorter completions first. Queries are every prefix of the first
+word of each distinct value (up to --queries of them), so short and long
+ones are both timed. The script exits non-zero on any mismatch.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from benchmarks.route_latency import percentile
+from benchmarks.synthetic_data import generate
+from search_index import EXACT, INFIX, PREFIX, WORD_PREFIX, SearchIndex, _word_suffixes, normalize
+
+WORD_PREFIX_CATALOG = (
+    ['Intro to Data'] + [f"Big Data {number}" for number in range(12)] + ['Data Structures and Algorithms']
+)
+
+
+def reference_search(records, fields, query, limit):
+    """What SearchIndex.search should return, by scanning every record."""
+    query = normalize(query)
+    if not query:
+        return [record['id'] for record in records[:limit]]
+    ids_by_value = {}
+    for record in records:
+        for value in dict.fromkeys(normalize(record.get(field)) for field in fields):
+            if value:
+                ids_by_value.setdefault(value, []).append(record['id'])
+    ranked = []
+    for value in ids_by_value:
+        depths = [len(suffix) - len(query) for suffix in _word_suffixes(value) if suffix.startswith(query)]
+        if value == query:
+            ranked.append((EXACT, 0, value))
+        elif depths:
+            ranked.append((PREFIX if value.startswith(query) else WORD_PREFIX, min(depths), value))
+        elif len(query) >= 3 and query in value:
+            ranked.append((INFIX, value.index(query), value))
+    results = {}
+    for _, _, value in sorted(ranked):
+        for record_id in ids_by_value[value]:
+            results.setdefault(record_id, None)
+    return list(results)[:limit]
+
+
+def check(name, records, fields, queries, limit, problems):
+    index = SearchIndex(fields).begin_write()
+    for record in records:
+        index.add(record)
+    index.end_write()
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        found = [record['id'] for record in index.search(query, limit)]
+        timings.append((time.perf_counter() - started) * 1000)
+        expected = reference_search(records, fields, query, limit)
+        if found != expected:
+            problems.append(f"{name} {query!r}: got {found}, expected {expected}")
+    timings.sort()
+    return {
+        'records': len(records),
+        'queries': len(queries),
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+    }
+
+
+def prefixes(records, fields, count, rng):
+    words = sorted({normalize(record.get(field)).split(' ')[0] for record in records for field in fields} - {''})
+    queries = sorted({word[:length] for word in words for length in range(1, len(word) + 1)})
+    return rng.sample(queries, min(count, len(queries)))
+
+
+def run(sessions, limit, query_count, seed=0):
+    rng = random.Random(seed)
+    data = generate(sessions, seed=seed)
+    problems = []
+    catalog = [{'id': record_id, 'title': title} for record_id, title in enumerate(WORD_PREFIX_CATALOG, 1)]
+    report = {
+        'word_prefix_catalog': check('catalog', catalog, ('title',), ['d', 'da', 'data', 'data s', 'big', 'ata'],
+                                     5, problems),
+    }
+    for name, fields in (('courses', ('title', 'section', 'professor_name')), ('locations', ('address', 'room_number'))):
+        records = data[name]
+        report[name] = check(name, records, fields, prefixes(records, fields, query_count, rng), limit, problems)
+    report['problems'] = problems[:20]
+    report['problem_count'] = len(problems)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100000, help="synthetic data size (1 course per 10 sessions)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    report = run(args.sessions, args.limit, args.queries)
+    print(json.dumps(report, indent=2))
+    if report['problem_count']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
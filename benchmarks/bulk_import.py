@@ -0,0 +1,96 @@
+"""Bulk import time for /api/courses/bulk and /api/locations/bulk.
+
+Run from the repository root:
+
+    python -m benchmarks.bulk_import --rows 50000 --format ndjson --persist
+
+Each run posts one body of `--rows` records to a fresh app through the
+Flask test client. A small share of the rows are invalid or duplicate an
+earlier row, so the report covers every outcome an import can have.
+"""
+import argparse
+import json
+import random
+import time
+
+from __init__ import create_app
+from benchmarks.route_latency import peak_rss_mb
+
+
+def course_rows(count, rng):
+    rows = []
+    for index in range(count):
+        rows.append({
+            'title': f"Imported Course {index // 6}",
+            'section': "ABCDEF"[index % 6],
+            'year': 2024 + index % 3,
+            'term': 1 + index % 3,
+            'professor_name': f"Prof. {rng.choice(['Smith', 'Lee', 'Garcia', 'Chen'])}",
+        })
+    return rows
+
+
+def location_rows(count, rng):
+    return [
+        {'address': f"{100 + index // 50} {rng.choice(['Main', 'Oak', 'College'])} St", 'room_number': str(index % 50)}
+        for index in range(count)
+    ]
+
+
+def spoil(rows, rng, share=0.02):
+    """Turn `share` of the rows into invalid rows and as many into duplicates."""
+    spoiled = list(rows)
+    for _ in range(int(len(rows) * share)):
+        spoiled[rng.randrange(len(spoiled))] = {'title': '', 'address': ''}
+        spoiled[rng.randrange(len(spoiled))] = dict(rows[rng.randrange(len(rows))])
+    return spoiled
+
+
+def encode(rows, body_format):
+    if body_format == 'json':
+        return json.dumps(rows).encode('utf-8'), 'application/json'
+    return "\n".join(json.dumps(row) for row in rows).encode('utf-8'), 'application/x-ndjson'
+
+
+def run(rows, body_format, persist, seed=0):
+    results = []
+    for kind, make_rows in (('courses', course_rows), ('locations', location_rows)):
+        rng = random.Random(seed)
+        body, content_type = encode(spoil(make_rows(rows, rng), rng), body_format)
+        app = create_app({
+            'PERSISTENCE_ENABLED': persist,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'REMINDERS_ENABLED': False,
+        })
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(f"/api/{kind}/bulk?report=errors", data=body, content_type=content_type)
+        elapsed = time.perf_counter() - started
+        report = response.get_json()
+        results.append({
+            'kind': kind,
+            'format': body_format,
+            'rows': rows,
+            'body_mb': round(len(body) / (1024 * 1024), 2),
+            'status': response.status_code,
+            'created': report.get('created'),
+            'failed': report.get('failed'),
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(rows / elapsed),
+            'peak_rss_mb': peak_rss_mb(),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--format", choices=('ndjson', 'json'), default='ndjson')
+    parser.add_argument("--persist", action="store_true", help="write through to an in-memory SQLite database")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.format, args.persist, seed=args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
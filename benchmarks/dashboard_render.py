@@ -0,0 +1,138 @@
+"""Dashboard card rendering: per-card template joins vs. batched view-models.
+
+Run from the repository root:
+
+    python -m benchmarks.dashboard_render --sizes 1000 10000
+"""
+import argparse
+import json
+import random
+import time
+
+from flask import render_template, render_template_string
+
+from __init__ import create_app
+from store import DataStore
+from view_models import build_session_views
+
+# The card partial as it was before view-models: every card searched the
+# full course, location and tag lists inside Jinja.
+LEGACY_CARD_LIST = """
+{% for session in sessions %}
+{% set course = courses|selectattr("id", "equalto", session.course_id)|first if session.course_id else None %}
+{% set location = locations|selectattr("id", "equalto", session.location_id)|first if session.location_id else None %}
+{% set tag_ids = session.tag_ids if session.tag_ids is defined and session.tag_ids is not none else [] %}
+{% set tag_ns = namespace(items=[]) %}
+{% if tags is defined and tag_ids %}
+    {% for tag in tags %}
+        {% if tag.id in tag_ids %}
+            {% set tag_ns.items = tag_ns.items + [tag.tag_name] %}
+        {% endif %}
+    {% endfor %}
+{% endif %}
+<div class="session_card {{ 'chill' if session.title.startswith('😎') else 'moderate' if session.title.startswith('🤓') else 'intense' if session.title.startswith('😤') else '' }}"
+     data-session-id="{{ session.id }}"
+     data-course-name="{{ course.title if course else '' }}"
+     data-location-address="{{ location.address if location else '' }}"
+     data-course-year="{{ course.year if course else '' }}"
+     data-course-term="{{ course.term if course else '' }}"
+     data-professor-name="{{ course.professor_name if course else '' }}"
+     data-tags="{{ tag_ns.items|join(',') }}">
+    <a class="session-card-link" href="{{ url_for('view_session', session_id=session.id) }}">
+        <h1>{{ session.title }}</h1>
+        <p>Location: <span>{{ session.location }}</span></p>
+        <p>Time: <span>{{ session.time }}</span></p>
+        <p>Attendees: <span>{{ session.attendees }}</span></p>
+        {% for tag_name in tag_ns.items %}<span class="tag-pill">{{ tag_name|title }}</span>{% endfor %}
+    </a>
+    <button class="action join-session" data-session-id="{{ session.id }}">Join Session</button>
+</div>
+{% endfor %}
+"""
+
+
+def build_snapshot(session_count, seed=0):
+    rng = random.Random(seed)
+    course_count = max(50, session_count // 10)
+    location_count = max(20, session_count // 20)
+    tag_count = 40
+
+    courses = [
+        {"id": i, "title": f"Course {i % 500}", "section": "ABCD"[i % 4], "year": 2023 + i % 3,
+         "term": 1 + i % 3, "professor_name": f"Dr. Prof{i % 300}"}
+        for i in range(1, course_count + 1)
+    ]
+    locations = [
+        {"id": i, "address": f"Building {i % 40}", "room_number": str(100 + i)}
+        for i in range(1, location_count + 1)
+    ]
+    tags = [{"id": i, "tag_name": f"tag{i}"} for i in range(1, tag_count + 1)]
+    sessions = []
+    for i in range(1, session_count + 1):
+        sessions.append({
+            "id": i,
+            "course_id": rng.randint(1, course_count),
+            "location_id": rng.randint(1, location_count),
+            "title": f"{rng.choice(['😎', '🤓', '😤'])} Session {i}",
+            "location": f"Building {i % 40} - Room {100 + i % 50}",
+            "time": "7:00 PM",
+            "attendees": rng.randint(1, 30),
+            "max_attendees": 30,
+            "start_time": "2025-02-18T19:00:00",
+            "end_time": "2025-02-18T21:00:00",
+            "tag_ids": rng.sample(range(1, tag_count + 1), 2),
+        })
+
+    store = DataStore()
+    store.load(join_sessions=sessions, courses=courses, locations=locations, tags=tags)
+    return store.snapshot()
+
+
+def time_call(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(sizes, repeat):
+    app = create_app({'PERSISTENCE_ENABLED': False})
+    results = []
+    with app.test_request_context("/"):
+        for size in sizes:
+            data = build_snapshot(size)
+            sessions = data.join_sessions()
+            courses, locations, tags = data.all_courses(), data.all_locations(), data.all_tags()
+
+            before = time_call(lambda: render_template_string(
+                LEGACY_CARD_LIST, sessions=sessions, courses=courses, locations=locations, tags=tags
+            ), repeat)
+            after = time_call(lambda: "".join(
+                render_template("partials/session_card.html", session=view, section="join_sessions")
+                for view in build_session_views(data, sessions)
+            ), repeat)
+            results.append({"sessions": size, "before_ms": round(before, 2), "after_ms": round(after, 2),
+                            "speedup": round(before / after, 1)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'sessions':>10} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>8}")
+    for row in results:
+        print(f"{row['sessions']:>10} {row['before_ms']:>12} {row['after_ms']:>12} {row['speedup']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
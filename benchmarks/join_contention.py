@@ -0,0 +1,129 @@
+"""Join contention: many threads joining one session at once.
+
+Run from the repository root:
+
+    python -m benchmarks.join_contention --threads 32 --joins 50 --capacity 100 --waitlist --persist
+
+Every thread posts `--joins` joins with distinct attendee names to the
+same session, all released together. Afterwards the session must hold
+exactly `--capacity` attendees, each name at most once, and (with
+`--waitlist`) every other joiner on the waitlist in the order their
+requests were answered. The script exits non-zero if any of that fails.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter
+
+from __init__ import create_app
+from benchmarks.route_latency import percentile
+from store import attendee_names, fixture_data, seats_taken
+
+SESSION_ID = 1_000_000
+
+
+def seed_data(capacity):
+    data = fixture_data()
+    data['join_sessions'] = list(data['join_sessions']) + [{
+        "id": SESSION_ID,
+        "title": "🤓 Exam prep - contention test",
+        "location": "TBD",
+        "time": "TBD",
+        "attendees": 1,
+        "max_attendees": capacity + 1,
+        "organizer": "Load Test",
+        "attendee_list": ["Load Test (Host)"],
+    }]
+    return data
+
+
+def run(threads, joins, capacity, waitlist, persist):
+    app = create_app({
+        'PERSISTENCE_ENABLED': persist,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'REMINDERS_ENABLED': False,
+        # Measures contention itself, so nothing may be shed
+        'ADMISSION_CONTROL_ENABLED': False,
+        'SEED_DATA': lambda: seed_data(capacity),
+    })
+    store = app.extensions['data_store']
+    start = threading.Barrier(threads)
+    outcomes = Counter()
+    latencies = []
+    answered = []
+    lock = threading.Lock()
+
+    def worker(index):
+        client = app.test_client()
+        mine = []
+        start.wait()
+        for join in range(joins):
+            name = f"Student {index}-{join}"
+            started = time.perf_counter()
+            response = client.post(f"/join_session/{SESSION_ID}", json={'name': name, 'waitlist': waitlist})
+            mine.append((time.perf_counter() - started, response.get_json()['status'], name))
+        with lock:
+            for latency, status, name in mine:
+                latencies.append(latency * 1000)
+                outcomes[status] += 1
+                answered.append((status, name))
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    session = store.snapshot().get_session(SESSION_ID)
+    joined = [name for status, name in answered if status == 'joined']
+    waitlisted = [name for status, name in answered if status == 'waitlisted']
+    names = attendee_names(session)[1:]
+    problems = []
+    if seats_taken(session) != capacity + 1:
+        problems.append(f"session holds {seats_taken(session)} attendees, expected {capacity + 1}")
+    if len(names) != len(set(names)) or sorted(names) != sorted(joined):
+        problems.append("attendee list does not match the successful joins")
+    if waitlist and sorted(session.get('waitlist', ())) != sorted(waitlisted):
+        problems.append("waitlist does not match the waitlisted joins")
+    if persist:
+        stored = [row for row in store.database.load_all()['join_sessions'] if row['id'] == SESSION_ID][0]
+        if stored['attendees'] != session['attendees'] or stored['attendee_list'] != session['attendee_list']:
+            problems.append("database row differs from the store")
+
+    latencies.sort()
+    return {
+        'threads': threads,
+        'requests': threads * joins,
+        'capacity': capacity,
+        'waitlist': waitlist,
+        'persist': persist,
+        'outcomes': dict(outcomes),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(threads * joins / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'problems': problems,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--joins", type=int, default=50, help="joins per thread")
+    parser.add_argument("--capacity", type=int, default=100, help="free seats in the session")
+    parser.add_argument("--waitlist", action="store_true", help="ask for a waitlist place when full")
+    parser.add_argument("--persist", action="store_true", help="write through to an in-memory SQLite database")
+    args = parser.parse_args()
+
+    result = run(args.threads, args.joins, args.capacity, args.waitlist, args.persist)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if result['problems']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Live updates: event delivery latency to many idle SSE clients.
+
+Run from the repository root:
+
+    python -m benchmarks.live_updates --clients 1000 --events 20
+
+Starts the app on a local threaded server, opens `--clients` connections
+to /events, then joins a session `--events` times and measures how long
+each attendees_changed event takes to reach every client. Also reports
+the server's memory per connected client.
+"""
+import argparse
+import json
+import logging
+import selectors
+import socket
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from __init__ import create_app
+from benchmarks.route_latency import peak_rss_mb, percentile
+
+
+def open_stream(port):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+    sock.setblocking(False)
+    return sock
+
+
+def run(clients, events, interval=0.05):
+    app = create_app({
+        'PERSISTENCE_ENABLED': False,
+        'REMINDERS_ENABLED': False,
+        'LIVE_UPDATES_MAX_CLIENTS': clients,
+    })
+    store = app.extensions['data_store']
+    hub = app.extensions['event_hub']
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    rss_before = peak_rss_mb()
+    selector = selectors.DefaultSelector()
+    for _ in range(clients):
+        selector.register(open_stream(port), selectors.EVENT_READ)
+    deadline = time.perf_counter() + 60
+    while hub.stats()['clients'] < clients and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    connected = hub.stats()['clients']
+    rss_connected = peak_rss_mb()
+
+    session_id = next(iter(store.snapshot().join_session_ids))
+    latencies = []
+    for index in range(events):
+        pending = {key.fileobj for key in selector.get_map().values()}
+        started = time.perf_counter()
+        store.join_session(session_id, f"Listener {index}")
+        while pending and time.perf_counter() - started < 10:
+            for key, _ in selector.select(timeout=1):
+                chunk = key.fileobj.recv(65536)
+                if b"attendees_changed" in chunk:
+                    pending.discard(key.fileobj)
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+
+    for key in list(selector.get_map().values()):
+        key.fileobj.close()
+    server.shutdown()
+    latencies.sort()
+    return {
+        'clients': clients,
+        'connected': connected,
+        'events': events,
+        'all_delivered_p50_ms': round(percentile(latencies, 0.50), 2),
+        'all_delivered_max_ms': round(latencies[-1], 2),
+        'rss_per_client_kb': round((rss_connected - rss_before) * 1024 / max(1, connected), 1),
+        'hub': hub.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.clients, args.events), indent=2))
+
+
+if __name__ == "__main__":
+    main()
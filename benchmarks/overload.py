@@ -0,0 +1,130 @@
+"""Overload: one client flooding autocomplete and writes while others browse.
+
+Run from the repository root:
+
+    python -m benchmarks.overload --sessions 10000 --flood-threads 16 --readers 4 --seconds 10
+
+`--flood-threads` threads all send as one client address, looping on
+`/api/courses` and `/api/locations` lookups with fresh queries (so the
+result cache cannot absorb them) and on course and location creates.
+`--readers` threads, each with its own address, load the dashboard and
+session pages and record their latency. Everything runs twice, with
+admission control off and on, and the report compares the readers'
+latency and what happened to the flood.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+from __init__ import create_app
+from benchmarks.route_latency import percentile
+from benchmarks.synthetic_data import generate
+
+FLOOD_ADDRESS = '10.0.0.1'
+
+
+def flood_requests(rng, data, number):
+    words = [course['title'].lower() for course in data['courses']]
+    while True:
+        word = rng.choice(words)
+        query = f"{word[:rng.randint(1, 4)]}{rng.randrange(1000)}"
+        kind = rng.random()
+        if kind < 0.4:
+            yield 'GET', f"/api/courses?q={query}", None
+        elif kind < 0.8:
+            yield 'GET', f"/api/locations?q={query}", None
+        elif kind < 0.9:
+            number += 1
+            yield 'POST', '/api/courses', {'title': f"Flood {number}", 'section': 'A', 'year': 2025, 'term': 1,
+                                           'professor_name': 'Load Test'}
+        else:
+            number += 1
+            yield 'POST', '/api/locations', {'address': f"Flood Hall {number}", 'room_number': '1'}
+
+
+def run_once(data, admission, flood_threads, readers, seconds, seed):
+    app = create_app({
+        'PERSISTENCE_ENABLED': False,
+        'REMINDERS_ENABLED': False,
+        'LIVE_UPDATES_ENABLED': False,
+        'RESOURCE_INDEX_ENABLED': False,
+        'ADMISSION_CONTROL_ENABLED': admission,
+        'SEED_DATA': lambda: data,
+    })
+    session_ids = [session['id'] for session in data['join_sessions']]
+    stop = threading.Event()
+    lock = threading.Lock()
+    flood_outcomes = Counter()
+    reader_latencies = []
+    reader_outcomes = Counter()
+
+    def flood(index):
+        client = app.test_client()
+        rng = random.Random(seed * 1000 + index)
+        outcomes = Counter()
+        for method, url, payload in flood_requests(rng, data, index * 1_000_000):
+            if stop.is_set():
+                break
+            response = client.open(url, method=method, json=payload, environ_base={'REMOTE_ADDR': FLOOD_ADDRESS})
+            response.get_data()
+            outcomes[response.status_code] += 1
+        with lock:
+            flood_outcomes.update(outcomes)
+
+    def read(index):
+        client = app.test_client()
+        rng = random.Random(seed * 1000 + 500 + index)
+        address = f"10.1.0.{index + 1}"
+        latencies, outcomes = [], Counter()
+        while not stop.is_set():
+            url = '/' if rng.random() < 0.3 else f"/sessions/{rng.choice(session_ids)}"
+            started = time.perf_counter()
+            response = client.get(url, environ_base={'REMOTE_ADDR': address})
+            response.get_data()
+            latencies.append((time.perf_counter() - started) * 1000)
+            outcomes[response.status_code] += 1
+            # Readers think between pages
+            time.sleep(0.01)
+        with lock:
+            reader_latencies.extend(latencies)
+            reader_outcomes.update(outcomes)
+
+    threads = [threading.Thread(target=flood, args=(index,)) for index in range(flood_threads)]
+    threads += [threading.Thread(target=read, args=(index,)) for index in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    reader_latencies.sort()
+    return {
+        'admission_control': admission,
+        'reader_requests': len(reader_latencies),
+        'reader_statuses': dict(sorted(reader_outcomes.items())),
+        'reader_p50_ms': round(percentile(reader_latencies, 0.50), 2),
+        'reader_p99_ms': round(percentile(reader_latencies, 0.99), 2),
+        'flood_statuses': dict(sorted(flood_outcomes.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--flood-threads", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    data = generate(args.sessions, seed=args.seed)
+    report = [run_once(data, admission, args.flood_threads, args.readers, args.seconds, args.seed)
+              for admission in (False, True)]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
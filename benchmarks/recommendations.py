@@ -0,0 +1,103 @@
+"""Session recommendations: ranking latency and the cost of keeping scores current.
+
+Run from the repository root:
+
+    python -m benchmarks.recommendations --sessions 100000
+
+Loads `--sessions` synthetic sessions (2% of them in "My Sessions"), then
+times `--queries` top-k recommendations against the published snapshot,
+and profile updates: moving a joinable session into "My Sessions" and
+taking it out again, each applied to a draft the way Snapshot does it.
+Checks the final ranking against scores computed session by session and
+exits non-zero on a mismatch.
+"""
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.route_latency import percentile
+from benchmarks.synthetic_data import generate
+from recommendations import FEATURE_WEIGHTS
+from store import DataStore
+
+
+def brute_force(data, limit):
+    profile = {}
+    for session_id in data.my_session_ids:
+        for feature in data._session_features(data.sessions[session_id]):
+            profile[feature] = profile.get(feature, 0) + 1
+    ranked = []
+    for session_id in data.join_session_ids:
+        score = sum(profile.get(feature, 0) * FEATURE_WEIGHTS[feature[0]]
+                    for feature in data._session_features(data.sessions[session_id]))
+        if score > 0:
+            ranked.append((-score, session_id))
+    ranked.sort()
+    return [session_id for _, session_id in ranked[:limit]]
+
+
+def timed(latencies, apply):
+    started = time.perf_counter()
+    result = apply()
+    latencies.append((time.perf_counter() - started) * 1000)
+    return result
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return {'p50_ms': round(percentile(latencies, 0.50), 4), 'p95_ms': round(percentile(latencies, 0.95), 4)}
+
+
+def run(sessions, queries, limit, updates):
+    store = DataStore()
+    started = time.perf_counter()
+    store.load(**generate(sessions))
+    load_s = time.perf_counter() - started
+    data = store.snapshot()
+
+    ranking = []
+    for _ in range(queries):
+        timed(ranking, lambda: data.recommender.recommend(limit))
+
+    added, removed = [], []
+    recommender = data.recommender
+    for session_id in list(data.join_session_ids)[:updates]:
+        features = data._session_features(data.sessions[session_id])
+        draft = recommender.begin_write()
+
+        def add():
+            draft.remove_candidate(session_id)
+            draft.add_to_profile(session_id, features)
+        timed(added, add)
+        timed(removed, lambda: draft.remove_from_profile(session_id))
+        draft.end_write()
+
+    recommended = [session_id for session_id, _ in data.recommender.recommend(limit)]
+    return {
+        'sessions': sessions,
+        'candidates': len(data.recommender),
+        'profile_sessions': len(data.my_session_ids),
+        'load_s': round(load_s, 2),
+        'recommend': summary(ranking),
+        'add_to_profile': summary(added),
+        'remove_from_profile': summary(removed),
+        'matches_brute_force': recommended == brute_force(data, limit),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args()
+    report = run(args.sessions, args.queries, args.limit, args.updates)
+    print(json.dumps(report, indent=2))
+    if not report['matches_brute_force']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
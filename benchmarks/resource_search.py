@@ -0,0 +1,152 @@
+"""Resource full-text search: upload latency, indexing rate and query latency.
+
+Run from the repository root:
+
+    python -m benchmarks.resource_search --documents 200000 --uploads 200
+
+First uploads `--uploads` text files to a session through the Flask test
+client, with and without the background indexer, to show what indexing
+adds to an upload: back to back, where the indexer is always busy and
+competes with the uploads for the interpreter, and spaced out, where it
+catches up between uploads. Then indexes `--documents` synthetic notes (words
+drawn from a Zipf-like vocabulary, like real text) in batches, the way the
+indexer's workers publish them, and times queries of rare, common and
+mixed words against the full index.
+"""
+import argparse
+import io
+import json
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from __init__ import create_app
+from benchmarks.route_latency import peak_rss_mb, percentile
+from text_index import TextIndex
+
+VOCABULARY = 50000
+
+
+def make_words(rng):
+    syllables = ['al', 'be', 'co', 'di', 'ex', 'fu', 'ga', 'hi', 'io', 'ju', 'ka', 'lo', 'mi', 'no', 'pa', 'qu',
+                 'ra', 'si', 'tu', 'vo', 'wy', 'xe', 'yo', 'ze']
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def make_document(words, weights, rng, length):
+    return rng.choices(words, cum_weights=weights, k=length)
+
+
+def upload_latency(count, indexing, interval, rng, words, weights):
+    storage = tempfile.mkdtemp()
+    try:
+        app = create_app({
+            'PERSISTENCE_ENABLED': False,
+            'REMINDERS_ENABLED': False,
+            'LIVE_UPDATES_ENABLED': False,
+            'RESOURCE_STORAGE_DIR': storage,
+            'RESOURCE_INDEX_ENABLED': indexing,
+        })
+        client = app.test_client()
+        response = client.post('/create_session', data={'course': 'Benchmark', 'start_time': '2025-05-01T10:00'})
+        session_id = int(response.headers['Location'].rsplit('/', 1)[1])
+        latencies = []
+        for index in range(count):
+            body = " ".join(make_document(words, weights, rng, 2000)).encode('utf-8')
+            started = time.perf_counter()
+            client.post(f"/sessions/{session_id}/resources", content_type='multipart/form-data',
+                        data={'resource_file': (io.BytesIO(body), f"notes-{index}.txt")})
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(interval)
+        indexer = app.extensions.get('resource_indexer')
+        if indexer is not None:
+            deadline = time.perf_counter() + 60
+            while indexer.stats()['pending'] and time.perf_counter() < deadline:
+                time.sleep(0.01)
+            indexer.stop()
+        latencies.sort()
+        return {
+            'indexing': indexing,
+            'interval_ms': interval * 1000,
+            'uploads': count,
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'indexed': indexer.stats()['indexed'] if indexer is not None else None,
+        }
+    finally:
+        shutil.rmtree(storage, ignore_errors=True)
+
+
+def run(documents, uploads, queries=200, batch=256, seed=0):
+    rng = random.Random(seed)
+    words = make_words(rng)
+    weights = []
+    total = 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1 / rank
+        weights.append(total)
+
+    report = {'uploads': [
+        upload_latency(uploads, indexing, interval, rng, words, weights)
+        for interval in (0, 0.05) for indexing in (False, True)
+    ]}
+
+    rss_before = peak_rss_mb()
+    index = TextIndex()
+    indexing_s = 0.0
+    for first in range(0, documents, batch):
+        notes = [(doc_id, Counter(make_document(words, weights, rng, rng.randint(50, 400))))
+                 for doc_id in range(first, min(documents, first + batch))]
+        started = time.perf_counter()
+        draft = index.begin_write()
+        draft.add_many(notes)
+        draft.end_write()
+        index = draft
+        indexing_s += time.perf_counter() - started
+
+    query_sets = {
+        'rare': lambda: words[rng.randrange(5000, VOCABULARY)],
+        'common': lambda: words[rng.randrange(20)],
+        'mixed': lambda: " ".join([words[rng.randrange(50)], words[rng.randrange(500, 5000)],
+                                   words[rng.randrange(5000, VOCABULARY)]]),
+    }
+    report['index'] = {
+        'documents': len(index),
+        'segments': len(index.segments),
+        'indexing_docs_per_s': round(documents / indexing_s),
+        'rss_mb': round(peak_rss_mb() - rss_before, 1),
+    }
+    report['queries'] = {}
+    for name, make_query in query_sets.items():
+        latencies = []
+        for _ in range(queries):
+            query = make_query()
+            started = time.perf_counter()
+            index.search(query, 10)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        report['queries'][name] = {
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200000)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.documents, args.uploads, seed=args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
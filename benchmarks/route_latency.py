@@ -0,0 +1,185 @@
+"""Route latency, throughput and memory on synthetic data, through the Flask test client.
+
+Run from the repository root:
+
+    python -m benchmarks.route_latency --sizes 1000 100000 --requests 500 --out results.json
+
+Results are JSON, one row per (size, scenario), so runs from two commits
+can be diffed directly.
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+from __init__ import create_app
+from benchmarks.synthetic_data import START, generate
+
+SCENARIOS = ('home', 'view_session', 'api_locations', 'api_courses', 'sessions_window', 'course_calendar',
+             'location_availability', 'create_session', 'leave_session')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(usage / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_requests(scenario, data, count, rng):
+    """Yield (method, url, form) tuples for one scenario."""
+    if scenario == 'home':
+        return [('GET', '/', None)] * count
+    if scenario == 'view_session':
+        session_ids = [session['id'] for session in data['join_sessions'] + data['my_sessions']]
+        return [('GET', f"/sessions/{rng.choice(session_ids)}", None) for _ in range(count)]
+    if scenario in ('api_locations', 'api_courses'):
+        if scenario == 'api_locations':
+            words = [location['address'] for location in data['locations']]
+        else:
+            words = [course['title'] for course in data['courses']]
+        path = '/api/locations' if scenario == 'api_locations' else '/api/courses'
+        requests = []
+        for _ in range(count):
+            word = rng.choice(words).lower()
+            # Mostly short keystroke prefixes, some infix lookups
+            query = word[:rng.randint(1, 4)] if rng.random() < 0.8 else word[1:5]
+            requests.append(('GET', f"{path}?q={query}&limit=10", None))
+        return requests
+    if scenario == 'sessions_window':
+        # A week of sessions, as a calendar view would ask for it
+        requests = []
+        for _ in range(count):
+            start = START + timedelta(days=rng.randrange(180))
+            requests.append(('GET', f"/api/sessions?scope=all&from={start.date()}&to={(start + timedelta(days=7)).date()}", None))
+        return requests
+    if scenario == 'course_calendar':
+        return [('GET', f"/calendar/courses/{rng.choice(data['courses'])['id']}.ics", None) for _ in range(count)]
+    if scenario == 'location_availability':
+        return [('GET', f"/api/locations/{rng.choice(data['locations'])['id']}/availability"
+                        f"?date={(START + timedelta(days=rng.randrange(180))).date()}", None) for _ in range(count)]
+    if scenario == 'create_session':
+        requests = []
+        for _ in range(count):
+            # Spread over the data's date range; some land on booked rooms and are rejected
+            start = START + timedelta(days=rng.randrange(180), hours=rng.randrange(8, 20))
+            requests.append(('POST', '/create_session', {
+                'course_id': str(rng.choice(data['courses'])['id']),
+                'location_id': str(rng.choice(data['locations'])['id']),
+                'max_attendees': '10',
+                'description': 'Benchmark session',
+                'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+                'end_time': (start + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M'),
+                'chill_level': '🤓',
+                'room_type_id': '1',
+                'tags': [str(rng.choice(data['tags'])['id'])],
+            }))
+        return requests
+    if scenario == 'leave_session':
+        session_ids = [session['id'] for session in data['my_sessions']]
+        rng.shuffle(session_ids)
+        return [('POST', f"/leave_session/{session_id}", None) for session_id in session_ids[:count]]
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def run_scenario(client, requests):
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for method, url, form in requests:
+        start = time.perf_counter()
+        response = client.open(url, method=method, data=form)
+        # Streamed bodies are only produced while they are read
+        response.get_data()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50), 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 3) if latencies else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+def run(sizes, request_count, scenarios=SCENARIOS, seed=0, persist=False, fragment_cache=True):
+    results = []
+    for size in sizes:
+        data = generate(size, seed=seed)
+        config = {
+            'PERSISTENCE_ENABLED': persist,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'REMINDERS_ENABLED': False,
+            # Every request comes from one test client, which the rate limits would throttle
+            'ADMISSION_CONTROL_ENABLED': False,
+            'SEED_DATA': lambda: data,
+        }
+        if not fragment_cache:
+            config['FRAGMENT_CACHE_MAX_BYTES'] = 0
+        started = time.perf_counter()
+        app = create_app(config)
+        startup_s = time.perf_counter() - started
+        client = app.test_client()
+        rng = random.Random(seed)
+        for scenario in scenarios:
+            row = {'sessions': size, 'scenario': scenario, 'startup_s': round(startup_s, 2)}
+            row.update(run_scenario(client, build_requests(scenario, data, request_count, rng)))
+            row['peak_rss_mb'] = peak_rss_mb()
+            results.append(row)
+        del app, client, data
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--persist", action="store_true", help="write through to an in-memory SQLite database")
+    parser.add_argument("--no-fragment-cache", action="store_true")
+    parser.add_argument("--out", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'requests_per_scenario': args.requests,
+        'persist': args.persist,
+        'fragment_cache': not args.no_fragment_cache,
+        'results': run(args.sizes, args.requests, args.scenarios, seed=args.seed, persist=args.persist,
+                       fragment_cache=not args.no_fragment_cache),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out:
+            out.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
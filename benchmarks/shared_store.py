@@ -0,0 +1,239 @@
+"""Multi-process mode: several workers on one shared database must agree.
+
+Run from the repository root:
+
+    python -m benchmarks.shared_store --workers 4 --joiners 60 --capacity 20
+
+Spawns `--workers` processes serving the app with SHARED_STORE_ENABLED=1
+on one fresh SQLite database, all started at once so they race to seed
+it. Then, spreading requests over the workers, it:
+
+- creates a session on one worker and reads it back from every worker;
+- creates a course on one worker, finds it by autocomplete on every
+  worker and has a duplicate of it rejected by another;
+- has `--joiners` threads, one request each and spread over the workers,
+  join the new session (capacity `--capacity`) with a waitlist, and
+  checks that it ends up exactly full with everyone else waitlisted;
+- leaves the session on one worker and checks it is gone everywhere;
+- compares every worker's full session list after each step.
+
+Reads are timed, so the cost of the per-request version check shows up
+in the report. The script exits non-zero if the workers disagree.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlencode
+
+from benchmarks.route_latency import percentile
+from benchmarks.startup import free_port
+
+WORKER = """
+import sys
+from werkzeug.serving import make_server
+from __init__ import create_app
+
+server = make_server('127.0.0.1', int(sys.argv[1]), create_app(), threaded=True)
+server.serve_forever()
+"""
+
+
+class Worker:
+    def __init__(self, env):
+        self.port = free_port()
+        self.process = subprocess.Popen([sys.executable, '-c', WORKER, str(self.port)], env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.read_ms = []
+
+    def request(self, method, path, body=None, headers=None):
+        connection = HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.getheader('Location'), response.read()
+        finally:
+            connection.close()
+
+    def get_json(self, path):
+        started = time.perf_counter()
+        status, _, body = self.request('GET', path)
+        self.read_ms.append((time.perf_counter() - started) * 1000)
+        return status, json.loads(body) if status == 200 else None
+
+    def post_json(self, path, payload):
+        status, _, body = self.request('POST', path, json.dumps(payload), {'Content-Type': 'application/json'})
+        return status, json.loads(body)
+
+    def post_form(self, path, fields):
+        return self.request('POST', path, urlencode(fields), {'Content-Type': 'application/x-www-form-urlencoded'})
+
+    def wait_ready(self, deadline):
+        while time.perf_counter() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"worker on port {self.port} exited with {self.process.returncode}")
+            try:
+                if self.request('GET', '/api/sessions?limit=1')[0] == 200:
+                    return
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError("worker did not answer in time")
+
+    def sessions(self):
+        """Every session the worker lists, by scope."""
+        listing = {}
+        for scope in ('mine', 'join'):
+            cursor, sessions = None, []
+            while True:
+                path = f"/api/sessions?scope={scope}&limit=100" + (f"&cursor={cursor}" if cursor else "")
+                _, page = self.get_json(path)
+                sessions += page['sessions']
+                cursor = page['next_cursor']
+                if cursor is None:
+                    break
+            listing[scope] = sessions
+        return listing
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def compare_listings(workers, step, problems):
+    listings = [worker.sessions() for worker in workers]
+    for index, listing in enumerate(listings[1:], 1):
+        if listing != listings[0]:
+            problems.append(f"{step}: worker {index} lists different sessions from worker 0")
+    return listings[0]
+
+
+def run(worker_count, joiners, capacity, timeout=120):
+    workdir = tempfile.mkdtemp(prefix='shared-store-')
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': os.getcwd(),
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'shared.db')}",
+        'PERSISTENCE_ENABLED': '1',
+        'SHARED_STORE_ENABLED': '1',
+        'RESOURCE_STORAGE_DIR': os.path.join(workdir, 'uploads'),
+        'TEMPLATE_CACHE_DIR': '',
+        'REMINDERS_ENABLED': '0',
+        'LIVE_UPDATES_ENABLED': '0',
+        'RESOURCE_INDEX_ENABLED': '0',
+        # Rate limits are per worker and would turn away the joiners
+        'ADMISSION_CONTROL_ENABLED': '0',
+    })
+    workers = [Worker(env) for _ in range(worker_count)]
+    problems = []
+    try:
+        deadline = time.perf_counter() + timeout
+        for worker in workers:
+            worker.wait_ready(deadline)
+        initial = compare_listings(workers, "after start", problems)
+
+        # A session created on one worker is readable on every worker right away
+        status, location, _ = workers[0].post_form('/create_session', {
+            'course': 'Shared store check', 'max_attendees': capacity + 1, 'description': 'Created by the check',
+        })
+        session_id = int(location.rstrip('/').rsplit('/', 1)[-1]) if status == 302 and location else None
+        if session_id is None:
+            problems.append(f"creating a session answered {status}")
+        else:
+            for index, worker in enumerate(workers):
+                if worker.request('GET', f"/sessions/{session_id}")[0] != 200:
+                    problems.append(f"worker {index} does not know the session created on worker 0")
+        compare_listings(workers, "after create", problems)
+
+        # A course created on one worker is found everywhere and cannot be created twice
+        course = {'title': 'Distributed Systems', 'section': 'MP', 'year': 2025, 'term': 1,
+                  'professor_name': 'Shared Store'}
+        status, _ = workers[1 % worker_count].post_json('/api/courses', course)
+        if status != 200:
+            problems.append(f"creating a course answered {status}")
+        for index, worker in enumerate(workers):
+            _, found = worker.get_json('/api/courses?q=distributed')
+            if not any(match['section'] == 'MP' for match in found or ()):
+                problems.append(f"worker {index} does not find the course created on worker 1")
+        status, _ = workers[2 % worker_count].post_json('/api/courses', dict(course, title='distributed systems'))
+        if status != 409:
+            problems.append(f"a duplicate course on another worker answered {status}, not 409")
+
+        # Joins spread over the workers still fill the session exactly
+        outcomes = []
+        if session_id is not None:
+            barrier = threading.Barrier(joiners)
+
+            def join(index):
+                worker = workers[index % worker_count]
+                barrier.wait()
+                status, body = worker.post_json(f"/join_session/{session_id}",
+                                                {'name': f"Joiner {index}", 'waitlist': True})
+                outcomes.append(body.get('status') if status == 200 else status)
+
+            threads = [threading.Thread(target=join, args=(index,)) for index in range(joiners)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            joined = outcomes.count('joined')
+            if joined != min(capacity, joiners):
+                problems.append(f"{joined} joiners got a seat; the session had {capacity}")
+            if outcomes.count('waitlisted') != joiners - joined:
+                problems.append(f"outcomes other than joined or waitlisted: {sorted(map(str, set(outcomes)))}")
+        listing = compare_listings(workers, "after joins", problems)
+        session = next((session for session in listing['mine'] if session['id'] == session_id), None)
+        if session is not None:
+            if session['attendees'] != 1 + outcomes.count('joined'):
+                problems.append(f"the session counts {session['attendees']} attendees")
+            if len(session.get('waitlist', ())) != outcomes.count('waitlisted'):
+                problems.append(f"the session's waitlist holds {len(session.get('waitlist', ()))}")
+
+        # Leaving on one worker removes the session everywhere
+        if session_id is not None:
+            leaver = workers[-1]
+            status, _ = leaver.post_json(f"/leave_session/{session_id}", {})
+            if status != 200:
+                problems.append(f"leaving the session answered {status}")
+            for index, worker in enumerate(workers):
+                if worker.request('GET', f"/sessions/{session_id}")[0] != 404:
+                    problems.append(f"worker {index} still shows the session left on worker {worker_count - 1}")
+        final = compare_listings(workers, "after leave", problems)
+
+        read_ms = sorted(ms for worker in workers for ms in worker.read_ms)
+        return {
+            'workers': worker_count,
+            'sessions_at_start': {scope: len(sessions) for scope, sessions in initial.items()},
+            'sessions_at_end': {scope: len(sessions) for scope, sessions in final.items()},
+            'join_outcomes': {outcome: outcomes.count(outcome) for outcome in sorted(set(map(str, outcomes)))},
+            'reads': len(read_ms),
+            'read_p50_ms': round(percentile(read_ms, 0.50), 2),
+            'read_p99_ms': round(percentile(read_ms, 0.99), 2),
+            'problems': problems,
+        }
+    finally:
+        for worker in workers:
+            worker.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--joiners", type=int, default=60)
+    parser.add_argument("--capacity", type=int, default=20, help="free seats in the created session")
+    args = parser.parse_args()
+
+    result = run(args.workers, args.joiners, args.capacity)
+    print(json.dumps(result, indent=2))
+    if result['problems']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
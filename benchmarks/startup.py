@@ -0,0 +1,125 @@
+"""Cold start: time to first byte of a freshly spawned worker.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --sessions 10000 --repeat 5
+
+Each variant spawns a new Python process serving the app and measures
+the time from spawn until the first byte of `GET /` arrives. Variants
+differ only in the startup options, so the difference between them is
+the cost of compiling templates and building the store.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKER = """
+import sys
+from werkzeug.serving import make_server
+from __init__ import create_app
+
+sessions = int(sys.argv[2])
+config = {}
+if sessions:
+    from benchmarks.synthetic_data import generate
+    config['SEED_DATA'] = lambda: generate(sessions)
+server = make_server('127.0.0.1', int(sys.argv[1]), create_app(config), threaded=True)
+server.serve_forever()
+"""
+
+VARIANTS = {
+    'cold': {'TEMPLATE_CACHE_DIR': '', 'PRECOMPILE_TEMPLATES': '0'},
+    'bytecode_cache': {'PRECOMPILE_TEMPLATES': '0'},
+    'bytecode_cache+precompile': {'PRECOMPILE_TEMPLATES': '1'},
+    'bytecode_cache+precompile+snapshot': {'PRECOMPILE_TEMPLATES': '1', 'USE_SNAPSHOT': '1'},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def first_byte(port, deadline):
+    """Retry GET / until the worker answers; returns when its first byte arrives."""
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=60) as sock:
+                sock.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                if sock.recv(1):
+                    return time.perf_counter()
+        except OSError:
+            time.sleep(0.005)
+    raise TimeoutError("worker did not answer in time")
+
+
+def spawn_and_measure(env, sessions, timeout):
+    port = free_port()
+    started = time.perf_counter()
+    worker = subprocess.Popen([sys.executable, '-c', WORKER, str(port), str(sessions)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return first_byte(port, started + timeout) - started
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def run(sessions, repeat, timeout=600):
+    workdir = tempfile.mkdtemp(prefix='startup-bench-')
+    base_env = dict(os.environ)
+    base_env.update({
+        'PYTHONPATH': os.getcwd(),
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'PERSISTENCE_ENABLED': '1',
+        'REMINDERS_ENABLED': '0',
+        'TEMPLATE_CACHE_DIR': os.path.join(workdir, 'jinja'),
+    })
+    results = []
+    try:
+        for name, overrides in VARIANTS.items():
+            env = dict(base_env)
+            if overrides.get('USE_SNAPSHOT'):
+                env['DATA_SNAPSHOT_PATH'] = os.path.join(workdir, 'snapshot.pickle')
+            env.update({key: value for key, value in overrides.items() if key != 'USE_SNAPSHOT'})
+            # One unmeasured start seeds the database and fills the caches the variant reuses
+            spawn_and_measure(env, sessions, timeout)
+            timings = [spawn_and_measure(env, sessions, timeout) for _ in range(repeat)]
+            results.append({
+                'variant': name,
+                'sessions': sessions,
+                'ttfb_median_ms': round(statistics.median(timings) * 1000, 1),
+                'ttfb_min_ms': round(min(timings) * 1000, 1),
+                'ttfb_max_ms': round(max(timings) * 1000, 1),
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=0, help="synthetic sessions to seed (0: the tests/ fixtures)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sessions, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'variant':<38} {'median (ms)':>12} {'min (ms)':>10} {'max (ms)':>10}")
+    for row in results:
+        print(f"{row['variant']:<38} {row['ttfb_median_ms']:>12} {row['ttfb_min_ms']:>10} {row['ttfb_max_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
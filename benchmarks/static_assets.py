@@ -0,0 +1,118 @@
+"""Bytes and requests a browser spends on static assets, first visit and repeat.
+
+Run from the repository root:
+
+    python -m benchmarks.static_assets --pages / /login
+
+Builds static/ into a temporary directory, then loads each page twice
+with a simulated browser cache, once with the plain /static files and
+once with the build. The browser fetches the stylesheets, scripts and
+images a page links to (and the images its stylesheets refer to), keeps
+each response with its validators, and on the repeat visit skips
+`immutable` responses and revalidates the rest with If-None-Match.
+Like a desktop browser (VIEWPORT_WIDTH pixels wide) it ignores
+narrower max-width media rules and takes only the first, WebP option of
+an image-set(), which overrides the plain url() declared before it.
+Bytes are body bytes as sent, after any Content-Encoding.
+"""
+import argparse
+import gzip
+import json
+import posixpath
+import re
+import tempfile
+
+from __init__ import create_app
+from static_assets import brotli, build
+
+_PAGE_ASSET = re.compile(r'<(?:link|script|img)\b[^>]*?(?:href|src)="(/(?:static|assets)/[^"]+)"')
+_CSS_URL = re.compile(r"""url\(\s*['"]?([^'")]+?)['"]?\s*\)""")
+_IMAGE_SET = re.compile(r'image-set\(((?:[^()]|\([^()]*\))*)\)')
+_MAX_WIDTH_MEDIA = re.compile(r'@media[^{]*\(max-width:\s*(\d+)px\)[^{]*\{(?:[^{}]*\{[^{}]*\})*[^{}]*\}')
+VIEWPORT_WIDTH = 1440
+
+
+class Browser:
+    def __init__(self, client):
+        self.client = client
+        # url -> (etag, immutable)
+        self.cache = {}
+
+    def visit(self, page):
+        """Load `page` and its assets; returns (requests, body bytes) spent on the assets."""
+        html = self.client.get(page).get_data(as_text=True)
+        pending = list(dict.fromkeys(_PAGE_ASSET.findall(html)))
+        seen = set(pending)
+        requests = transferred = 0
+        while pending:
+            url = pending.pop(0)
+            cached = self.cache.get(url)
+            if cached is not None and cached[1]:
+                continue
+            headers = {'Accept-Encoding': 'gzip, br'}
+            if cached is not None and cached[0]:
+                headers['If-None-Match'] = f'"{cached[0]}"'
+            response = self.client.get(url, headers=headers)
+            body = response.get_data()
+            requests += 1
+            transferred += len(body)
+            if response.status_code == 200:
+                self.cache[url] = (response.get_etag()[0], 'immutable' in response.headers.get('Cache-Control', ''))
+                if response.mimetype == 'text/css':
+                    for reference in self._stylesheet_urls(url, response):
+                        if reference not in seen:
+                            seen.add(reference)
+                            pending.append(reference)
+        return requests, transferred
+
+    @staticmethod
+    def _stylesheet_urls(url, response):
+        body = response.get_data()
+        encoding = response.headers.get('Content-Encoding')
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'br':
+            body = brotli.decompress(body)
+        text = _MAX_WIDTH_MEDIA.sub(
+            lambda match: '' if int(match.group(1)) < VIEWPORT_WIDTH else match.group(0), body.decode('utf-8'))
+        skipped = set()
+        for options in _IMAGE_SET.findall(text):
+            skipped.update(_CSS_URL.findall(options)[1:])
+        return [posixpath.normpath(posixpath.join(posixpath.dirname(url), reference))
+                for reference in _CSS_URL.findall(text)
+                if reference not in skipped and not re.match(r'^([a-z]+:|/|#)', reference)]
+
+
+def run(build_dir, pages):
+    app = create_app({
+        'PERSISTENCE_ENABLED': False,
+        'REMINDERS_ENABLED': False,
+        'LIVE_UPDATES_ENABLED': False,
+        'RESOURCE_INDEX_ENABLED': False,
+        'ADMISSION_CONTROL_ENABLED': False,
+        'STATIC_BUILD_DIR': build_dir,
+    })
+    browser = Browser(app.test_client())
+    report = {}
+    for visit in ('first_visit', 'repeat_visit'):
+        requests = transferred = 0
+        for page in pages:
+            page_requests, page_bytes = browser.visit(page)
+            requests += page_requests
+            transferred += page_bytes
+        report[visit] = {'requests': requests, 'bytes': transferred}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs='+', default=['/', '/login'])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as unbuilt, tempfile.TemporaryDirectory() as build_dir:
+        build('static', build_dir)
+        report = {'static': run(unbuilt, args.pages), 'built': run(build_dir, args.pages)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
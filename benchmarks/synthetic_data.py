@@ -0,0 +1,150 @@
+"""Synthetic data in the shapes of the tests/ fixtures, at any scale.
+
+    from benchmarks.synthetic_data import generate
+    data = generate(100000)          # DataStore.load / Database.seed kwargs
+
+or, to write it out as JSON:
+
+    python -m benchmarks.synthetic_data --sessions 100000 --out data.json
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from store import fixture_data
+
+ATTENDEE_NAMES = ["Jamie F.", "Riley S.", "Morgan Lee", "Nina Alvarez", "Sam T.", "Priya K.", "Alex P.", "Chen W."]
+DESCRIPTIONS = [
+    "Practice problems and a quick review of lecture notes.",
+    "Working through last year's exam under timed conditions.",
+    "Pair programming on the current assignment.",
+    "Reading group for this week's chapters.",
+]
+CHILL_LEVELS = ["😎", "🤓", "😤"]
+START = datetime(2025, 1, 6, 7)
+
+
+def generate(sessions=1000, seed=0, my_share=0.02):
+    """Return sessions, courses, locations, tags and their links, scaled from the fixtures.
+
+    Counts of the other entities follow the session count the way a campus
+    would: about one course per 10 sessions, one room per 20 and one
+    reminder and resource per few sessions. `my_share` of the sessions are
+    organized by "You" and land in "My Sessions".
+    """
+    rng = random.Random(seed)
+    fixtures = fixture_data()
+
+    course_titles = sorted({course['title'] for course in fixtures['courses']})
+    professors = sorted({course['professor_name'] for course in fixtures['courses']})
+    addresses = sorted({location['address'] for location in fixtures['locations']})
+    tag_names = [tag['tag_name'] for tag in fixtures['tags']]
+    room_types = [dict(room_type) for room_type in fixtures['room_types']]
+
+    course_count = max(len(course_titles), sessions // 10)
+    location_count = max(len(addresses), sessions // 20)
+    tag_count = max(len(tag_names), min(500, sessions // 100))
+
+    courses = []
+    for course_id in range(1, course_count + 1):
+        title = course_titles[course_id % len(course_titles)]
+        if course_id > len(course_titles):
+            title = f"{title} {100 + course_id // len(course_titles)}"
+        courses.append({
+            "id": course_id,
+            "title": title,
+            "section": "ABCDEF"[course_id % 6],
+            "year": 2023 + course_id % 3,
+            "term": 1 + course_id % 3,
+            "professor_name": f"{professors[course_id % len(professors)]} {course_id // len(professors) or ''}".strip(),
+        })
+
+    locations = []
+    for location_id in range(1, location_count + 1):
+        address = addresses[location_id % len(addresses)]
+        if location_id > len(addresses) * 10:
+            address = f"{address} Annex {location_id // (len(addresses) * 10)}"
+        locations.append({"id": location_id, "address": address, "room_number": str(100 + location_id % 900)})
+
+    tags = [
+        {"id": tag_id, "tag_name": tag_names[tag_id - 1] if tag_id <= len(tag_names) else f"topic {tag_id}"}
+        for tag_id in range(1, tag_count + 1)
+    ]
+
+    my_sessions, join_sessions, session_tags, resources, reminders = [], [], [], [], []
+    for session_id in range(1, sessions + 1):
+        course = courses[rng.randrange(course_count)]
+        location = locations[rng.randrange(location_count)]
+        chill_level = rng.choice(CHILL_LEVELS)
+        start = START + timedelta(days=rng.randrange(180), hours=rng.randrange(14))
+        attendees = rng.randint(1, 30)
+        mine = rng.random() < my_share
+        organizer = "You" if mine else rng.choice(ATTENDEE_NAMES)
+        tag_ids = rng.sample(range(1, tag_count + 1), rng.randint(0, 3))
+        session = {
+            "id": session_id,
+            "course_id": course['id'],
+            "location_id": location['id'],
+            "title": f"{chill_level} {course['title']} - Section {course['section']}",
+            "location": f"{location['address']} - Room {location['room_number']}",
+            "time": start.strftime("%-I:%M %p"),
+            "attendees": attendees,
+            "max_attendees": attendees + rng.randint(0, 20),
+            "description": rng.choice(DESCRIPTIONS),
+            "organizer": organizer,
+            "chill_level": chill_level,
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=rng.choice((1, 2, 3)))).isoformat(),
+            "attendee_list": [f"{organizer} (Host)"] + rng.sample(ATTENDEE_NAMES, min(3, attendees - 1)),
+            "room_type_id": rng.choice(room_types)['id'],
+            "tag_ids": tag_ids,
+        }
+        (my_sessions if mine else join_sessions).append(session)
+        session_tags.extend({"session_id": session_id, "tag_id": tag_id} for tag_id in tag_ids)
+        if rng.random() < 0.3:
+            resources.append({
+                "id": len(resources) + 1,
+                "session_id": session_id,
+                "resource_name": f"Session {session_id} notes",
+                "resource_url": f"https://cdn.example.com/resources/session-{session_id}.pdf",
+                "updated_by": 0,
+            })
+        if rng.random() < 0.2:
+            reminders.append({
+                "id": len(reminders) + 1,
+                "session_id": session_id,
+                "user_id": rng.randrange(1, 1000),
+                "reminder_time": (start - timedelta(hours=12)).isoformat(),
+                "reminder_sent": start < datetime.now(),
+            })
+
+    return {
+        'my_sessions': my_sessions,
+        'join_sessions': join_sessions,
+        'courses': courses,
+        'locations': locations,
+        'room_types': room_types,
+        'tags': tags,
+        'session_tags': session_tags,
+        'resources': resources,
+        'reminders': reminders,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write JSON here instead of printing counts")
+    args = parser.parse_args()
+
+    data = generate(args.sessions, seed=args.seed)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out:
+            json.dump(data, out, ensure_ascii=False)
+    print(json.dumps({name: len(rows) for name, rows in data.items()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import re
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+_DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class BlobTooLarge(ValueError):
+    pass
+
+
+class BlobStore:
+    """Content-addressed file storage on local disk.
+
+    Uploads are streamed to a temporary file in fixed-size chunks while
+    being hashed, so memory use does not depend on the file size. The file
+    is then moved to a path derived from its SHA-256 digest; a file that is
+    already stored is simply dropped, so identical uploads share one copy.
+    """
+
+    def __init__(self, root, max_bytes, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self._tmp_dir, exist_ok=True)
+
+    def path(self, digest):
+        if not _DIGEST_PATTERN.match(digest or ''):
+            raise ValueError(f"Not a blob digest: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, stream):
+        """Store the contents of a file-like object; returns (digest, size, created).
+
+        Raises BlobTooLarge (and keeps nothing) once more than `max_bytes`
+        have been read.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise BlobTooLarge(f"File is larger than {self.max_bytes} bytes")
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+
+            digest = hasher.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+                return digest, size, False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp_path, 0o644)
+            # Atomic, so a concurrent upload of the same file is harmless
+            os.replace(tmp_path, path)
+            return digest, size, True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
@@ -0,0 +1,198 @@
+from datetime import timedelta
+
+from cow import CopyOnWrite
+
+# Sessions without a usable end time hold their room for this long
+DEFAULT_DURATION = timedelta(hours=1)
+
+
+def booking_interval(start, end):
+    """The [start, end) a session holds its room for, or None without a start."""
+    if start is None:
+        return None
+    if end is None or end <= start:
+        end = start + DEFAULT_DURATION
+    return start, end
+
+
+class BookingConflict(ValueError):
+    """A session would overlap other bookings of its room."""
+
+    def __init__(self, location_id, sessions):
+        super().__init__(f"Location {location_id} is already booked by sessions "
+                         f"{[session['id'] for session in sessions]}")
+        self.location_id = location_id
+        self.sessions = sessions
+
+
+class _Node:
+    """Immutable AVL node over (start, session_id) keys, augmented with the
+    latest end time in its subtree."""
+    __slots__ = ('start', 'session_id', 'end', 'left', 'right', 'height', 'max_end')
+
+    def __init__(self, start, session_id, end, left, right):
+        self.start = start
+        self.session_id = session_id
+        self.end = end
+        self.left = left
+        self.right = right
+        self.height = 1 + max(left.height if left else 0, right.height if right else 0)
+        max_end = end
+        if left is not None and left.max_end > max_end:
+            max_end = left.max_end
+        if right is not None and right.max_end > max_end:
+            max_end = right.max_end
+        self.max_end = max_end
+
+    def key(self):
+        return (self.start, self.session_id)
+
+    def with_children(self, left, right):
+        return _Node(self.start, self.session_id, self.end, left, right)
+
+
+def _height(node):
+    return node.height if node is not None else 0
+
+
+def _balance(node):
+    lean = _height(node.left) - _height(node.right)
+    if lean > 1:
+        left = node.left
+        if _height(left.left) < _height(left.right):
+            left = _rotate_left(left)
+        return _rotate_right(node.with_children(left, node.right))
+    if lean < -1:
+        right = node.right
+        if _height(right.right) < _height(right.left):
+            right = _rotate_right(right)
+        return _rotate_left(node.with_children(node.left, right))
+    return node
+
+
+def _rotate_left(node):
+    pivot = node.right
+    return pivot.with_children(node.with_children(node.left, pivot.left), pivot.right)
+
+
+def _rotate_right(node):
+    pivot = node.left
+    return pivot.with_children(pivot.left, node.with_children(pivot.right, node.right))
+
+
+def _insert(node, start, end, session_id):
+    if node is None:
+        return _Node(start, session_id, end, None, None)
+    if (start, session_id) < node.key():
+        return _balance(node.with_children(_insert(node.left, start, end, session_id), node.right))
+    return _balance(node.with_children(node.left, _insert(node.right, start, end, session_id)))
+
+
+def _remove(node, key):
+    if node is None:
+        return None
+    if key < node.key():
+        return _balance(node.with_children(_remove(node.left, key), node.right))
+    if key > node.key():
+        return _balance(node.with_children(node.left, _remove(node.right, key)))
+    if node.left is None:
+        return node.right
+    if node.right is None:
+        return node.left
+    successor = node.right
+    while successor.left is not None:
+        successor = successor.left
+    right = _remove(node.right, successor.key())
+    return _balance(_Node(successor.start, successor.session_id, successor.end, node.left, right))
+
+
+def _from_sorted(entries, low, high):
+    if low >= high:
+        return None
+    middle = (low + high) // 2
+    start, session_id, end = entries[middle]
+    return _Node(start, session_id, end, _from_sorted(entries, low, middle), _from_sorted(entries, middle + 1, high))
+
+
+def _overlapping(node, start, end, found):
+    # Skip subtrees whose bookings all end by `start`, and right subtrees
+    # whose bookings all begin at or after `end`
+    if node is None or node.max_end <= start:
+        return
+    _overlapping(node.left, start, end, found)
+    if node.start < end:
+        if node.end > start:
+            found.append((node.start, node.end, node.session_id))
+        _overlapping(node.right, start, end, found)
+
+
+class BookingIndex(CopyOnWrite):
+    """Per-location interval trees of session bookings.
+
+    Each location's bookings are an AVL tree keyed by start time, with each
+    node carrying the latest end in its subtree, so finding the bookings
+    that overlap a range costs O(log n + k). Nodes are immutable and
+    updates copy only the path from the root, so a draft shares all
+    untouched nodes with the published version.
+    """
+
+    def __init__(self):
+        self._roots = {}
+        self._bookings = {}
+
+    def __len__(self):
+        return len(self._bookings)
+
+    def add(self, location_id, session_id, start, end):
+        if session_id in self._bookings:
+            self.remove(session_id)
+        roots = self._own('_roots')
+        roots[location_id] = _insert(roots.get(location_id), start, end, session_id)
+        self._own('_bookings')[session_id] = (location_id, start)
+
+    def load(self, bookings):
+        """Index many bookings at once: (location_id, session_id, start, end) tuples."""
+        by_location = {}
+        own_bookings = self._own('_bookings')
+        for location_id, session_id, start, end in bookings:
+            by_location.setdefault(location_id, []).append((start, session_id, end))
+            own_bookings[session_id] = (location_id, start)
+        roots = self._own('_roots')
+        for location_id, entries in by_location.items():
+            if location_id in roots:
+                for start, session_id, end in entries:
+                    roots[location_id] = _insert(roots[location_id], start, end, session_id)
+                continue
+            entries.sort()
+            roots[location_id] = _from_sorted(entries, 0, len(entries))
+
+    def remove(self, session_id):
+        booking = self._own('_bookings').pop(session_id, None)
+        if booking is None:
+            return
+        location_id, start = booking
+        roots = self._own('_roots')
+        root = _remove(roots.get(location_id), (start, session_id))
+        if root is None:
+            roots.pop(location_id, None)
+        else:
+            roots[location_id] = root
+
+    def overlapping(self, location_id, start, end):
+        """(start, end, session_id) of the bookings that overlap [start, end), by start."""
+        found = []
+        _overlapping(self._roots.get(location_id), start, end, found)
+        return found
+
+    def free_slots(self, location_id, start, end):
+        """The gaps in [start, end) not covered by any booking, as (start, end) pairs."""
+        slots = []
+        cursor = start
+        for booked_start, booked_end, _ in self.overlapping(location_id, start, end):
+            if booked_start > cursor:
+                slots.append((cursor, booked_start))
+            if booked_end > cursor:
+                cursor = booked_end
+        if cursor < end:
+            slots.append((cursor, end))
+        return slots
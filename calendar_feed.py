@@ -0,0 +1,90 @@
+"""iCalendar (RFC 5545) feeds of study sessions, produced as a stream.
+
+`iter_calendar()` yields the feed in chunks while walking the sessions it
+is given, so a feed of any length is sent without building it in memory.
+Times are written as floating local times, the same wall-clock times the
+app shows.
+"""
+from datetime import timedelta, timezone
+
+PRODUCT_ID = "-//StudyVibes//Study Sessions//EN"
+EVENTS_PER_CHUNK = 100
+DEFAULT_DURATION = timedelta(hours=1)
+
+
+def iter_calendar(sessions, name, session_times, session_url, stamp):
+    """Yield an iCalendar document for `sessions` in chunks of text.
+
+    `session_times(session_id)` returns parsed (start, end) datetimes and
+    `session_url(session_id)` a link to the session page. `stamp` is the
+    aware datetime written as every event's DTSTAMP.
+    """
+    dtstamp = stamp.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield _lines([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODUCT_ID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ])
+    chunk = []
+    events = 0
+    for session in sessions:
+        start, end = session_times(session['id'])
+        if start is None:
+            continue
+        chunk.extend(event_lines(session, start, end or start + DEFAULT_DURATION, dtstamp, session_url(session['id'])))
+        events += 1
+        if events % EVENTS_PER_CHUNK == 0:
+            yield _lines(chunk)
+            chunk = []
+    chunk.append("END:VCALENDAR")
+    yield _lines(chunk)
+
+
+def event_lines(session, start, end, dtstamp, url):
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:session-{session['id']}@studyvibes",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+        f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+        f"SUMMARY:{escape_text(session.get('title') or 'Study session')}",
+    ]
+    if session.get('location'):
+        lines.append(f"LOCATION:{escape_text(session['location'])}")
+    if session.get('description'):
+        lines.append(f"DESCRIPTION:{escape_text(session['description'])}")
+    if session.get('organizer'):
+        lines.append(f"X-STUDYVIBES-ORGANIZER:{escape_text(session['organizer'])}")
+    lines.append(f"URL:{url}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def escape_text(value):
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line, limit=75):
+    """Split a content line into CRLF-joined pieces of at most `limit` octets."""
+    if len(line) * 4 <= limit or len(line.encode('utf-8')) <= limit:
+        return line
+    pieces = []
+    current, size = [], 0
+    for char in line:
+        width = len(char.encode('utf-8'))
+        # Continuation lines start with a space, which counts towards the limit
+        if size + width > (limit if not pieces else limit - 1):
+            pieces.append("".join(current))
+            current, size = [], 0
+        current.append(char)
+        size += width
+    pieces.append("".join(current))
+    return "\r\n ".join(pieces)
+
+
+def _lines(lines):
+    return "".join(fold(line) + "\r\n" for line in lines)
@@ -8,7 +8,130 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///chill_study.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_pre_ping': True,
+    }
+    # Set PERSISTENCE_ENABLED=0 to run purely on the in-memory sample data
+    PERSISTENCE_ENABLED = os.environ.get('PERSISTENCE_ENABLED', '1') != '0'
+    # Multi-process mode: worker processes share the database (a file or
+    # server they can all open) and keep their in-memory stores as read
+    # caches of it, catching up with each other's writes before each request
+    SHARED_STORE_ENABLED = os.environ.get('SHARED_STORE_ENABLED') == '1'
+    # Write batches kept for other workers to replay; a worker further behind reloads everything
+    SHARED_STORE_LOG_SIZE = 1000
+    # Seconds between catch-ups from a background thread, so live updates and
+    # reminders follow other workers' writes between requests; 0 turns it off
+    SHARED_STORE_POLL_INTERVAL = 1.0
     
     # Session configuration
     SESSION_TYPE = 'filesystem'
-    PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
\ No newline at end of file
+    PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
+    
+    # Autocomplete configuration
+    SEARCH_DEFAULT_LIMIT = 10
+    SEARCH_MAX_LIMIT = 50
+    
+    # Dashboard session list pagination
+    SESSIONS_PAGE_SIZE = 20
+    SESSIONS_MAX_PAGE_SIZE = 100
+    # Sessions in the dashboard's "Recommended for you" section
+    RECOMMENDATIONS_LIMIT = 4
+    
+    # Rendered fragment cache (session cards, session pages, dashboard); 0 disables it
+    FRAGMENT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    
+    # Conditional GET and compression of pages and JSON (brotli when installed, else gzip)
+    COMPRESSION_MIN_BYTES = 1024
+    COMPRESSION_LEVEL = 6
+    COMPRESSED_CACHE_MAX_BYTES = 16 * 1024 * 1024
+    
+    # Single-flight cache of GET API results (autocomplete, session lists); 0 disables it
+    RESULT_CACHE_MAX_ENTRIES = 10000
+    RESULT_CACHE_TTL = 30  # seconds
+    
+    # Largest body accepted by the /api/courses/bulk and /api/locations/bulk imports
+    BULK_IMPORT_MAX_BYTES = 64 * 1024 * 1024
+    
+    # What create_session does when a location is already booked for the
+    # requested time: 'reject' the session or 'warn' and create it anyway
+    BOOKING_CONFLICTS = os.environ.get('BOOKING_CONFLICTS', 'reject')
+    # Hours of the day /api/locations/<id>/availability reports free slots for
+    LOCATION_OPEN_HOUR = 7
+    LOCATION_CLOSE_HOUR = 23
+    
+    # Uploaded session resources (content-addressed files on local disk)
+    RESOURCE_STORAGE_DIR = os.environ.get('RESOURCE_STORAGE_DIR') or \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+    RESOURCE_MAX_BYTES = 25 * 1024 * 1024
+    # Leaves room for the other form fields sent with an upload
+    MAX_CONTENT_LENGTH = RESOURCE_MAX_BYTES + 1024 * 1024
+    RESOURCE_CACHE_MAX_AGE = 24 * 3600
+    # Full-text search of resource contents at /api/resources/search; text is
+    # extracted and indexed by a background worker pool
+    RESOURCE_INDEX_ENABLED = os.environ.get('RESOURCE_INDEX_ENABLED', '1') != '0'
+    RESOURCE_INDEX_WORKERS = int(os.environ.get('RESOURCE_INDEX_WORKERS', 2))
+    # Text beyond this many characters of a file is not indexed
+    RESOURCE_INDEX_MAX_CHARS = 1000000
+    # Let a fronting nginx/Apache send files (X-Sendfile) instead of the app
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE') == '1'
+    
+    # Reminder dispatch; REMINDER_SENDER is 'log' or 'file' (JSON lines in REMINDER_OUTBOX_PATH)
+    REMINDERS_ENABLED = os.environ.get('REMINDERS_ENABLED', '1') != '0'
+    REMINDER_SENDER = os.environ.get('REMINDER_SENDER', 'log')
+    REMINDER_OUTBOX_PATH = os.environ.get('REMINDER_OUTBOX_PATH') or 'reminder_outbox.jsonl'
+    REMINDER_BATCH_SIZE = 100
+    
+    # Server-Sent Events at /events for live dashboard updates
+    LIVE_UPDATES_ENABLED = os.environ.get('LIVE_UPDATES_ENABLED', '1') != '0'
+    LIVE_UPDATES_MAX_CLIENTS = int(os.environ.get('LIVE_UPDATES_MAX_CLIENTS', 5000))
+    # Events a client may fall behind by before it is dropped
+    LIVE_UPDATES_QUEUE_SIZE = 64
+    LIVE_UPDATES_HISTORY = 256
+    LIVE_UPDATES_HEARTBEAT = 15  # seconds
+    
+    # Admission control: token buckets per endpoint (a global rate and a
+    # per-client rate, in requests a second, each with a burst), answered
+    # with 429 and Retry-After when empty
+    ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', '1') != '0'
+    RATE_LIMITS = {
+        'get_courses': {'rate': 500, 'burst': 1000, 'client_rate': 20, 'client_burst': 40},
+        'get_locations': {'rate': 500, 'burst': 1000, 'client_rate': 20, 'client_burst': 40},
+        'create_course': {'rate': 50, 'burst': 100, 'client_rate': 2, 'client_burst': 10},
+        'create_location': {'rate': 50, 'burst': 100, 'client_rate': 2, 'client_burst': 10},
+        'create_session': {'rate': 50, 'burst': 100, 'client_rate': 1, 'client_burst': 5, 'methods': ('POST',)},
+    }
+    # Client buckets kept at once; the least recently seen client is dropped first
+    RATE_LIMIT_MAX_CLIENTS = 10000
+    # Load shedding: at most this many requests are handled at once (0 turns
+    # it off). Others wait for a slot up to the target delay and are answered
+    # with 503 past it; after that, requests finding no free slot are shed
+    # at once for LOAD_SHEDDING_INTERVAL seconds.
+    LOAD_SHEDDING_MAX_CONCURRENCY = int(os.environ.get('LOAD_SHEDDING_MAX_CONCURRENCY', 32))
+    LOAD_SHEDDING_TARGET_DELAY = 0.05  # seconds
+    LOAD_SHEDDING_INTERVAL = 1.0  # seconds
+    # Long-lived and monitoring endpoints never wait for a slot
+    LOAD_SHEDDING_EXEMPT = ('static', 'built_asset', 'live_events', 'show_metrics', 'download_resource')
+    
+    # Output of `python -m static_assets`: content-hashed, precompressed copies
+    # of static/ served from /assets/ as immutable; without a build, templates
+    # fall back to the plain /static URLs
+    STATIC_BUILD_DIR = os.environ.get('STATIC_BUILD_DIR') or \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build', 'static')
+    
+    # Instrumentation: latency histograms at /metrics, an opt-in Server-Timing
+    # header, and a sampling profiler for requests sent with PROFILE_HEADER
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED') == '1'
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED') == '1'
+    PROFILE_HEADER = 'X-Debug-Profile'
+    PROFILE_INTERVAL = 0.001
+    PROFILE_HISTORY = 20
+    
+    # Cold start: on-disk Jinja bytecode cache ('' disables it), compiling every
+    # template at startup, and a saved data snapshot reused while its source is unchanged
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR',
+                                        os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'jinja'))
+    PRECOMPILE_TEMPLATES = os.environ.get('PRECOMPILE_TEMPLATES') == '1'
+    DATA_SNAPSHOT_PATH = os.environ.get('DATA_SNAPSHOT_PATH')
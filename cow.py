@@ -0,0 +1,80 @@
+import copy
+
+
+class CopyOnWrite:
+    """Mixin for structures that are published to lock-free readers.
+
+    A published instance is never modified. A writer calls `begin_write()`
+    to get a draft: a shallow copy that shares every container with the
+    published version. Mutations go through `_own()` / `_own_entry()`,
+    which copy a container (dict, set, list, or anything with `.copy()`)
+    the first time it is touched in this draft and reuse that copy after
+    that, so a batch of changes pays for each copy once. `end_write()`
+    freezes the draft so it can be published by swapping a reference.
+
+    Attributes named in `_cow_children` are nested CopyOnWrite structures;
+    they start their own draft the first time `_own_child()` touches them.
+    """
+
+    _cow_children = ()
+    _owned = None
+
+    def begin_write(self):
+        draft = copy.copy(self)
+        # Keep owned objects alive for the whole batch so their ids stay unique
+        draft._owned = {}
+        return draft
+
+    def end_write(self):
+        for name in self._cow_children:
+            child = getattr(self, name)
+            if child._owned is not None:
+                child.end_write()
+        self._owned = None
+
+    @property
+    def writable(self):
+        return self._owned is not None
+
+    def _adopt(self, obj):
+        self._owned[id(obj)] = obj
+        return obj
+
+    def _writable(self, obj):
+        owned = self._owned
+        if owned is None:
+            raise RuntimeError("Published data is read-only; call begin_write() first")
+        if id(obj) in owned:
+            return obj
+        return self._adopt(obj.copy())
+
+    # _own() and _own_entry() run for every indexed value during bulk loads,
+    # so the already-owned case is checked inline before calling _writable()
+
+    def _own(self, name):
+        obj = getattr(self, name)
+        owned = self._owned
+        if owned is None or id(obj) not in owned:
+            obj = self._writable(obj)
+            setattr(self, name, obj)
+        return obj
+
+    def _own_entry(self, table_name, key, factory):
+        table = self._own(table_name)
+        owned = self._owned
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = factory()
+            owned[id(entry)] = entry
+        elif id(entry) not in owned:
+            entry = table[key] = self._adopt(entry.copy())
+        return entry
+
+    def _own_child(self, name):
+        if self._owned is None:
+            raise RuntimeError("Published data is read-only; call begin_write() first")
+        child = getattr(self, name)
+        if child._owned is None:
+            child = child.begin_write()
+            setattr(self, name, child)
+        return child
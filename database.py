@@ -0,0 +1,438 @@
+from sqlalchemy import (
+    JSON, Boolean, Column, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    case, create_engine, delete, event, func, insert, select, update,
+)
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.pool import StaticPool
+
+metadata = MetaData()
+
+course_offerings_table = Table(
+    'course_offerings', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(100), nullable=False),
+    Column('section', String(20), nullable=False),
+    Column('year', Integer, nullable=False),
+    Column('term', Integer, nullable=False),
+    Column('professor_name', String(50), nullable=False),
+    Index('ix_course_offerings_title', 'title'),
+)
+
+locations_table = Table(
+    'locations', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('address', String(100), nullable=False),
+    Column('room_number', String(20), nullable=False),
+    Index('ix_locations_address', 'address'),
+)
+
+room_types_table = Table(
+    'room_types', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('type_name', String(50), nullable=False),
+    Column('description', Text),
+)
+
+tags_table = Table(
+    'tags', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('tag_name', String(50), nullable=False),
+)
+
+sessions_table = Table(
+    'sessions', metadata,
+    Column('id', Integer, primary_key=True),
+    # 'mine' and 'join' match the dashboard sections; 'left' rows are kept for history
+    Column('scope', String(10), nullable=False, default='join'),
+    Column('course_id', Integer, ForeignKey('course_offerings.id')),
+    Column('location_id', Integer, ForeignKey('locations.id')),
+    Column('room_type_id', Integer, ForeignKey('room_types.id')),
+    Column('title', String(200)),
+    Column('location', String(200)),
+    Column('time', String(50)),
+    Column('start_time', String(32)),
+    Column('end_time', String(32)),
+    Column('attendees', Integer),
+    Column('max_attendees', Integer),
+    Column('attendee_list', JSON),
+    Column('description', Text),
+    Column('notes', Text),
+    Column('organizer', String(100)),
+    Column('chill_level', String(8)),
+    Column('professor_name', String(50)),
+    Column('year', Integer),
+    Column('term', Integer),
+    Column('section', String(20)),
+    # Any other keys of the session record round-trip through here
+    Column('extra', JSON),
+    Index('ix_sessions_scope', 'scope'),
+    Index('ix_sessions_course_id', 'course_id'),
+    Index('ix_sessions_location_start', 'location_id', 'start_time'),
+    Index('ix_sessions_start_time', 'start_time'),
+)
+
+session_tags_table = Table(
+    'session_tags', metadata,
+    Column('session_id', Integer, ForeignKey('sessions.id'), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True),
+    Index('ix_session_tags_tag_id', 'tag_id'),
+)
+
+resources_table = Table(
+    'resources', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('session_id', Integer, ForeignKey('sessions.id'), nullable=False),
+    Column('resource_name', String(255), nullable=False),
+    Column('resource_url', String(500)),
+    Column('updated_by', Integer),
+    Column('extra', JSON),
+    Index('ix_resources_session_id', 'session_id'),
+)
+
+reminders_table = Table(
+    'reminders', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('session_id', Integer, ForeignKey('sessions.id'), nullable=False),
+    Column('user_id', Integer),
+    Column('reminder_time', String(32)),
+    Column('reminder_sent', Boolean, nullable=False, default=False),
+    Index('ix_reminders_session_id', 'session_id'),
+    Index('ix_reminders_pending', 'reminder_sent', 'reminder_time'),
+)
+
+id_sequences_table = Table(
+    'id_sequences', metadata,
+    Column('entity', String(32), primary_key=True),
+    Column('next_id', Integer, nullable=False),
+)
+
+# Global counters such as 'data_version', bumped by every committed batch of writes
+store_meta_table = Table(
+    'store_meta', metadata,
+    Column('key', String(32), primary_key=True),
+    Column('value', Integer, nullable=False),
+)
+
+# Each batch a shared store committed (see DataStore.refresh), keyed by the
+# data_version it produced, so other processes can replay it
+change_log_table = Table(
+    'change_log', metadata,
+    Column('version', Integer, primary_key=True),
+    Column('operations', JSON, nullable=False),
+)
+
+SESSION_COLUMNS = tuple(column.name for column in sessions_table.columns if column.name not in ('scope', 'extra'))
+RESOURCE_COLUMNS = tuple(column.name for column in resources_table.columns if column.name != 'extra')
+# Session keys derived from the link tables rather than stored on the row
+DERIVED_SESSION_KEYS = ('tag_ids', 'resource_ids', 'reminder_ids')
+
+
+def is_memory_uri(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:')
+
+
+def _enable_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a writer commits
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+class Database:
+    """Relational storage for the data store, built on SQLAlchemy Core.
+
+    The DataStore stays the read path; this class loads it at startup with
+    one query per table and applies each batch of store mutations in a
+    single transaction.
+
+    Stores in several processes can share one database: each batch is then
+    committed only on top of the version its store has caught up to, and
+    recorded in a change log (the last `change_log_size` batches) from
+    which the other stores replay it.
+    """
+
+    def __init__(self, uri, engine_options=None, change_log_size=1000):
+        self.uri = uri
+        self.change_log_size = change_log_size
+        options = dict(engine_options or {})
+        if is_memory_uri(uri):
+            # One shared connection, otherwise every pooled connection would
+            # see its own empty in-memory database
+            options = {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+        self.engine = create_engine(uri, **options)
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine, 'connect', _enable_sqlite_pragmas)
+
+    def create_all(self):
+        # Workers starting together race to create the schema: a create fails
+        # when another worker made that table or index after the check, so
+        # try again until a pass finds everything in place
+        attempts = len(metadata.tables) + sum(len(table.indexes) for table in metadata.tables.values())
+        for attempt in range(attempts):
+            try:
+                metadata.create_all(self.engine)
+                break
+            except OperationalError:
+                if attempt == attempts - 1:
+                    raise
+        try:
+            with self.engine.begin() as conn:
+                if conn.execute(select(store_meta_table.c.value).where(store_meta_table.c.key == 'data_version')).first() is None:
+                    conn.execute(insert(store_meta_table).values(key='data_version', value=0))
+        except IntegrityError:
+            pass  # Another worker inserted it first
+
+    def data_version(self):
+        """Counter bumped by every committed write; cheap to poll for changes.
+
+        Shared stores poll it before every request, so this skips
+        SQLAlchemy's statement layer for one plain DB-API query, about an
+        eighth of the cost.
+        """
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT value FROM store_meta WHERE key = 'data_version'")
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+        return (row[0] if row else None) or 0
+
+    def dispose(self):
+        self.engine.dispose()
+
+    def is_empty(self):
+        with self.engine.connect() as conn:
+            return _is_empty(conn)
+
+    def seed(self, my_sessions=(), join_sessions=(), courses=(), locations=(), room_types=(),
+             tags=(), session_tags=(), resources=(), reminders=()):
+        """Bulk insert a full data set (the same shape DataStore.load takes).
+
+        Does nothing, and returns False, if the database already has data,
+        so workers starting together on an empty database seed it once.
+        """
+        with self.engine.connect() as conn, conn.begin() as transaction:
+            # Bumping the version first takes the write lock before the check
+            _bump_data_version(conn)
+            if not _is_empty(conn):
+                transaction.rollback()
+                return False
+            for table, rows in ((course_offerings_table, courses), (locations_table, locations),
+                                (room_types_table, room_types), (tags_table, tags)):
+                rows = list(rows)
+                if rows:
+                    conn.execute(insert(table), rows)
+            session_rows = [session_row(session, 'mine') for session in my_sessions] + \
+                [session_row(session, 'join') for session in join_sessions]
+            if session_rows:
+                conn.execute(insert(sessions_table), session_rows)
+            links = list(session_tags)
+            if links:
+                conn.execute(insert(session_tags_table), links)
+            resource_rows = [resource_row(resource) for resource in resources]
+            if resource_rows:
+                conn.execute(insert(resources_table), resource_rows)
+            reminder_rows = list(reminders)
+            if reminder_rows:
+                conn.execute(insert(reminders_table), reminder_rows)
+        return True
+
+    def load_all(self):
+        """Read every live row, one query per table; returns DataStore.load kwargs."""
+        with self.engine.connect() as conn:
+            data = {
+                'courses': _fetch(conn, course_offerings_table),
+                'locations': _fetch(conn, locations_table),
+                'room_types': _fetch(conn, room_types_table),
+                'tags': _fetch(conn, tags_table),
+                'my_sessions': [],
+                'join_sessions': [],
+            }
+            live = sessions_table.c.scope != 'left'
+            for row in conn.execute(select(sessions_table).where(live).order_by(sessions_table.c.id)).mappings():
+                key = 'my_sessions' if row['scope'] == 'mine' else 'join_sessions'
+                data[key].append(session_record(row))
+            data['session_tags'] = _fetch(conn, session_tags_table)
+            data['resources'] = [resource_record(row) for row in _fetch(conn, resources_table)]
+            data['reminders'] = _fetch(conn, reminders_table)
+        return data
+
+    def load_versioned(self):
+        """load_all() and the data version it reflects.
+
+        The tables are read one query at a time, so the load is retried
+        until no write commits while it runs.
+        """
+        version = self.data_version()
+        while True:
+            data = self.load_all()
+            current = self.data_version()
+            if current == version:
+                return data, version
+            version = current
+
+    def changes_since(self, version):
+        """The batches committed after `version`, as [(version, operations)], oldest first.
+
+        None when the change log no longer holds all of them (older ones
+        are pruned, and writes from a store that does not share the
+        database are not logged); the caller then has to reload.
+        """
+        with self.engine.connect() as conn:
+            current = _data_version(conn)
+            rows = conn.execute(
+                select(change_log_table)
+                .where(change_log_table.c.version > version, change_log_table.c.version <= current)
+                .order_by(change_log_table.c.version)
+            ).all()
+        if [row.version for row in rows] != list(range(version + 1, current + 1)):
+            return None
+        return [(row.version, row.operations) for row in rows]
+
+    def allocate_ids(self, entity, floor, count):
+        """Durably reserve `count` ids for `entity`, none below `floor`; returns the first."""
+        with self.engine.begin() as conn:
+            stored = conn.execute(
+                update(id_sequences_table)
+                .where(id_sequences_table.c.entity == entity)
+                # Not max(next_id, floor): a two-argument max is SQLite-only
+                .values(next_id=case((id_sequences_table.c.next_id < floor, floor),
+                                     else_=id_sequences_table.c.next_id) + count)
+                .returning(id_sequences_table.c.next_id)
+            ).scalar()
+            if stored is None:
+                conn.execute(insert(id_sequences_table).values(entity=entity, next_id=floor + count))
+                stored = floor + count
+        return stored - count
+
+    def apply(self, operations, base_version=None):
+        """Apply a batch of (operation, payload) store mutations in one transaction.
+
+        With `base_version`, the data version the batch was drafted against,
+        it is added to the change log, and commits only if nothing else has
+        since; otherwise nothing is written and False is returned.
+        """
+        if not operations:
+            return True
+        # update_session writes the whole row, so only the last one per session counts
+        last_update = {}
+        for position, (operation, payload) in enumerate(operations):
+            if operation == 'update_session':
+                last_update[payload[0]['id']] = position
+        with self.engine.begin() as conn:
+            # Bumping the version first takes the write lock, so no other
+            # write can commit between the check and this one
+            if not _bump_data_version(conn, base_version):
+                return False
+            if base_version is not None:
+                version = base_version + 1
+                conn.execute(insert(change_log_table).values(version=version, operations=operations))
+                conn.execute(delete(change_log_table).where(change_log_table.c.version <= version - self.change_log_size))
+            for position, (operation, payload) in enumerate(operations):
+                if operation == 'update_session' and last_update[payload[0]['id']] != position:
+                    continue
+                getattr(self, '_apply_' + operation)(conn, payload)
+        return True
+
+    def _apply_add_session(self, conn, payload):
+        session, scope, tag_ids = payload
+        conn.execute(insert(sessions_table).values(**session_row(session, scope)))
+        if tag_ids:
+            conn.execute(insert(session_tags_table), [
+                {'session_id': session['id'], 'tag_id': tag_id} for tag_id in tag_ids
+            ])
+
+    def _apply_add_resource(self, conn, resource):
+        conn.execute(insert(resources_table).values(**resource_row(resource)))
+
+    def _apply_add_reminder(self, conn, reminder):
+        conn.execute(insert(reminders_table).values(**reminder))
+
+    def _apply_add_course(self, conn, course):
+        conn.execute(insert(course_offerings_table).values(**course))
+
+    def _apply_add_location(self, conn, location):
+        conn.execute(insert(locations_table).values(**location))
+
+    def _apply_add_courses(self, conn, courses):
+        conn.execute(insert(course_offerings_table), courses)
+
+    def _apply_add_locations(self, conn, locations):
+        conn.execute(insert(locations_table), locations)
+
+    def _apply_update_session(self, conn, payload):
+        session, scope = payload
+        conn.execute(
+            update(sessions_table).where(sessions_table.c.id == session['id']).values(**session_row(session, scope))
+        )
+
+    def _apply_leave_session(self, conn, session_id):
+        conn.execute(update(sessions_table).where(sessions_table.c.id == session_id).values(scope='left'))
+
+    def _apply_mark_reminders_sent(self, conn, reminder_ids):
+        conn.execute(
+            update(reminders_table)
+            .where(reminders_table.c.id.in_(reminder_ids), reminders_table.c.reminder_sent.is_(False))
+            .values(reminder_sent=True)
+        )
+
+
+def _data_version(conn):
+    return conn.execute(
+        select(store_meta_table.c.value).where(store_meta_table.c.key == 'data_version')
+    ).scalar() or 0
+
+
+def _bump_data_version(conn, expected=None):
+    """Increment the data version, only from `expected` when given; returns whether it did."""
+    statement = update(store_meta_table).where(store_meta_table.c.key == 'data_version')
+    if expected is not None:
+        statement = statement.where(store_meta_table.c.value == expected)
+    return conn.execute(statement.values(value=store_meta_table.c.value + 1)).rowcount == 1
+
+
+def _is_empty(conn):
+    return conn.execute(select(func.count()).select_from(sessions_table)).scalar() == 0 and \
+        conn.execute(select(func.count()).select_from(course_offerings_table)).scalar() == 0
+
+
+def _fetch(conn, table):
+    return [dict(row) for row in conn.execute(select(table).order_by(*table.primary_key.columns)).mappings()]
+
+
+def session_row(session, scope):
+    row = {key: session.get(key) for key in SESSION_COLUMNS}
+    extra = {
+        key: value for key, value in session.items()
+        if key not in SESSION_COLUMNS and key not in DERIVED_SESSION_KEYS
+    }
+    row['scope'] = scope
+    row['extra'] = extra or None
+    return row
+
+
+def session_record(row):
+    # Leave out NULL columns so records keep the sparse shape the routes expect
+    record = {key: row[key] for key in SESSION_COLUMNS if row[key] is not None}
+    if row['extra']:
+        record.update(row['extra'])
+    return record
+
+
+def resource_row(resource):
+    row = {key: resource.get(key) for key in RESOURCE_COLUMNS}
+    extra = {key: value for key, value in resource.items() if key not in RESOURCE_COLUMNS}
+    row['extra'] = extra or None
+    return row
+
+
+def resource_record(row):
+    record = {key: row[key] for key in RESOURCE_COLUMNS}
+    if row['extra']:
+        record.update(row['extra'])
+    return record
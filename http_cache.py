@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+from datetime import datetime, timezone
+
+from flask import Response, request
+
+from fragment_cache import FragmentCache
+
+try:
+    import brotli
+except ImportError:  # Optional; responses fall back to gzip without it
+    brotli = None
+
+ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+
+
+def make_etag(*parts):
+    """Opaque ETag for a response built from `parts` (data versions, arguments)."""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+
+class ConditionalResponder:
+    """Builds cacheable responses: validators, 304s and compressed bodies.
+
+    Responses carry an ETag derived from the data versions they were built
+    from plus a Last-Modified time, and `Cache-Control: no-cache` so
+    clients revalidate instead of refetching. Bodies of at least
+    `min_size` bytes are compressed with brotli (when installed) or gzip,
+    and each compressed body is kept in an LRU keyed by ETag and encoding,
+    so a repeat request never compresses the same bytes twice.
+    """
+
+    def __init__(self, max_bytes, min_size=1024, level=6):
+        self.min_size = min_size
+        self.level = level
+        self.bodies = FragmentCache(max_bytes)
+
+    def not_modified(self, etag, last_modified):
+        """A 304 response if the client's copy is current, else None."""
+        encoding = None
+        if request.if_none_match:
+            # Any encoded variant of the same ETag is still current; answer
+            # with the variant the client holds
+            for encoding in (None, 'br', 'gzip'):
+                if request.if_none_match.contains(etag + ENCODING_SUFFIXES.get(encoding, '')):
+                    break
+            else:
+                return None
+        elif not (request.if_modified_since and last_modified is not None and
+                  int(last_modified) <= request.if_modified_since.timestamp()):
+            return None
+        response = Response(status=304)
+        self._set_validators(response, etag, last_modified, encoding)
+        return response
+
+    def respond(self, body, etag, last_modified=None, mimetype='text/html'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        encoding = self._choose_encoding(len(body))
+        if encoding is not None:
+            key = (etag, encoding)
+            compressed = self.bodies.get(key)
+            if compressed is None:
+                compressed = self._compress(body, encoding)
+                self.bodies.set(key, compressed)
+            body = compressed
+
+        response = Response(body, mimetype=mimetype)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        self._set_validators(response, etag, last_modified, encoding)
+        return response
+
+    def stats(self):
+        return self.bodies.stats()
+
+    def _choose_encoding(self, size):
+        if size < self.min_size:
+            return None
+        offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+        return request.accept_encodings.best_match(offered)
+
+    def _compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=min(self.level, 11))
+        return gzip.compress(body, compresslevel=self.level)
+
+    def _set_validators(self, response, etag, last_modified, encoding):
+        response.set_etag(etag + ENCODING_SUFFIXES.get(encoding, ''))
+        if last_modified is not None:
+            response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+        response.cache_control.no_cache = True
+        response.vary.add('Accept-Encoding')
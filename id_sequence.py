@@ -0,0 +1,48 @@
+import threading
+
+
+class IdSequence:
+    """Monotonic, thread-safe id counters, one per entity type.
+
+    Allocation is O(1) and never hands out the same id twice, even when
+    several request threads insert at once.
+
+    With an `allocator` (see Database.allocate_ids) ids are handed out
+    from blocks reserved in durable storage, hi/lo style: one storage
+    round trip per `block_size` ids, and ids are never reused after a
+    restart even if the rows that used them are gone.
+    """
+
+    def __init__(self, allocator=None, block_size=100):
+        self._lock = threading.Lock()
+        self._next = {}
+        self._ceiling = {}
+        self._allocator = allocator
+        self.block_size = block_size
+
+    def seed(self, entity, current_max):
+        """Make sure the next id for `entity` is above `current_max`."""
+        with self._lock:
+            floor = (current_max or 0) + 1
+            if self._next.get(entity, 1) < floor:
+                self._next[entity] = floor
+
+    def next_id(self, entity):
+        return self.reserve(entity, 1)[0]
+
+    def reserve(self, entity, count):
+        """Atomically reserve `count` consecutive ids; returns them as a range."""
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        with self._lock:
+            start = self._next.get(entity, 1)
+            if self._allocator is not None and start + count > self._ceiling.get(entity, 0):
+                block = max(count, self.block_size)
+                start = self._allocator(entity, start, block)
+                self._ceiling[entity] = start + block
+            self._next[entity] = start + count
+        return range(start, start + count)
+
+    def peek(self, entity):
+        with self._lock:
+            return self._next.get(entity, 1)
@@ -0,0 +1,139 @@
+"""Incremental parsing of large JSON request bodies.
+
+`iter_json_records(stream)` reads a body in chunks and yields one record
+at a time, so an import of many rows never holds the raw body and the
+fully decoded document in memory at once. Two layouts are accepted and
+told apart by the first non-blank character:
+
+    [{"title": ...}, {"title": ...}]        a JSON array of records
+    {"title": ...}\\n{"title": ...}\\n        newline-delimited JSON (NDJSON)
+
+Records are yielded as `(row, value, error)`, with `row` counting from 1
+and `error` a message when the row could not be parsed. A malformed NDJSON
+line only fails that row; in an array the parser cannot find the next
+record after a syntax error, so the error is reported once and parsing
+stops.
+"""
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+class JSONStreamError(ValueError):
+    """The body is neither a JSON array nor newline-delimited JSON."""
+
+
+def iter_json_records(stream, chunk_size=CHUNK_SIZE):
+    chunks = _iter_text(stream, chunk_size)
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        if buffer.strip():
+            break
+    else:
+        raise JSONStreamError('Request body is empty')
+
+    buffer = buffer.lstrip()
+    if buffer.startswith('['):
+        return _iter_array(chunks, buffer, 1)
+    return _iter_lines(chunks, buffer)
+
+
+def _iter_text(stream, chunk_size):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')('replace')
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+def _iter_lines(chunks, buffer):
+    row = 0
+    pending = buffer
+    for chunk in _with_end(chunks):
+        if chunk is None:
+            lines, pending = [pending], ''
+        else:
+            pending += chunk
+            lines = pending.split('\n')
+            pending = lines.pop()
+        for line in lines:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                yield row, json.loads(line), None
+            except ValueError as error:
+                yield row, None, f'Invalid JSON: {error.msg}'
+
+
+def _iter_array(chunks, buffer, pos):
+    row = 0
+    expect_value = True
+    at_end = False
+    while True:
+        pos = _whitespace.match(buffer, pos).end()
+        if pos == len(buffer):
+            if at_end:
+                yield row + 1, None, 'Invalid JSON: unexpected end of array'
+                return
+            buffer, pos, at_end = _refill(chunks, buffer, pos)
+            continue
+
+        char = buffer[pos]
+        if char == ']' and (not expect_value or row == 0):
+            if buffer[pos + 1:].strip() or any(chunk.strip() for chunk in chunks):
+                yield row + 1, None, 'Invalid JSON: extra data after the array'
+            return
+        if not expect_value:
+            if char != ',':
+                yield row + 1, None, "Invalid JSON: expecting ',' between records"
+                return
+            pos += 1
+            expect_value = True
+            continue
+
+        try:
+            value, end = _decoder.raw_decode(buffer, pos)
+        except ValueError as error:
+            if at_end or not _maybe_truncated(error, buffer):
+                yield row + 1, None, f'Invalid JSON: {error.msg}'
+                return
+            buffer, pos, at_end = _refill(chunks, buffer, pos)
+            continue
+        # A number may continue in the next chunk
+        if end == len(buffer) and not at_end:
+            buffer, pos, at_end = _refill(chunks, buffer, pos)
+            continue
+
+        row += 1
+        yield row, value, None
+        pos = end
+        expect_value = False
+
+
+def _maybe_truncated(error, buffer):
+    """Whether a decode error could be the record running past the buffer."""
+    # Truncated records fail within a token of the end (or in an open string);
+    # anything earlier is a real syntax error, however much more is read
+    return error.pos >= len(buffer) - 32 or error.msg.startswith('Unterminated string')
+
+
+def _refill(chunks, buffer, pos):
+    """Drop the consumed part of `buffer` and append the next chunk."""
+    chunk = next(chunks, None)
+    if chunk is None:
+        return buffer[pos:], 0, True
+    return buffer[pos:] + chunk, 0, False
+
+
+def _with_end(chunks):
+    yield from chunks
+    yield None
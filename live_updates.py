@@ -0,0 +1,224 @@
+import json
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Store changes that dashboards show, and the event each becomes
+SESSION_EVENTS = {
+    'add_session': 'session_created',
+    'update_session': 'attendees_changed',
+    'leave_session': 'session_left',
+}
+
+
+def session_events(snapshot, changes):
+    """Translate one published batch of store changes into (event, data) deltas."""
+    events = []
+    for operation, payload in changes:
+        event = SESSION_EVENTS.get(operation)
+        if event is None:
+            continue
+        if operation == 'leave_session':
+            events.append((event, {'id': payload}))
+            continue
+        session = payload[0]
+        events.append((event, {
+            'id': session['id'],
+            'scope': 'mine' if session['id'] in snapshot.my_session_ids else 'join',
+            'attendees': session.get('attendees'),
+            'max_attendees': session.get('max_attendees'),
+            'waitlist': len(session.get('waitlist', ())),
+        }))
+    return events
+
+
+def format_event(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+class Subscriber:
+    __slots__ = ('queue', 'max_queue', 'closed', 'ready', 'start_id')
+
+    def __init__(self, max_queue):
+        self.start_id = None
+        self.queue = deque()
+        self.max_queue = max_queue
+        self.closed = False
+        self.ready = threading.Condition(threading.Lock())
+
+    def offer(self, message):
+        """Queue `message`; returns False (and closes) if the client has fallen behind."""
+        with self.ready:
+            if self.closed:
+                return False
+            if len(self.queue) >= self.max_queue:
+                self.closed = True
+                self.queue.clear()
+                self.ready.notify()
+                return False
+            self.queue.append(message)
+            self.ready.notify()
+            return True
+
+    def close(self):
+        with self.ready:
+            self.closed = True
+            self.ready.notify()
+
+
+class EventHub:
+    """In-process broadcast of store changes to Server-Sent Events clients.
+
+    A store listener turns each published batch into small deltas and
+    hands them to one dispatcher thread, so the write path only pays for
+    an append. The dispatcher formats each event once and offers the same
+    bytes to every subscriber's bounded queue. A subscriber whose queue is
+    full is dropped rather than allowed to hold memory or slow the others:
+    its stream ends with a `resync` event and the browser reconnects and
+    reloads the list. Recent events are kept so a client reconnecting with
+    Last-Event-ID only misses what no longer fits in `history`.
+    """
+
+    def __init__(self, store, max_clients=5000, max_queue=64, history=256, heartbeat=15):
+        self.max_clients = max_clients
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self.published = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._inbox = deque()
+        self._wake = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._last_id = self._event_id(store.snapshot())
+        store.add_listener(self._on_changes)
+
+    def start(self):
+        with self._wake:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='event-hub', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        with self._wake:
+            self._running = False
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, set()
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def subscribe(self, last_event_id=None):
+        """A new Subscriber primed with the events after `last_event_id`, or None when full."""
+        subscriber = Subscriber(self.max_queue)
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber.start_id = self._last_id
+            if last_event_id and last_event_id != self._last_id:
+                missed = self._missed_since(last_event_id)
+                for message in missed if missed is not None else [format_event(self._last_id, 'resync', {})]:
+                    subscriber.offer(message)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        subscriber.close()
+
+    def stream(self, subscriber):
+        """Yield the SSE body for one client until it disconnects or is dropped."""
+        try:
+            yield f"retry: 2000\nid: {subscriber.start_id}\n\n".encode('utf-8')
+            while True:
+                with subscriber.ready:
+                    if not subscriber.queue and not subscriber.closed:
+                        subscriber.ready.wait(self.heartbeat)
+                    messages = list(subscriber.queue)
+                    subscriber.queue.clear()
+                    closed = subscriber.closed
+                if closed:
+                    # Dropped for falling behind (or shutting down): have the client start over
+                    yield format_event(self._last_id, 'resync', {})
+                    return
+                if messages:
+                    yield b"".join(messages)
+                else:
+                    yield b": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': len(self._subscribers),
+                'max_clients': self.max_clients,
+                'published': self.published,
+                'dropped': self.dropped,
+            }
+
+    def _on_changes(self, snapshot, changes):
+        events = session_events(snapshot, changes)
+        if events:
+            with self._wake:
+                self._inbox.append((self._event_id(snapshot), events))
+                self._wake.notify()
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while self._running and not self._inbox:
+                    self._wake.wait()
+                if not self._running:
+                    return
+                batches = list(self._inbox)
+                self._inbox.clear()
+            try:
+                self._broadcast(batches)
+            except Exception:
+                logger.exception("Broadcasting %d change batches failed", len(batches))
+
+    def _broadcast(self, batches):
+        messages = []
+        with self._lock:
+            for event_id, events in batches:
+                for event, data in events:
+                    message = format_event(event_id, event, data)
+                    messages.append(message)
+                    self._history.append((event_id, message))
+            self._last_id = batches[-1][0]
+            subscribers = list(self._subscribers)
+        dropped = []
+        for subscriber in subscribers:
+            for message in messages:
+                if not subscriber.offer(message):
+                    dropped.append(subscriber)
+                    break
+        with self._lock:
+            self.published += len(messages)
+            for subscriber in dropped:
+                if subscriber in self._subscribers:
+                    self._subscribers.discard(subscriber)
+                    self.dropped += 1
+
+    def _missed_since(self, last_event_id):
+        """Messages after `last_event_id`, or None if they are no longer all in history."""
+        history = list(self._history)
+        for position in range(len(history) - 1, -1, -1):
+            if history[position][0] == last_event_id:
+                return [message for _, message in history[position + 1:]]
+        return None
+
+    @staticmethod
+    def _event_id(snapshot):
+        return f"{snapshot.origin}:{snapshot.version}"
@@ -0,0 +1,226 @@
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+from itertools import count
+
+from flask import abort, current_app, g, jsonify, request
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NO_PHASE = nullcontext()
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'observations')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.observations = 0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+        self.total += seconds
+        self.observations += 1
+
+
+class Metrics:
+    """Per-endpoint request and phase latency histograms in Prometheus text format."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._phases = {}
+        self._responses = Counter()
+
+    def observe_request(self, endpoint, method, status, seconds, phases=None):
+        with self._lock:
+            self._histogram(self._requests, (endpoint, method)).observe(seconds)
+            self._responses[(endpoint, method, status)] += 1
+            for name, phase_seconds in (phases or {}).items():
+                self._histogram(self._phases, (endpoint, name)).observe(phase_seconds)
+
+    def render(self, gauges=()):
+        """Prometheus text exposition; `gauges` adds (name, help, value) samples."""
+        lines = []
+        with self._lock:
+            lines += self._render_histograms(
+                'http_request_duration_seconds', "Request latency by endpoint.",
+                ('endpoint', 'method'), self._requests)
+            lines += self._render_histograms(
+                'http_request_phase_seconds', "Time spent in each phase of a request (lookup, context, render, serialize).",
+                ('endpoint', 'phase'), self._phases)
+            lines.append("# HELP http_responses_total Responses by endpoint and status code.")
+            lines.append("# TYPE http_responses_total counter")
+            for (endpoint, method, status), total in sorted(self._responses.items()):
+                labels = _labels(('endpoint', 'method', 'status'), (endpoint, method, status))
+                lines.append(f"http_responses_total{{{labels}}} {total}")
+        for name, help_text, value in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram(self.buckets)
+        return histogram
+
+    def _render_histograms(self, name, help_text, label_names, table):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for key, histogram in sorted(table.items()):
+            labels = _labels(label_names, key)
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.observations}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.observations}")
+        return lines
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _PhaseTimer:
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+def phase(name):
+    """Time a block as one phase of the current request.
+
+    A no-op (a shared null context) unless instrumentation is on.
+    """
+    timings = g.get('phase_timings')
+    if timings is None:
+        return _NO_PHASE
+    return _PhaseTimer(timings, name)
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval from a helper thread.
+
+    Stacks are counted in the folded format flame graph tools read
+    ("outer;inner;leaf count").
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def folded(self):
+        return "\n".join(f"{stack} {samples}" for stack, samples in self.samples.most_common())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def init_metrics(app):
+    """Register the request instrumentation hooks and the /metrics endpoint."""
+    if not app.config['METRICS_ENABLED']:
+        return
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    server_timing = app.config['SERVER_TIMING_ENABLED']
+    profile_header = app.config['PROFILE_HEADER'] if app.config['PROFILER_ENABLED'] else None
+    profiles = deque(maxlen=app.config['PROFILE_HISTORY'])
+    profile_ids = count(1)
+
+    @app.before_request
+    def start_timing():
+        g.request_started = time.perf_counter()
+        g.phase_timings = {}
+        if profile_header and request.headers.get(profile_header):
+            g.profiler = SamplingProfiler(threading.get_ident(), app.config['PROFILE_INTERVAL']).start()
+
+    @app.after_request
+    def record_timing(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        timings = g.get('phase_timings') or {}
+        metrics.observe_request(request.endpoint or 'unmatched', request.method, response.status_code, elapsed, timings)
+
+        if server_timing:
+            entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+            entries.append(f"total;dur={elapsed * 1000:.2f}")
+            response.headers['Server-Timing'] = ", ".join(entries)
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            profile_id = next(profile_ids)
+            profiles.append((profile_id, request.path, profiler.folded()))
+            response.headers['X-Profile-Id'] = str(profile_id)
+        return response
+
+    @app.route("/metrics")
+    def show_metrics():
+        gauges = []
+        for name in ('fragment_cache', 'conditional_responder', 'result_cache', 'event_hub', 'resource_indexer',
+                     'admission'):
+            component = current_app.extensions.get(name)
+            if component is not None:
+                prefix = 'compressed_body_cache' if name == 'conditional_responder' else name
+                for stat, value in component.stats().items():
+                    gauges.append((f"{prefix}_{stat}", f"{prefix.replace('_', ' ').capitalize()} {stat}.", value))
+        store = current_app.extensions.get('data_store')
+        if store is not None:
+            gauges.append(('data_store_version', "Current data store version.", store.version))
+        return metrics.render(gauges), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    if profile_header:
+        @app.route("/debug/profiles/<int:profile_id>")
+        def show_profile(profile_id):
+            for stored_id, path, folded in profiles:
+                if stored_id == profile_id:
+                    if request.args.get('format') == 'json':
+                        return jsonify({'id': stored_id, 'path': path, 'folded': folded})
+                    return folded + "\n", 200, {'Content-Type': 'text/plain; charset=utf-8'}
+            abort(404)
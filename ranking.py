@@ -0,0 +1,25 @@
+import numpy as np
+
+# Every this many scores are sampled to bound the top scores
+SAMPLE_STRIDE = 64
+
+
+def top_positions(scores, limit):
+    """Positions of the `limit` highest `scores` (a NumPy array), in no particular order."""
+    if len(scores) <= limit:
+        return np.arange(len(scores))
+    sample = scores[::SAMPLE_STRIDE]
+    if len(sample) > limit:
+        # The limit-th best of a sample is at most the limit-th best overall,
+        # so it cheaply rules out most scores before the partial sort
+        floor = np.partition(sample, len(sample) - limit)[len(sample) - limit]
+        candidates = np.flatnonzero(scores >= floor)
+    else:
+        candidates = np.arange(len(scores))
+    best = np.argpartition(scores[candidates], len(candidates) - limit)[len(candidates) - limit:]
+    return candidates[best]
+
+
+def best_first(keys, scores, positions):
+    """`positions` ordered by descending score, ties by ascending key."""
+    return positions[np.lexsort((keys[positions], -scores[positions]))]
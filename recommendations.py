@@ -0,0 +1,143 @@
+import numpy as np
+
+from cow import CopyOnWrite
+from ranking import best_first, top_positions
+
+# What sharing a feature with one of your sessions adds to a session's
+# score, by kind of feature. Multiples of 0.5, so scores stay exact however
+# often they are raised and lowered.
+FEATURE_WEIGHTS = {
+    'course': 3.0,
+    'professor': 2.0,
+    'tag': 1.0,
+    'room_type': 0.5,
+    'chill_level': 0.5,
+}
+
+
+class SessionRecommender(CopyOnWrite):
+    """Ranks candidate sessions by the features they share with a profile.
+
+    A session is a sparse binary vector of (kind, value) features: its
+    tags, course, professor, chill level and room type. The profile is the
+    sum of the vectors of your sessions, and a candidate's score is its
+    weighted dot product with the profile. The scores of all candidates
+    are kept in one NumPy array and updated in place: adding a session to
+    (or removing it from) the profile adds its feature weights to the rows
+    in each feature's postings, so a recommendation costs one top-k
+    selection over the array.
+
+    Rows are never reused; a session that stops being a candidate keeps
+    its row with a score of -inf.
+    """
+
+    def __init__(self):
+        self._session_ids = np.zeros(0, dtype=np.int64)
+        self._rows = {}
+        self._scores = np.zeros(0)
+        # feature -> rows of the candidates that have it
+        self._postings = {}
+        # session id -> features, for the sessions in the profile
+        self._profile_sessions = {}
+        # feature -> how many profile sessions have it
+        self._profile = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def load(self, candidates, profile):
+        """Bulk add (session_id, features) pairs: candidates, then profile sessions."""
+        first = len(self._session_ids)
+        session_ids = []
+        new_postings = {}
+        rows = self._own('_rows')
+        for session_id, features in candidates:
+            if session_id in rows:
+                continue
+            row = rows[session_id] = first + len(session_ids)
+            session_ids.append(session_id)
+            for feature in features:
+                new_postings.setdefault(feature, []).append(row)
+        self._session_ids = self._adopt(np.append(self._session_ids, np.array(session_ids, dtype=np.int64)))
+        self._scores = self._adopt(np.append(self._scores, np.zeros(len(session_ids))))
+        postings = self._own('_postings')
+        for feature, feature_rows in new_postings.items():
+            postings[feature] = np.append(postings.get(feature, ()), feature_rows).astype(np.intp)
+        profile_sessions = self._own('_profile_sessions')
+        counts = self._own('_profile')
+        for session_id, features in profile:
+            if session_id in profile_sessions:
+                continue
+            profile_sessions[session_id] = tuple(features)
+            for feature in features:
+                counts[feature] = counts.get(feature, 0) + 1
+        # Score every row afresh: cheaper than per-session updates for a bulk load
+        scores = self._scores
+        scores[np.isfinite(scores)] = 0
+        for feature, count in counts.items():
+            feature_rows = postings.get(feature)
+            if feature_rows is not None:
+                scores[feature_rows] += count * FEATURE_WEIGHTS[feature[0]]
+
+    def add_candidate(self, session_id, features):
+        if session_id in self._rows:
+            return
+        row = len(self._session_ids)
+        self._own('_rows')[session_id] = row
+        self._session_ids = self._adopt(np.append(self._session_ids, session_id))
+        profile = self._profile
+        score = sum(profile.get(feature, 0) * FEATURE_WEIGHTS[feature[0]] for feature in features)
+        self._scores = self._adopt(np.append(self._scores, score))
+        postings = self._own('_postings')
+        for feature in features:
+            postings[feature] = np.append(postings.get(feature, ()), row).astype(np.intp)
+
+    def remove_candidate(self, session_id):
+        if session_id not in self._rows:
+            return
+        row = self._own('_rows').pop(session_id)
+        self._own('_scores')[row] = -np.inf
+
+    def add_to_profile(self, session_id, features):
+        if session_id in self._profile_sessions:
+            return
+        features = tuple(features)
+        self._own('_profile_sessions')[session_id] = features
+        self._shift_profile(features, 1)
+
+    def remove_from_profile(self, session_id):
+        if session_id not in self._profile_sessions:
+            return
+        self._shift_profile(self._own('_profile_sessions').pop(session_id), -1)
+
+    def recommend(self, limit):
+        """Up to `limit` (session_id, score) pairs for the candidates sharing
+        anything with the profile, best first. A score is the average
+        weight a candidate shares with each profile session."""
+        if not self._profile_sessions or not self._rows or limit <= 0:
+            return []
+        scores = self._scores
+        floor = scores[top_positions(scores, limit)].min()
+        # Scores tie often, so take every tie at the cutoff and let the
+        # session ids decide
+        top = np.flatnonzero((scores >= floor) & (scores > 0))
+        top = best_first(self._session_ids, scores, top)[:limit]
+        size = len(self._profile_sessions)
+        return [
+            (session_id, score / size)
+            for session_id, score in zip(self._session_ids[top].tolist(), scores[top].tolist())
+        ]
+
+    def _shift_profile(self, features, step):
+        counts = self._own('_profile')
+        scores = self._own('_scores')
+        postings = self._postings
+        for feature in features:
+            count = counts.get(feature, 0) + step
+            if count:
+                counts[feature] = count
+            else:
+                del counts[feature]
+            feature_rows = postings.get(feature)
+            if feature_rows is not None:
+                scores[feature_rows] += step * FEATURE_WEIGHTS[feature[0]]
@@ -0,0 +1,191 @@
+import heapq
+import json
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def parse_reminder_time(value):
+    try:
+        due = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if due.tzinfo is not None:
+        # The scheduler's clock is naive local time
+        due = due.astimezone().replace(tzinfo=None)
+    return due
+
+
+class LogSender:
+    """Writes each reminder to the application log."""
+
+    def send(self, reminders):
+        for reminder in reminders:
+            logger.info("Reminder %s for session %s (user %s, due %s)", reminder['id'],
+                        reminder['session_id'], reminder.get('user_id'), reminder.get('reminder_time'))
+
+
+class FileSender:
+    """Appends reminders as JSON lines to a local outbox file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, reminders):
+        lines = "".join(json.dumps(reminder, sort_keys=True) + "\n" for reminder in reminders)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as outbox:
+            outbox.write(lines)
+
+
+def build_sender(config):
+    if config['REMINDER_SENDER'] == 'file':
+        return FileSender(config['REMINDER_OUTBOX_PATH'])
+    return LogSender()
+
+
+class ReminderScheduler:
+    """Sends reminders when they come due, from one background thread.
+
+    Pending reminders sit in a heap ordered by due time, so the thread
+    sleeps until the earliest one is due (or a new, earlier one is
+    scheduled) and each dispatched reminder costs one O(log n) pop. Due
+    reminders go to the sender in batches of up to `batch_size` and are
+    then marked sent in the store. Heap entries are checked against the
+    current snapshot before sending, so a reminder that was already sent,
+    or whose session is gone, is skipped rather than sent twice.
+
+    A sender is any object with a `send(reminders)` method; it may raise,
+    in which case the batch stays pending and is retried on the next wake.
+
+    With a shared store every worker schedules the same reminders, so a
+    batch is marked sent first and each worker sends only the reminders
+    it marked. A failed send is then logged and not retried.
+    """
+
+    def __init__(self, store, sender, batch_size=100, retry_delay=30, clock=datetime.now):
+        self.store = store
+        self.sender = sender
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.sent_count = 0
+        self._heap = []
+        self._wake = threading.Condition()
+        self._thread = None
+        self._running = False
+        store.add_listener(self._on_changes)
+
+        with self._wake:
+            for reminder in store.snapshot().reminders.values():
+                entry = self._entry(reminder)
+                if entry is not None:
+                    self._heap.append(entry)
+            heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, reminder):
+        entry = self._entry(reminder)
+        if entry is None:
+            return
+        with self._wake:
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self._wake.notify()
+
+    def start(self):
+        with self._wake:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        with self._wake:
+            self._running = False
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def dispatch_due(self, now=None):
+        """Send every reminder due at `now`; returns how many were sent."""
+        sent = 0
+        while True:
+            batch = self._pop_due(now or self.clock())
+            if not batch:
+                return sent
+            if self.store.shared:
+                claimed = set(self.store.mark_reminders_sent([reminder['id'] for reminder in batch]))
+                batch = [reminder for reminder in batch if reminder['id'] in claimed]
+                if not batch:
+                    continue
+                try:
+                    self.sender.send(batch)
+                except Exception:
+                    logger.exception("Sending %d reminders failed; they are already marked sent", len(batch))
+                    raise
+            else:
+                try:
+                    self.sender.send(batch)
+                except Exception:
+                    logger.exception("Sending %d reminders failed; will retry", len(batch))
+                    self._requeue(batch)
+                    raise
+                self.store.mark_reminders_sent([reminder['id'] for reminder in batch])
+            sent += len(batch)
+            self.sent_count += len(batch)
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while self._running:
+                    timeout = None
+                    if self._heap:
+                        timeout = (self._heap[0][0] - self.clock()).total_seconds()
+                        if timeout <= 0:
+                            break
+                    self._wake.wait(timeout)
+                if not self._running:
+                    return
+            try:
+                self.dispatch_due()
+            except Exception:
+                with self._wake:
+                    self._wake.wait(self.retry_delay)
+
+    def _pop_due(self, now):
+        data = self.store.snapshot()
+        batch = {}
+        with self._wake:
+            heap = self._heap
+            while heap and heap[0][0] <= now and len(batch) < self.batch_size:
+                _, reminder_id = heapq.heappop(heap)
+                reminder = data.reminders.get(reminder_id)
+                if reminder is None or reminder.get('reminder_sent') or reminder['session_id'] not in data.sessions:
+                    continue
+                batch[reminder_id] = reminder
+        return list(batch.values())
+
+    def _requeue(self, reminders):
+        with self._wake:
+            for reminder in reminders:
+                heapq.heappush(self._heap, self._entry(reminder))
+
+    def _entry(self, reminder):
+        if reminder.get('reminder_sent'):
+            return None
+        due = parse_reminder_time(reminder.get('reminder_time'))
+        if due is None:
+            return None
+        return (due, reminder['id'])
+
+    def _on_changes(self, snapshot, changes):
+        for operation, payload in changes:
+            if operation == 'add_reminder':
+                self.schedule(payload)
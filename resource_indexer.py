@@ -0,0 +1,133 @@
+import logging
+import queue
+import threading
+from collections import Counter, deque
+
+from text_extraction import extract_text
+from text_index import TextIndex, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceIndexer:
+    """Full-text search over the contents of uploaded session resources.
+
+    A store listener queues each new resource for a small worker pool,
+    so an upload only pays for a queue append. Workers read the stored
+    file, extract and tokenize its text, then publish it to a TextIndex:
+    whichever worker holds the index lock adds every document finished so
+    far as one batch (a new index segment) and swaps the published index,
+    so searches never wait for indexing. Resources already in the store
+    are queued when the indexer starts.
+    """
+
+    def __init__(self, store, blobs, workers=2, max_chars=1000000):
+        self.store = store
+        self.blobs = blobs
+        self.workers = workers
+        self.max_chars = max_chars
+        self.failed = 0
+        self._index = TextIndex()
+        self._ready = deque()
+        self._index_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._queued = 0
+        # Resources queued or indexed so far, so none is indexed twice
+        self._seen = set()
+        self._threads = []
+        store.add_listener(self._on_changes)
+
+    @property
+    def index(self):
+        """The current published TextIndex."""
+        return self._index
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._run, name=f'resource-indexer-{number}', daemon=True)
+                for number in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+        for resource in self.store.snapshot().resources.values():
+            self._submit(resource)
+
+    def stop(self, timeout=None):
+        """Stop the workers; resources still queued are not indexed."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                self._queued -= 1
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def search(self, query, limit):
+        """(resource_id, score) pairs for resources whose text matches `query`, best first."""
+        return self._index.search(query, limit)
+
+    def stats(self):
+        with self._lock:
+            pending = self._queued
+        index = self._index
+        return {
+            'indexed': len(index),
+            'segments': len(index.segments),
+            'pending': pending,
+            'failed': self.failed,
+        }
+
+    def _on_changes(self, snapshot, changes):
+        for operation, payload in changes:
+            if operation == 'add_resource':
+                self._submit(payload)
+
+    def _submit(self, resource):
+        if not resource.get('content_sha256'):
+            return
+        with self._lock:
+            if not self._threads or resource['id'] in self._seen:
+                return
+            self._seen.add(resource['id'])
+            self._queued += 1
+        self._queue.put(resource)
+
+    def _run(self):
+        while True:
+            resource = self._queue.get()
+            if resource is None:
+                return
+            self._index_resource(resource)
+
+    def _index_resource(self, resource):
+        try:
+            path = self.blobs.path(resource['content_sha256'])
+            text = extract_text(path, resource.get('content_type'), self.max_chars)
+            # The file name is searchable too
+            terms = Counter(tokenize(f"{resource.get('resource_name') or ''}\n{text}"))
+            self._ready.append((resource['id'], terms))
+        except Exception:
+            logger.warning("Could not index the text of resource %s", resource['id'], exc_info=True)
+            with self._lock:
+                self.failed += 1
+                self._queued -= 1
+            return
+        with self._index_lock:
+            if not self._ready:
+                # Published by another worker
+                return
+            batch = []
+            while self._ready:
+                batch.append(self._ready.popleft())
+            index = self._index.begin_write()
+            index.add_many(batch)
+            index.end_write()
+            self._index = index
+        with self._lock:
+            self._queued -= len(batch)
@@ -1,72 +1,210 @@
-from datetime import datetime
+import os
+from datetime import datetime, time, timedelta, timezone
 
-from flask import render_template, request, redirect, url_for, flash, jsonify, abort
+from flask import Response, render_template, request, redirect, url_for, flash, jsonify, abort, g, send_file, session as flask_session
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
-from tests.my_session_data import test_sessions as my_sessions
-from tests.join_session_data import test_sessions as join_sessions
-from tests.location_data import test_locations
-from tests.course_offering_data import test_course_offerings
-from tests.room_type_data import test_room_types
-from tests.tag_data import test_tags, test_session_tags
-from tests.resource_data import test_resources
-from tests.reminder_data import test_reminders
+from blob_store import BlobStore, BlobTooLarge
+from booking_index import BookingConflict
+from calendar_feed import iter_calendar
+from fragment_cache import FragmentCache
+from http_cache import ConditionalResponder, make_etag
+from metrics import phase
+from result_cache import ResultCache
+from reminder_scheduler import ReminderScheduler, build_sender
+from resource_indexer import ResourceIndexer
+from json_stream import JSONStreamError, iter_json_records
+from live_updates import EventHub
+from store import DataStore, join_outcome, seats_taken
+from time_index import format_window_cursor, parse_session_time, parse_window_cursor
+from validation import validate_course, validate_location
+from view_models import build_filter_options, build_session_views, format_datetime_string, format_session_times
+
+SESSION_FILTERS = ('course', 'location', 'year', 'term', 'professor', 'tag')
+RESOURCE_CONTENT_TYPES = {'txt': 'text/plain', 'pdf': 'application/pdf'}
 
 def register_routes(app):
+    store = DataStore.from_config(app.config)
+    app.extensions['data_store'] = store
+    if store.shared and app.config['SHARED_STORE_POLL_INTERVAL']:
+        store.start_polling(app.config['SHARED_STORE_POLL_INTERVAL'])
+    fragments = FragmentCache(app.config['FRAGMENT_CACHE_MAX_BYTES'])
+    app.extensions['fragment_cache'] = fragments
+    responder = ConditionalResponder(
+        app.config['COMPRESSED_CACHE_MAX_BYTES'],
+        min_size=app.config['COMPRESSION_MIN_BYTES'],
+        level=app.config['COMPRESSION_LEVEL']
+    )
+    app.extensions['conditional_responder'] = responder
+    results = ResultCache(app.config['RESULT_CACHE_MAX_ENTRIES'], app.config['RESULT_CACHE_TTL'])
+    app.extensions['result_cache'] = results
+    blobs = BlobStore(app.config['RESOURCE_STORAGE_DIR'], app.config['RESOURCE_MAX_BYTES'])
+    app.extensions['blob_store'] = blobs
+    if app.config['REMINDERS_ENABLED']:
+        reminders = ReminderScheduler(store, build_sender(app.config), batch_size=app.config['REMINDER_BATCH_SIZE'])
+        reminders.start()
+        app.extensions['reminder_scheduler'] = reminders
+    if app.config['LIVE_UPDATES_ENABLED']:
+        events = EventHub(
+            store,
+            max_clients=app.config['LIVE_UPDATES_MAX_CLIENTS'],
+            max_queue=app.config['LIVE_UPDATES_QUEUE_SIZE'],
+            history=app.config['LIVE_UPDATES_HISTORY'],
+            heartbeat=app.config['LIVE_UPDATES_HEARTBEAT']
+        )
+        events.start()
+        app.extensions['event_hub'] = events
+    resource_search = None
+    if app.config['RESOURCE_INDEX_ENABLED']:
+        resource_search = ResourceIndexer(
+            store,
+            blobs,
+            workers=app.config['RESOURCE_INDEX_WORKERS'],
+            max_chars=app.config['RESOURCE_INDEX_MAX_CHARS']
+        )
+        resource_search.start()
+        app.extensions['resource_indexer'] = resource_search
+
+    def current_data():
+        # One snapshot per request, so every read in it sees the same version
+        if 'data' not in g:
+            # With several workers, first pick up what the others have written
+            store.refresh()
+            g.data = store.snapshot()
+        return g.data
+
+    def data_etag(data, versions, *parts):
+        """ETag for a response built from `data` at `versions`, plus `parts`.
+
+        Local versions differ between processes sharing a database, so a
+        shared store's responses are tagged with the database's data
+        version instead, which every worker agrees on.
+        """
+        if data.database_version is not None:
+            return make_etag('database', data.database_version, *parts)
+        return make_etag(data.origin, *versions, *parts)
 
     def find_course(course_id):
-        if not course_id:
-            return None
-        return next((course for course in test_course_offerings if course['id'] == course_id), None)
+        return current_data().get_course(course_id)
 
     def find_location(location_id):
-        if not location_id:
-            return None
-        return next((location for location in test_locations if location['id'] == location_id), None)
+        return current_data().get_location(location_id)
 
     def find_session(session_id):
-        for collection in (my_sessions, join_sessions):
-            for session in collection:
-                if session['id'] == session_id:
-                    return session
-        return None
+        return current_data().get_session(session_id)
 
     def find_room_type(room_type_id):
-        if not room_type_id:
-            return None
-        return next((room for room in test_room_types if room['id'] == room_type_id), None)
+        return current_data().get_room_type(room_type_id)
 
     def get_session_tag_ids(session_id):
         if not session_id:
             return []
-        return [link['tag_id'] for link in test_session_tags if link['session_id'] == session_id]
+        return current_data().tag_ids_for_session(session_id)
 
     def find_tags(tag_ids):
-        if not tag_ids:
-            return []
-        return [tag for tag in test_tags if tag['id'] in tag_ids]
+        return current_data().get_tags(tag_ids)
 
     def get_resources_for_session(session_id):
-        return [resource for resource in test_resources if resource['session_id'] == session_id]
+        return current_data().resources_for_session(session_id)
 
     def get_reminders_for_session(session_id):
-        reminders = [reminder for reminder in test_reminders if reminder['session_id'] == session_id]
         formatted = []
-        for reminder in reminders:
+        for reminder in current_data().reminders_for_session(session_id):
             reminder_copy = dict(reminder)
             reminder_copy['display_time'] = format_datetime_string(reminder_copy.get('reminder_time'))
             formatted.append(reminder_copy)
         return formatted
 
-    def format_datetime_string(value):
-        if not value:
-            return None
+    def save_resource_file(resource_file, session_id):
+        """Store an uploaded (already validated) file; returns the new resource record."""
+        filename = secure_filename(resource_file.filename)
+        digest, size, _ = blobs.put(resource_file.stream)
+        resource_id = store.next_id('resource')
+        return {
+            "id": resource_id,
+            "session_id": session_id,
+            "resource_name": filename,
+            "resource_url": url_for('download_resource', resource_id=resource_id),
+            "updated_by": 0,
+            "content_sha256": digest,
+            "content_type": RESOURCE_CONTENT_TYPES[filename.rsplit('.', 1)[-1].lower()],
+            "size": size
+        }
+
+    def resource_too_large_message():
+        return f"Resources must be {app.config['RESOURCE_MAX_BYTES'] // (1024 * 1024)} MB or smaller."
+
+    def booking_conflict_message(conflicts, rejected):
+        booked = ", ".join(f"{session.get('title') or 'a study session'} ({session.get('time') or 'TBD'})"
+                           for session in conflicts[:3])
+        if len(conflicts) > 3:
+            booked += f" and {len(conflicts) - 3} more"
+        if rejected:
+            return f"That location is already booked at that time by {booked}. Please pick another time or place."
+        return f"Heads up: that location is also booked at that time by {booked}."
+
+    def get_search_limit():
+        limit = request.args.get('limit', app.config['SEARCH_DEFAULT_LIMIT'], type=int)
+        return max(1, min(limit, app.config['SEARCH_MAX_LIMIT']))
+
+    def get_time_window():
+        """The ?from=&to= range (ISO dates or datetimes) as ((start, end), None),
+        (None, None) without either, or (None, message) when invalid."""
+        bounds = []
+        for name in ('from', 'to'):
+            value = request.args.get(name)
+            parsed = parse_session_time(value) if value else None
+            if value and parsed is None:
+                return None, f"'{name}' must be an ISO date or datetime"
+            bounds.append(parsed)
+        if bounds == [None, None]:
+            return None, None
+        if None not in bounds and bounds[0] > bounds[1]:
+            return None, "'from' must not be after 'to'"
+        return tuple(bounds), None
+
+    def bulk_import(entity, validate, add_all, duplicate_message):
+        """Validate, dedupe and add the records of a streamed JSON/NDJSON body.
+
+        Every valid row is added in one store write. Answers with one report
+        entry per row (only the failed rows with ?report=errors).
+        """
+        request.max_content_length = app.config['BULK_IMPORT_MAX_BYTES']
+        report = []
+        candidates = []
         try:
-            dt = datetime.fromisoformat(value)
-            # Remove leading zero from day component in a cross-platform safe way
-            formatted = dt.strftime("%B %d, %Y %I:%M %p")
-            return formatted.replace(" 0", " ").lstrip("0")
-        except ValueError:
-            return value
+            for row, record, error in iter_json_records(request.stream):
+                if error is None:
+                    record, error = validate(record)
+                if error is not None:
+                    report.append({'row': row, 'success': False, 'message': error})
+                else:
+                    candidates.append((row, record))
+        except JSONStreamError as error:
+            return jsonify({'success': False, 'message': str(error)}), 400
+
+        if candidates:
+            ids = store.reserve_ids(entity, len(candidates))
+            records = [dict(record, id=new_id) for (row, record), new_id in zip(candidates, ids)]
+            # Duplicates are resolved inside the write, against the latest data
+            added = add_all(records)
+            for (row, record), stored in zip(candidates, added):
+                if stored is None:
+                    report.append({'row': row, 'success': False, 'message': duplicate_message})
+                else:
+                    report.append({'row': row, 'success': True, 'id': stored['id']})
+            if any(added):
+                results.invalidate(entity + 's')
+            report.sort(key=lambda entry: entry['row'])
+
+        failures = [entry for entry in report if not entry['success']]
+        return jsonify({
+            'success': not failures,
+            'total': len(report),
+            'created': len(report) - len(failures),
+            'failed': len(failures),
+            'rows': failures if request.args.get('report') == 'errors' else report,
+        })
 
     def build_session_context(session_record):
         if not session_record:
@@ -76,19 +214,7 @@ def register_routes(app):
         course = find_course(session_copy.get('course_id'))
         location = find_location(session_copy.get('location_id'))
 
-        # Prefer explicit start/end times; fall back to generic time if needed
-        start_display = session_copy.get('start_time')
-        end_display = session_copy.get('end_time')
-        if start_display and "T" in start_display:
-            start_display = format_datetime_string(start_display)
-        if end_display and "T" in end_display:
-            end_display = format_datetime_string(end_display)
-
-        if not start_display:
-            start_display = session_copy.get('time') or "TBD"
-        if not end_display:
-            end_display = session_copy.get('end_time_display') or "TBD"
-
+        start_display, end_display = format_session_times(session_copy, current_data().session_datetimes(session_copy['id']))
         session_copy['start_time'] = start_display
         session_copy['end_time'] = end_display
 
@@ -109,15 +235,61 @@ def register_routes(app):
             'attendees': attendees_data
         }
     
+    def render_session_cards(sessions, section):
+        """Rendered card HTML for each session, reusing cached cards whose data is unchanged."""
+        data = current_data()
+        cards = []
+        missing = []
+        for session in sessions:
+            key = ('card', data.origin, section, session['id']) + data.session_versions(session)
+            html = fragments.get(key)
+            if html is None:
+                missing.append((len(cards), key))
+            cards.append(html)
+
+        if missing:
+            with phase('context'):
+                views = build_session_views(data, [sessions[position] for position, _ in missing])
+            with phase('render'):
+                for (position, key), view in zip(missing, views):
+                    html = Markup(render_template("partials/session_card.html", session=view, section=section))
+                    fragments.set(key, html)
+                    cards[position] = html
+        return cards
+
     @app.route("/")
     def home():
-        return render_template("main_dashboard.html", 
-                             my_sessions=my_sessions, 
-                             join_sessions=join_sessions,
-                             courses=test_course_offerings,
-                             locations=test_locations,
-                             room_types=test_room_types,
-                             tags=test_tags)
+        # The dashboard only depends on store data, so one render serves every
+        # request until the next write
+        data = current_data()
+        key = ('dashboard', data.origin, data.version)
+        etag = data_etag(data, (data.version,), 'dashboard')
+        not_modified = responder.not_modified(etag, data.published_at)
+        if not_modified is not None:
+            return not_modified
+        page = fragments.get(key)
+        if page is not None:
+            return responder.respond(page, etag, data.published_at)
+
+        # Only the first page of joinable sessions; the rest load on demand
+        with phase('lookup'):
+            join_sessions, next_cursor = data.query_sessions(limit=app.config['SESSIONS_PAGE_SIZE'])
+            my_sessions = data.my_sessions()
+            recommended_sessions = data.recommended_sessions(app.config['RECOMMENDATIONS_LIMIT'])
+        my_session_cards = render_session_cards(my_sessions, "my_sessions")
+        recommended_cards = render_session_cards(recommended_sessions, "join_sessions")
+        join_session_cards = render_session_cards(join_sessions, "join_sessions")
+        with phase('context'):
+            filter_options = build_filter_options(data)
+        with phase('render'):
+            page = render_template("main_dashboard.html", 
+                                 my_session_cards=my_session_cards, 
+                                 recommended_cards=recommended_cards,
+                                 join_session_cards=join_session_cards,
+                                 next_cursor=next_cursor,
+                                 filter_options=filter_options)
+        fragments.set(key, page)
+        return responder.respond(page, etag, data.published_at)
     
     @app.route("/login")
     def login():
@@ -146,14 +318,13 @@ def register_routes(app):
             chill_level = request.form.get('chill_level')
             room_type_id = request.form.get('room_type_id', type=int)
             reminder_time = request.form.get('reminder_time')
-            tag_ids = []
-            for raw_tag in request.form.getlist('tags'):
-                try:
-                    tag_ids.append(int(raw_tag))
-                except (TypeError, ValueError):
-                    continue
-            resource_ids = []
-            reminder_ids = []
+            raw_tags = list(dict.fromkeys(request.form.getlist('tags')))
+            known_tags = current_data().tags
+            tag_ids = [int(raw_tag) for raw_tag in raw_tags if raw_tag.isdigit() and int(raw_tag) in known_tags]
+            if len(tag_ids) != len(raw_tags):
+                flash('Pick tags from the list.', 'error')
+                return redirect(request.url)
+            new_resource = None
             organizer = "You"
 
             selected_course = find_course(course_id)
@@ -186,10 +357,20 @@ def register_routes(app):
             start_display = format_datetime_string(start_time) if start_time else None
             end_display = format_datetime_string(end_time) if end_time else None
 
-            existing_ids = [session['id'] for session in my_sessions] + [session['id'] for session in join_sessions]
-            new_session_id = max(existing_ids) + 1 if existing_ids else 1
+            # Check the room before storing any upload; the check is repeated
+            # inside the write, where it is authoritative
+            booking = (selected_location['id'] if selected_location else None,
+                       parse_session_time(start_time), parse_session_time(end_time))
+            reject_conflicts = app.config['BOOKING_CONFLICTS'] == 'reject'
+            if reject_conflicts:
+                conflicts = current_data().booking_conflicts(*booking)
+                if conflicts:
+                    flash(booking_conflict_message(conflicts, rejected=True), 'error')
+                    return redirect(request.url)
+
+            new_session_id = store.next_id('session')
 
-            # Handle resource upload (placeholder upload to CDN)
+            # Handle resource upload
             resource_file = request.files.get('resource_file')
             if resource_file and resource_file.filename:
                 filename = secure_filename(resource_file.filename)
@@ -201,19 +382,11 @@ def register_routes(app):
                     flash('Resources must be a text or PDF file.', 'error')
                     return redirect(request.url)
 
-                existing_resource_ids = [resource['id'] for resource in test_resources]
-                new_resource_id = max(existing_resource_ids) + 1 if existing_resource_ids else 1
-                fake_url = f"https://cdn.example.com/uploads/{filename}"
-
-                new_resource = {
-                    "id": new_resource_id,
-                    "session_id": new_session_id,
-                    "resource_name": filename,
-                    "resource_url": fake_url,
-                    "updated_by": 0
-                }
-                test_resources.append(new_resource)
-                resource_ids.append(new_resource_id)
+                try:
+                    new_resource = save_resource_file(resource_file, new_session_id)
+                except BlobTooLarge:
+                    flash(resource_too_large_message(), 'error')
+                    return redirect(request.url)
 
             new_session = {
                 "id": new_session_id,
@@ -236,13 +409,13 @@ def register_routes(app):
                 "section": course_section,
                 "room_type_id": room_type['id'] if room_type else None,
                 "tag_ids": tag_ids,
-                "resource_ids": resource_ids,
-                "reminder_ids": reminder_ids
+                "resource_ids": [],
+                "reminder_ids": []
             }
 
+            new_reminder = None
             if reminder_time:
-                existing_reminder_ids = [reminder['id'] for reminder in test_reminders]
-                new_reminder_id = max(existing_reminder_ids) + 1 if existing_reminder_ids else 1
+                new_reminder_id = store.next_id('reminder')
                 new_reminder = {
                     "id": new_reminder_id,
                     "session_id": new_session_id,
@@ -250,41 +423,138 @@ def register_routes(app):
                     "reminder_time": reminder_time,
                     "reminder_sent": False
                 }
-                test_reminders.append(new_reminder)
-                reminder_ids.append(new_reminder_id)
 
-            for tag_id in tag_ids:
-                test_session_tags.append({
-                    "session_id": new_session_id,
-                    "tag_id": tag_id
-                })
+            # Publish the session together with its resource and reminder
+            def add_new_session(draft):
+                conflicts = draft.booking_conflicts(*booking)
+                if conflicts and reject_conflicts:
+                    raise BookingConflict(booking[0], conflicts)
+                draft.add_session(new_session, tag_ids=tag_ids)
+                if new_resource:
+                    draft.add_resource(new_resource)
+                if new_reminder:
+                    draft.add_reminder(new_reminder)
+                return conflicts
+
+            try:
+                conflicts = store.update(add_new_session)
+            except BookingConflict as error:
+                flash(booking_conflict_message(error.sessions, rejected=True), 'error')
+                return redirect(request.url)
 
-            my_sessions.append(new_session)
-            
-            # TODO: Add database logic here to save the session
-            
             flash('Study session created successfully!', 'success')
+            if conflicts:
+                flash(booking_conflict_message(conflicts, rejected=False), 'warning')
             return redirect(url_for('view_session', session_id=new_session_id))
             
-        return render_template("create_session.html", title="Create Session", room_types=test_room_types, tags=test_tags)
+        return render_template("create_session.html", title="Create Session", room_types=current_data().all_room_types(), tags=current_data().all_tags())
+
+    @app.route("/events")
+    def live_events():
+        hub = app.extensions.get('event_hub')
+        if hub is None:
+            abort(404)
+        subscriber = hub.subscribe(request.headers.get('Last-Event-ID'))
+        if subscriber is None:
+            return jsonify({'success': False, 'message': 'Too many live connections'}), 503, {'Retry-After': '30'}
+        response = Response(hub.stream(subscriber), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        # Keep nginx from buffering the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @app.route("/sessions/<int:session_id>/card")
+    def session_card(session_id):
+        # One card, for dashboards patching in a session they were told about
+        section = request.args.get('section', 'join_sessions')
+        if section not in ('my_sessions', 'join_sessions'):
+            abort(400)
+        data = current_data()
+        session_record = data.get_session(session_id)
+        if session_record is None:
+            abort(404)
+        etag = data_etag(data, data.session_versions(session_record), 'card', section, session_id)
+        not_modified = responder.not_modified(etag, None)
+        if not_modified is not None:
+            return not_modified
+        return responder.respond(render_session_cards([session_record], section)[0], etag)
+
+    def calendar_feed(name, feed, **selection):
+        """Stream the sessions picked by `selection` (see Snapshot.sessions_between) as iCalendar."""
+        window, error = get_time_window()
+        if error is not None:
+            return jsonify({'success': False, 'message': error}), 400
+        data = current_data()
+        etag = data_etag(data, (data.kind_version('session'),), 'calendar', feed, window)
+        not_modified = responder.not_modified(etag, data.published_at)
+        if not_modified is not None:
+            return not_modified
+
+        start, end = window or (None, None)
+        # Session URLs differ only in the id, so build them from one url_for
+        base_url = url_for('view_session', session_id=0, _external=True)[:-1]
+        body = iter_calendar(
+            data.sessions_between(start, end, **selection),
+            name,
+            data.session_datetimes,
+            lambda session_id: f"{base_url}{session_id}",
+            datetime.fromtimestamp(data.published_at, tz=timezone.utc)
+        )
+        response = Response(body, mimetype='text/calendar')
+        response.set_etag(etag)
+        response.last_modified = datetime.fromtimestamp(int(data.published_at), tz=timezone.utc)
+        response.cache_control.no_cache = True
+        return response
+
+    @app.route("/calendar/my_sessions.ics")
+    def my_sessions_calendar():
+        return calendar_feed("My study sessions", 'mine', scope='mine')
+
+    @app.route("/calendar/courses/<int:course_id>.ics")
+    def course_calendar(course_id):
+        course = find_course(course_id)
+        if course is None:
+            abort(404)
+        return calendar_feed(f"{course['title']} - Section {course['section']}", ('course', course_id), course_id=course_id)
 
     @app.route("/sessions/<int:session_id>")
     def view_session(session_id):
-        session_record = find_session(session_id)
+        with phase('lookup'):
+            session_record = find_session(session_id)
         if not session_record:
             abort(404)
 
-        context = build_session_context(session_record)
-
-        return render_template(
-            "session.html",
-            session=context['session'],
-            course=context['course'],
-            location=context['location'],
-            attendees=context['attendees'],
-            tags=test_tags,
-            room_types=test_room_types
-        )
+        # Pages carrying flash messages are one-off renders and never cached
+        cacheable = not flask_session.get('_flashes')
+        data = current_data()
+        versions = data.session_versions(session_record)
+        key = ('session_page', data.origin, session_id) + versions
+        etag = data_etag(data, versions, 'session_page', session_id)
+        if cacheable:
+            not_modified = responder.not_modified(etag, data.published_at)
+            if not_modified is not None:
+                return not_modified
+            page = fragments.get(key)
+            if page is not None:
+                return responder.respond(page, etag, data.published_at)
+
+        with phase('context'):
+            context = build_session_context(session_record)
+
+        with phase('render'):
+            page = render_template(
+                "session.html",
+                session=context['session'],
+                course=context['course'],
+                location=context['location'],
+                attendees=context['attendees'],
+                tags=current_data().all_tags(),
+                room_types=current_data().all_room_types()
+            )
+        if cacheable:
+            fragments.set(key, page)
+            return responder.respond(page, etag, data.published_at)
+        return page
 
     @app.route("/sessions/<int:session_id>/resources", methods=['POST'])
     def upload_session_resource(session_id):
@@ -312,156 +582,328 @@ def register_routes(app):
             flash('Resources must be a text or PDF file.', 'error')
             return redirect(url_for('view_session', session_id=session_id))
 
-        existing_resource_ids = [resource['id'] for resource in test_resources]
-        new_resource_id = max(existing_resource_ids) + 1 if existing_resource_ids else 1
-        fake_url = f"https://cdn.example.com/uploads/{filename}"
+        try:
+            new_resource = save_resource_file(resource_file, session_id)
+        except BlobTooLarge:
+            flash(resource_too_large_message(), 'error')
+            return redirect(url_for('view_session', session_id=session_id))
+        store.add_resource(new_resource)
 
-        new_resource = {
-            "id": new_resource_id,
-            "session_id": session_id,
-            "resource_name": filename,
-            "resource_url": fake_url,
-            "updated_by": 0
-        }
-        test_resources.append(new_resource)
+        flash('Resource uploaded.', 'success')
+        return redirect(url_for('view_session', session_id=session_id))
 
-        resource_ids = session_record.setdefault('resource_ids', [])
-        resource_ids.append(new_resource_id)
+    @app.route("/api/resources/search", methods=['GET'])
+    def search_resources():
+        if resource_search is None:
+            abort(404)
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'success': False, 'message': "'q' is required"}), 400
+        limit = get_search_limit()
+        data = current_data()
+        with phase('lookup'):
+            # Resources of sessions that were left since they were indexed are
+            # skipped, so ask for a few more than needed
+            hits = resource_search.search(query, limit * 2)
+            matches = []
+            for resource_id, score in hits:
+                resource = data.get_resource(resource_id)
+                session_record = data.get_session(resource['session_id']) if resource else None
+                if session_record is None:
+                    continue
+                matches.append((resource, session_record, score))
+                if len(matches) == limit:
+                    break
+        with phase('serialize'):
+            return jsonify({
+                'query': query,
+                'results': [{
+                    'score': round(score, 4),
+                    'resource': {
+                        'id': resource['id'],
+                        'resource_name': resource.get('resource_name'),
+                        'resource_url': resource.get('resource_url'),
+                        'content_type': resource.get('content_type'),
+                        'size': resource.get('size'),
+                    },
+                    'session': {
+                        'id': session_record['id'],
+                        'title': session_record.get('title'),
+                        'time': session_record.get('time'),
+                        'location': session_record.get('location'),
+                        'url': url_for('view_session', session_id=session_record['id']),
+                    },
+                } for resource, session_record, score in matches],
+                'index': resource_search.stats(),
+            })
+
+    @app.route("/resources/<int:resource_id>/download")
+    def download_resource(resource_id):
+        resource = current_data().get_resource(resource_id)
+        if not resource or not resource.get('content_sha256'):
+            abort(404)
+        path = blobs.path(resource['content_sha256'])
+        if not os.path.exists(path):
+            abort(404)
 
-        flash('Resource uploaded. The CDN link is a placeholder until storage is in place.', 'success')
-        return redirect(url_for('view_session', session_id=session_id))
+        # send_file answers If-None-Match and Range requests and hands the
+        # file to the server's wsgi.file_wrapper (sendfile where supported)
+        return send_file(
+            path,
+            mimetype=resource.get('content_type'),
+            download_name=resource['resource_name'],
+            conditional=True,
+            etag=resource['content_sha256'],
+            max_age=app.config['RESOURCE_CACHE_MAX_AGE']
+        )
     
     @app.route("/leave_session/<int:session_id>", methods=['POST'])
     def leave_session(session_id):
-        # Find and remove the session from my_sessions
-        session_to_remove = None
-        for session in my_sessions:
-            if session['id'] == session_id:
-                session_to_remove = session
-                break
+        # Remove the session from my_sessions
+        session_to_remove = store.leave_session(session_id)
         
         if session_to_remove:
-            my_sessions.remove(session_to_remove)
             return jsonify({'success': True, 'message': 'Successfully left the session'})
         else:
             return jsonify({'success': False, 'message': 'Session not found'}), 404
     
+    @app.route("/join_session/<int:session_id>", methods=['POST'])
+    def join_session(session_id):
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return jsonify({'success': False, 'message': 'The request body must be a JSON object'}), 400
+        attendee = payload.get('name') or "You"
+        if not isinstance(attendee, str) or len(attendee) > 50:
+            return jsonify({'success': False, 'message': 'Name must be 50 characters or less'}), 400
+        waitlist = bool(payload.get('waitlist') or request.args.get('waitlist'))
+
+        # Settle the common no-op cases from the current snapshot without
+        # queueing a write; a full session then costs its joiners nothing
+        session = current_data().get_session(session_id)
+        if session is None:
+            return jsonify({'success': False, 'message': 'Session not found'}), 404
+        outcome = join_outcome(session, attendee, waitlist)
+        if outcome in ('joined', 'waitlisted'):
+            # The authoritative check-and-increment runs inside the write
+            outcome, session = store.join_session(session_id, attendee, waitlist, mine=attendee == "You")
+            if session is None:
+                return jsonify({'success': False, 'message': 'Session not found'}), 404
+
+        response = {
+            'success': outcome != 'full',
+            'status': outcome,
+            'attendees': seats_taken(session),
+            'max_attendees': session.get('max_attendees'),
+        }
+        if outcome == 'full':
+            response['message'] = 'This session is full'
+            return jsonify(response), 409
+        if outcome in ('waitlisted', 'already_waitlisted'):
+            response['waitlist_position'] = session['waitlist'].index(attendee) + 1
+        return jsonify(response)
+
+    # API endpoint for the dashboard session list
+    @app.route("/api/sessions", methods=['GET'])
+    def get_sessions():
+        scope = request.args.get('scope', 'join')
+        if scope not in ('mine', 'join', 'all'):
+            return jsonify({'success': False, 'message': 'Scope must be mine, join, or all'}), 400
+
+        filters = {facet: request.args.get(facet, '') for facet in SESSION_FILTERS}
+        limit = request.args.get('limit', app.config['SESSIONS_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, app.config['SESSIONS_MAX_PAGE_SIZE']))
+
+        window, error = get_time_window()
+        if error is not None:
+            return jsonify({'success': False, 'message': error}), 400
+        if window is None:
+            cursor = request.args.get('cursor', type=int)
+        else:
+            # A position rather than an id, so paging survives the session leaving
+            cursor = request.args.get('cursor')
+            if cursor is not None:
+                cursor = parse_window_cursor(cursor)
+                if cursor is None:
+                    return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+
+        text = request.args.get('q', '')
+        want_html = bool(request.args.get('html'))
+        data = current_data()
+
+        def query():
+            with phase('lookup'):
+                sessions, next_cursor = data.query_sessions(
+                    filters=filters,
+                    text=text,
+                    scope=scope,
+                    cursor=cursor,
+                    limit=limit,
+                    window=window
+                )
+            if window is not None and next_cursor is not None:
+                next_cursor = format_window_cursor(next_cursor)
+            payload = {'sessions': sessions, 'next_cursor': next_cursor}
+
+            # The dashboard asks for rendered cards so it can reuse the card partial
+            if want_html:
+                section = "my_sessions" if scope == 'mine' else "join_sessions"
+                payload['html'] = "".join(render_session_cards(sessions, section))
+            with phase('serialize'):
+                return jsonify(payload).get_data()
+
+        key = ('sessions', data.origin, data.version, scope, tuple(filters.items()), text, cursor, limit, want_html, window)
+        return app.response_class(results.get_or_compute(key, query), mimetype='application/json')
+
     # API endpoints for locations
     @app.route("/api/locations", methods=['GET'])
     def get_locations():
-        query = request.args.get('q', '').lower()
+        query = request.args.get('q', '')
+        limit = get_search_limit()
         
-        # Filter locations based on query
-        filtered_locations = [
-            location for location in test_locations
-            if query in location['address'].lower() or query in location['room_number'].lower()
-        ]
+        data = current_data()
+        etag = data_etag(data, (data.kind_version('location'),), 'locations', query, limit)
+        not_modified = responder.not_modified(etag, data.published_at)
+        if not_modified is not None:
+            return not_modified
         
-        return jsonify(filtered_locations)
+        # Ranked lookup: exact, then prefix, then infix matches. Identical
+        # concurrent lookups share one computation
+        def search():
+            with phase('lookup'):
+                matches = data.search_locations(query, limit)
+            with phase('serialize'):
+                return jsonify(matches).get_data()
+
+        body = results.get_or_compute(('locations', etag), search)
+        return responder.respond(body, etag, data.published_at, mimetype='application/json')
     
     @app.route("/api/locations", methods=['POST'])
     def create_location():
-        data = request.get_json()
-        
-        # Validate required fields
-        if not data.get('address') or not data.get('room_number'):
-            return jsonify({'success': False, 'message': 'Address and room number are required'}), 400
-        
-        # Validate field lengths
-        if len(data['address']) > 100:
-            return jsonify({'success': False, 'message': 'Address must be 100 characters or less'}), 400
-        if len(data['room_number']) > 20:
-            return jsonify({'success': False, 'message': 'Room number must be 20 characters or less'}), 400
-        
-        # Check if location already exists
-        for location in test_locations:
-            if location['address'].lower() == data['address'].lower() and \
-               location['room_number'].lower() == data['room_number'].lower():
-                return jsonify({'success': False, 'message': 'This location already exists'}), 409
+        new_location, error = validate_location(request.get_json())
+        if error is not None:
+            return jsonify({'success': False, 'message': error}), 400
         
         # Generate new ID
-        new_id = max([loc['id'] for loc in test_locations]) + 1 if test_locations else 1
+        new_location = dict(new_location, id=store.next_id('location'))
         
-        # Create new location
-        new_location = {
-            'id': new_id,
-            'address': data['address'],
-            'room_number': data['room_number']
-        }
+        # Check for duplicates inside the write so two identical requests can't both succeed
+        def add_location(draft):
+            if draft.find_location(new_location) is not None:
+                return None
+            return draft.add_location(new_location)
         
-        test_locations.append(new_location)
+        if store.update(add_location) is None:
+            return jsonify({'success': False, 'message': 'This location already exists'}), 409
+        results.invalidate('locations')
         
         return jsonify({'success': True, 'location': new_location})
+
+    @app.route("/api/locations/<int:location_id>/availability", methods=['GET'])
+    def get_location_availability(location_id):
+        data = current_data()
+        if data.get_location(location_id) is None:
+            return jsonify({'success': False, 'message': 'Location not found'}), 404
+        raw_date = request.args.get('date')
+        if raw_date:
+            try:
+                day = datetime.strptime(raw_date, '%Y-%m-%d').date()
+            except ValueError:
+                return jsonify({'success': False, 'message': "'date' must be a YYYY-MM-DD date"}), 400
+        else:
+            day = datetime.now().date()
+
+        etag = data_etag(data, (data.kind_version('session'),), 'availability', location_id, day.isoformat())
+        not_modified = responder.not_modified(etag, data.published_at)
+        if not_modified is not None:
+            return not_modified
+
+        def availability():
+            midnight = datetime.combine(day, time())
+            opens = midnight + timedelta(hours=app.config['LOCATION_OPEN_HOUR'])
+            closes = midnight + timedelta(hours=app.config['LOCATION_CLOSE_HOUR'])
+            with phase('lookup'):
+                booked, free = data.location_availability(location_id, opens, closes)
+            with phase('serialize'):
+                return jsonify({
+                    'location_id': location_id,
+                    'date': day.isoformat(),
+                    'opens': opens.isoformat(),
+                    'closes': closes.isoformat(),
+                    'booked': [{
+                        'session_id': session['id'],
+                        'title': session.get('title'),
+                        'start': start.isoformat(),
+                        'end': end.isoformat(),
+                    } for start, end, session in booked],
+                    'free': [{
+                        'start': start.isoformat(),
+                        'end': end.isoformat(),
+                    } for start, end in free],
+                }).get_data()
+
+        body = results.get_or_compute(('availability', etag), availability)
+        return responder.respond(body, etag, data.published_at, mimetype='application/json')
+
+    @app.route("/api/locations/bulk", methods=['POST'])
+    def bulk_create_locations():
+        return bulk_import('location', validate_location, store.add_locations, 'This location already exists')
     
     # API endpoints for course offerings
     @app.route("/api/courses", methods=['GET'])
     def get_courses():
-        query = request.args.get('q', '').lower()
+        query = request.args.get('q', '')
+        limit = get_search_limit()
         
-        # Filter courses based on query
-        filtered_courses = [
-            course for course in test_course_offerings
-            if query in course['title'].lower() or 
-               query in course['section'].lower() or 
-               query in course['professor_name'].lower()
-        ]
+        data = current_data()
+        etag = data_etag(data, (data.kind_version('course'),), 'courses', query, limit)
+        not_modified = responder.not_modified(etag, data.published_at)
+        if not_modified is not None:
+            return not_modified
         
-        return jsonify(filtered_courses)
+        # Ranked lookup: exact, then prefix, then infix matches. Identical
+        # concurrent lookups share one computation
+        def search():
+            with phase('lookup'):
+                matches = data.search_courses(query, limit)
+            with phase('serialize'):
+                return jsonify(matches).get_data()
+
+        body = results.get_or_compute(('courses', etag), search)
+        return responder.respond(body, etag, data.published_at, mimetype='application/json')
     
     @app.route("/api/courses", methods=['POST'])
     def create_course():
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['title', 'section', 'year', 'term', 'professor_name']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({'success': False, 'message': f'{field.replace("_", " ").title()} is required'}), 400
-        
-        # Validate field lengths
-        if len(data['title']) > 100:
-            return jsonify({'success': False, 'message': 'Title must be 100 characters or less'}), 400
-        if len(data['section']) > 20:
-            return jsonify({'success': False, 'message': 'Section must be 20 characters or less'}), 400
-        if len(data['professor_name']) > 50:
-            return jsonify({'success': False, 'message': 'Professor name must be 50 characters or less'}), 400
-        
-        # Validate year and term
-        try:
-            year = int(data['year'])
-            term = int(data['term'])
-            if year < 2020 or year > 2100:
-                return jsonify({'success': False, 'message': 'Year must be between 2020 and 2100'}), 400
-            if term not in [1, 2, 3]:
-                return jsonify({'success': False, 'message': 'Term must be 1 (Fall), 2 (Spring), or 3 (Summer)'}), 400
-        except ValueError:
-            return jsonify({'success': False, 'message': 'Invalid year or term'}), 400
-        
-        # Check if course offering already exists
-        for course in test_course_offerings:
-            if course['title'].lower() == data['title'].lower() and \
-               course['section'].lower() == data['section'].lower() and \
-               course['year'] == year and \
-               course['term'] == term:
-                return jsonify({'success': False, 'message': 'This course offering already exists'}), 409
+        new_course, error = validate_course(request.get_json())
+        if error is not None:
+            return jsonify({'success': False, 'message': error}), 400
         
         # Generate new ID
-        new_id = max([course['id'] for course in test_course_offerings]) + 1 if test_course_offerings else 1
+        new_course = dict(new_course, id=store.next_id('course'))
         
-        # Create new course offering
-        new_course = {
-            'id': new_id,
-            'title': data['title'],
-            'section': data['section'],
-            'year': year,
-            'term': term,
-            'professor_name': data['professor_name']
-        }
+        # Check for duplicates inside the write so two identical requests can't both succeed
+        def add_course(draft):
+            if draft.find_course(new_course) is not None:
+                return None
+            return draft.add_course(new_course)
         
-        test_course_offerings.append(new_course)
+        if store.update(add_course) is None:
+            return jsonify({'success': False, 'message': 'This course offering already exists'}), 409
+        results.invalidate('courses')
         
         return jsonify({'success': True, 'course': new_course})
 
+    @app.route("/api/courses/bulk", methods=['POST'])
+    def bulk_create_courses():
+        return bulk_import('course', validate_course, store.add_courses, 'This course offering already exists')
+
+    @app.route("/api/cache/stats", methods=['GET'])
+    def get_cache_stats():
+        return jsonify({
+            'results': results.stats(),
+            'fragments': fragments.stats(),
+            'compressed_bodies': responder.stats()
+        })
+
     @app.route("/404")
     def show_not_found():
         return render_template("errors/404.html"), 404
@@ -0,0 +1,253 @@
+from itertools import islice
+
+from cow import CopyOnWrite
+
+EXACT, PREFIX, WORD_PREFIX, INFIX = 0, 1, 2, 3
+
+
+def normalize(value):
+    if value is None:
+        return ""
+    return " ".join(str(value).lower().split())
+
+
+def _word_suffixes(value):
+    # The value itself plus every suffix that starts at a word boundary, so
+    # "lib" is a prefix match for "main library"
+    for i, char in enumerate(value):
+        if char.isalnum() and (i == 0 or not value[i - 1].isalnum()):
+            yield value[i:]
+
+
+def _trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ('children', 'values')
+
+    def __init__(self):
+        self.children = {}
+        self.values = set()
+
+    def copy(self):
+        node = _TrieNode()
+        node.children = dict(self.children)
+        node.values = set(self.values)
+        return node
+
+
+class SearchIndex(CopyOnWrite):
+    """Autocomplete index over a few text fields of each record.
+
+    Distinct field values are indexed once, since a catalog repeats the same
+    titles and professors across many sections. A prefix trie over each
+    value (and each of its word-start suffixes) answers exact and prefix
+    lookups; trigram postings answer infix lookups for queries of three or
+    more characters. Results are ranked exact > prefix (of the value, then
+    of a word) > infix and cut at `limit`, so the work per keystroke depends
+    on the result size rather than on the catalog size.
+
+    Updates are copy-on-write (trie nodes are path-copied), so searches on
+    a published index never take a lock.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._records = {}
+        self._record_values = {}
+        self._ids_by_value = {}
+        self._trie = _TrieNode()
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        record_id = record['id']
+        if record_id in self._records:
+            self.remove(record_id)
+        values = tuple(dict.fromkeys(
+            value for value in (normalize(record.get(field)) for field in self.fields) if value
+        ))
+        self._own('_records')[record_id] = record
+        self._own('_record_values')[record_id] = values
+        for value in values:
+            is_new = value not in self._ids_by_value
+            self._own_entry('_ids_by_value', value, dict)[record_id] = None
+            if is_new:
+                self._index_value(value)
+
+    def remove(self, record_id):
+        if record_id not in self._records:
+            return
+        del self._own('_records')[record_id]
+        for value in self._own('_record_values').pop(record_id):
+            ids = self._own_entry('_ids_by_value', value, dict)
+            ids.pop(record_id, None)
+            if not ids:
+                del self._ids_by_value[value]
+                self._unindex_value(value)
+
+    def search(self, query, limit):
+        if limit <= 0:
+            return []
+        query = normalize(query)
+        if not query:
+            return list(islice(self._records.values(), limit))
+
+        ranked, matched = self._prefix_matches(query, limit)
+        if matched < limit and len(query) >= 3:
+            ranked.extend(self._infix_matches(query, {value for _, _, value in ranked}))
+        ranked.sort()
+
+        results = {}
+        for _, _, value in ranked:
+            for record_id in self._ids_by_value[value]:
+                if record_id not in results:
+                    results[record_id] = self._records[record_id]
+                    if len(results) >= limit:
+                        return list(results.values())
+        return list(results.values())
+
+    def match_ids(self, query):
+        """Return the ids of every record with a field containing `query`.
+
+        Queries shorter than three characters match on value/word prefixes.
+        """
+        query = normalize(query)
+        if not query:
+            return set(self._records)
+        if len(query) >= 3:
+            values = [value for _, _, value in self._infix_matches(query, ())]
+        else:
+            values = []
+            node = self._trie
+            for char in query:
+                node = node.children.get(char)
+                if node is None:
+                    return set()
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                values.extend(current.values)
+                stack.extend(current.children.values())
+        ids = set()
+        for value in values:
+            ids.update(self._ids_by_value[value])
+        return ids
+
+    def _prefix_matches(self, query, limit):
+        node = self._trie
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return [], 0
+
+        # Breadth-first so shorter completions rank first within a tier;
+        # levels are finished before stopping so ties are not cut
+        # arbitrarily. Deeper levels may still hold value prefixes, which
+        # outrank any word prefix, so the walk goes on until `limit` records
+        # match exactly or by value prefix, only skipping word prefixes once
+        # `limit` records match in all. Returns the matches and that count.
+        ranked = []
+        seen = set()
+        matched = set()
+        leading = set()
+        level = [node]
+        depth = 0
+        while level and len(leading) < limit:
+            full = len(matched) >= limit
+            next_level = []
+            for current in level:
+                for value in current.values:
+                    if value in seen:
+                        continue
+                    if value == query:
+                        tier = EXACT
+                    elif value.startswith(query):
+                        tier = PREFIX
+                    elif full:
+                        continue
+                    else:
+                        tier = WORD_PREFIX
+                    seen.add(value)
+                    ids = self._ids_by_value[value]
+                    matched.update(ids)
+                    if tier != WORD_PREFIX:
+                        leading.update(ids)
+                    ranked.append((tier, depth, value))
+                next_level.extend(current.children.values())
+            level = next_level
+            depth += 1
+        return ranked, len(matched)
+
+    def _infix_matches(self, query, exclude):
+        postings = sorted((self._postings.get(gram, ()) for gram in _trigrams(query)), key=len)
+        if not postings or not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return []
+        return [
+            (INFIX, value.index(query), value)
+            for value in candidates
+            if value not in exclude and query in value
+        ]
+
+    def _index_value(self, value):
+        # Hot path of bulk loads, so the copy-on-write checks are inlined
+        owned = self._owned
+        root = self._own('_trie')
+        for key in _word_suffixes(value):
+            node = root
+            for position, char in enumerate(key):
+                child = node.children.get(char)
+                if child is None:
+                    # Everything below a new node is new as well
+                    for char in key[position:]:
+                        child = _TrieNode()
+                        owned[id(child)] = child
+                        node.children[char] = child
+                        node = child
+                    break
+                if id(child) not in owned:
+                    child = self._adopt(child.copy())
+                    node.children[char] = child
+                node = child
+            node.values.add(value)
+        postings = self._own('_postings')
+        for gram in _trigrams(value):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = self._adopt(set())
+            elif id(posting) not in owned:
+                posting = postings[gram] = self._adopt(set(posting))
+            posting.add(value)
+
+    def _unindex_value(self, value):
+        for key in _word_suffixes(value):
+            path = [self._own('_trie')]
+            for char in key:
+                child = path[-1].children.get(char)
+                if child is None:
+                    break
+                child = self._writable(child)
+                path[-1].children[char] = child
+                path.append(child)
+            else:
+                path[-1].values.discard(value)
+                # Prune nodes that no longer lead anywhere
+                for depth in range(len(key), 0, -1):
+                    node = path[depth]
+                    if node.values or node.children:
+                        break
+                    del path[depth - 1].children[key[depth - 1]]
+        for gram in _trigrams(value):
+            if gram in self._postings:
+                posting = self._own_entry('_postings', gram, set)
+                posting.discard(value)
+                if not posting:
+                    del self._postings[gram]
@@ -0,0 +1,125 @@
+import bisect
+import heapq
+
+from cow import CopyOnWrite
+from search_index import SearchIndex, normalize
+
+SCOPES = ('mine', 'join', 'all')
+
+
+class SessionQueryIndex(CopyOnWrite):
+    """Facet postings and id-ordered lists backing paginated session queries.
+
+    Each session is posted under (facet, normalized value) keys such as
+    ('course', 'data structures') or ('tag', 'lab'), and under its scope
+    ('mine' or 'join'). A query intersects the postings for the requested
+    facets (smallest first) and pages through the result by session id, so
+    the cost follows the size of the match set rather than of the catalog.
+
+    Updates are copy-on-write like SearchIndex; only the postings and
+    ordered lists a batch touches are copied.
+    """
+
+    _cow_children = ('text',)
+
+    def __init__(self):
+        self._postings = {}
+        self._keys_by_session = {}
+        self._ordered = {scope: [] for scope in SCOPES}
+        self.text = SearchIndex(('title', 'location', 'organizer', 'description'))
+
+    def __len__(self):
+        return len(self._keys_by_session)
+
+    def add(self, session, scope, facets):
+        session_id = session['id']
+        if session_id in self._keys_by_session:
+            self.remove(session_id)
+        keys = {('scope', scope)}
+        for facet, values in facets.items():
+            for value in values:
+                value = normalize(value)
+                if value:
+                    keys.add((facet, value))
+        for key in keys:
+            self._own_entry('_postings', key, set).add(session_id)
+        self._own('_keys_by_session')[session_id] = keys
+        for name in (scope, 'all'):
+            bisect.insort(self._own_entry('_ordered', name, list), session_id)
+        self._own_child('text').add(session)
+
+    def remove(self, session_id):
+        keys = self._own('_keys_by_session').pop(session_id, None)
+        if keys is None:
+            return
+        for key in keys:
+            posting = self._own_entry('_postings', key, set)
+            posting.discard(session_id)
+            if not posting:
+                del self._postings[key]
+            if key[0] == 'scope':
+                self._discard_ordered(key[1], session_id)
+        self._discard_ordered('all', session_id)
+        self._own_child('text').remove(session_id)
+
+    def query(self, filters=None, text=None, scope='join', cursor=None, limit=20):
+        """Return (session_ids, next_cursor) for one page of matching sessions.
+
+        `filters` maps facet names to values; empty values are ignored.
+        `cursor` is the last session id of the previous page.
+        """
+        postings = []
+        for facet, value in (filters or {}).items():
+            value = normalize(value)
+            if value:
+                postings.append(self._postings.get((facet, value), set()))
+        if text and normalize(text):
+            postings.append(self.text.match_ids(text))
+
+        if not postings:
+            # Unfiltered pages come straight off the ordered list
+            ordered = self._ordered.get(scope, [])
+            start = bisect.bisect_right(ordered, cursor) if cursor is not None else 0
+            page = ordered[start:start + limit + 1]
+        else:
+            if scope != 'all':
+                postings.append(self._postings.get(('scope', scope), set()))
+            postings.sort(key=len)
+            matches = set(postings[0])
+            for posting in postings[1:]:
+                matches &= posting
+                if not matches:
+                    break
+            if cursor is not None:
+                matches = (session_id for session_id in matches if session_id > cursor)
+            page = heapq.nsmallest(limit + 1, matches)
+
+        if len(page) > limit:
+            return page[:limit], page[limit - 1]
+        return page, None
+
+    def matcher(self, filters=None, text=None, scope='join'):
+        """A predicate on session ids for the same query, for callers that
+        walk sessions in some other order (e.g. by start time)."""
+        required = set()
+        for facet, value in (filters or {}).items():
+            value = normalize(value)
+            if value:
+                required.add((facet, value))
+        if scope != 'all':
+            required.add(('scope', scope))
+        text_ids = self.text.match_ids(text) if text and normalize(text) else None
+        keys_by_session = self._keys_by_session
+
+        def matches(session_id):
+            keys = keys_by_session.get(session_id)
+            if keys is None or not required <= keys:
+                return False
+            return text_ids is None or session_id in text_ids
+        return matches
+
+    def _discard_ordered(self, scope, session_id):
+        ordered = self._own_entry('_ordered', scope, list)
+        position = bisect.bisect_left(ordered, session_id)
+        if position < len(ordered) and ordered[position] == session_id:
+            del ordered[position]
@@ -1,55 +1,100 @@
-// Handle Leave Session button clicks
 document.addEventListener('DOMContentLoaded', function() {
-    // Get all leave session buttons
-    const leaveButtons = document.querySelectorAll('.leave-session');
-    
-    leaveButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            const sessionId = this.getAttribute('data-session-id');
-            const sessionCard = this.closest('.session_card');
-            
-            // Confirm the action
-            if (confirm('Are you sure you want to leave this session?')) {
-                // Make POST request to leave session
-                fetch(`/leave_session/${sessionId}`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    }
-                })
-                .then(response => response.json())
-                .then(data => {
-                    if (data.success) {
-                        // Remove the session card from the DOM with animation
-                        sessionCard.style.transition = 'opacity 0.3s ease-out, transform 0.3s ease-out';
-                        sessionCard.style.opacity = '0';
-                        sessionCard.style.transform = 'translateX(-20px)';
+    // Handle Leave Session button clicks (cards are also added by live updates, so delegate)
+    document.addEventListener('click', function(event) {
+        const button = event.target.closest('.leave-session');
+        if (!button) return;
+        
+        const sessionId = button.getAttribute('data-session-id');
+        const sessionCard = button.closest('.session_card');
+        
+        // Confirm the action
+        if (confirm('Are you sure you want to leave this session?')) {
+            // Make POST request to leave session
+            fetch(`/leave_session/${sessionId}`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                }
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    // Remove the session card from the DOM with animation
+                    sessionCard.style.transition = 'opacity 0.3s ease-out, transform 0.3s ease-out';
+                    sessionCard.style.opacity = '0';
+                    sessionCard.style.transform = 'translateX(-20px)';
+                    
+                    // Remove element after animation completes
+                    setTimeout(() => {
+                        sessionCard.remove();
                         
-                        // Remove element after animation completes
-                        setTimeout(() => {
-                            sessionCard.remove();
-                            
-                            // Check if there are no sessions left in "My Sessions"
-                            const mySessionsList = document.querySelector('.sessions-section .sessions-list');
-                            if (mySessionsList && mySessionsList.children.length === 0) {
-                                const noSessionsMessage = document.createElement('p');
-                                noSessionsMessage.textContent = 'You are not currently in any sessions.';
-                                noSessionsMessage.style.textAlign = 'center';
-                                noSessionsMessage.style.padding = '20px';
-                                noSessionsMessage.style.color = '#666';
-                                mySessionsList.appendChild(noSessionsMessage);
-                            }
-                        }, 300);
-                    } else {
-                        alert('Failed to leave session: ' + data.message);
+                        // Check if there are no sessions left in "My Sessions"
+                        const mySessionsList = document.querySelector('.sessions-section .sessions-list');
+                        if (mySessionsList && mySessionsList.children.length === 0) {
+                            const noSessionsMessage = document.createElement('p');
+                            noSessionsMessage.textContent = 'You are not currently in any sessions.';
+                            noSessionsMessage.style.textAlign = 'center';
+                            noSessionsMessage.style.padding = '20px';
+                            noSessionsMessage.style.color = '#666';
+                            mySessionsList.appendChild(noSessionsMessage);
+                        }
+                    }, 300);
+                } else {
+                    alert('Failed to leave session: ' + data.message);
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                alert('An error occurred while leaving the session.');
+            });
+        }
+    });
+    
+    // Handle Join Session button clicks (the list is re-rendered by filters, so delegate)
+    document.addEventListener('click', function(event) {
+        const button = event.target.closest('.join-session');
+        if (!button) return;
+        
+        const sessionId = button.getAttribute('data-session-id');
+        const sessionCard = button.closest('.session_card');
+        
+        function join(waitlist) {
+            button.disabled = true;
+            return fetch(`/join_session/${sessionId}`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ waitlist: waitlist })
+            })
+            .then(response => response.json())
+            .then(data => {
+                const attendees = sessionCard.querySelector('.attendees span');
+                if (attendees && data.attendees !== undefined) {
+                    attendees.textContent = data.attendees;
+                }
+                if (data.status === 'joined' || data.status === 'already_joined') {
+                    button.textContent = 'Joined';
+                } else if (data.status === 'waitlisted' || data.status === 'already_waitlisted') {
+                    button.textContent = `Waitlisted (#${data.waitlist_position})`;
+                } else if (data.status === 'full') {
+                    button.disabled = false;
+                    if (confirm('This session is full. Join the waitlist?')) {
+                        return join(true);
                     }
-                })
-                .catch(error => {
-                    console.error('Error:', error);
-                    alert('An error occurred while leaving the session.');
-                });
-            }
-        });
+                } else {
+                    button.disabled = false;
+                    alert('Failed to join session: ' + data.message);
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                button.disabled = false;
+                alert('An error occurred while joining the session.');
+            });
+        }
+        
+        join(false);
     });
     
     // Filter Panel Toggle
@@ -69,52 +114,76 @@ document.addEventListener('DOMContentLoaded', function() {
     const searchBar = document.getElementById('searchBar');
     const filterTag = document.getElementById('filterTag');
     
-    function applyFilters() {
-        const courseFilter = document.getElementById('filterCourse').value.toLowerCase();
-        const locationFilter = document.getElementById('filterLocation').value.toLowerCase();
-        const yearFilter = document.getElementById('filterYear').value;
-        const termFilter = document.getElementById('filterTerm').value;
-        const professorFilter = document.getElementById('filterProfessor').value.toLowerCase();
-        const tagFilter = filterTag ? filterTag.value.toLowerCase() : '';
-        const searchQuery = searchBar ? searchBar.value.toLowerCase() : '';
-        
-        const sessionCards = document.querySelectorAll('#joinSessionsList .session_card');
-        const noResultsMessage = document.getElementById('noResultsMessage');
-        let visibleCount = 0;
-        
-        sessionCards.forEach(card => {
-            const courseName = card.getAttribute('data-course-name').toLowerCase();
-            const locationAddress = card.getAttribute('data-location-address').toLowerCase();
-            const courseYear = card.getAttribute('data-course-year');
-            const courseTerm = card.getAttribute('data-course-term');
-            const professorName = card.getAttribute('data-professor-name').toLowerCase();
-            const cardTagsValue = card.getAttribute('data-tags') || '';
-            const cardTags = cardTagsValue ? cardTagsValue.toLowerCase().split(',') : [];
-            const cardText = card.textContent.toLowerCase();
-            
-            // Check if card matches all filters
-            const matchesCourse = !courseFilter || courseName.includes(courseFilter);
-            const matchesLocation = !locationFilter || locationAddress.includes(locationFilter);
-            const matchesYear = !yearFilter || courseYear === yearFilter;
-            const matchesTerm = !termFilter || courseTerm === termFilter;
-            const matchesProfessor = !professorFilter || professorName.includes(professorFilter);
-            const matchesTag = !tagFilter || cardTags.includes(tagFilter);
-            const matchesSearch = !searchQuery || cardText.includes(searchQuery);
-            
-            if (matchesCourse && matchesLocation && matchesYear && matchesTerm && matchesProfessor && matchesTag && matchesSearch) {
-                card.style.display = 'flex';
-                visibleCount++;
-            } else {
-                card.style.display = 'none';
-            }
+    const joinSessionsList = document.getElementById('joinSessionsList');
+    const loadMoreBtn = document.getElementById('loadMoreSessions');
+    const noResultsMessage = document.getElementById('noResultsMessage');
+    let nextCursor = loadMoreBtn ? loadMoreBtn.getAttribute('data-next-cursor') : '';
+    let requestCounter = 0;
+    
+    // Build the /api/sessions query from the filter panel and search bar
+    function buildSessionQuery(cursor) {
+        const params = new URLSearchParams({ html: '1' });
+        const filters = {
+            course: document.getElementById('filterCourse').value,
+            location: document.getElementById('filterLocation').value,
+            year: document.getElementById('filterYear').value,
+            term: document.getElementById('filterTerm').value,
+            professor: document.getElementById('filterProfessor').value,
+            tag: filterTag ? filterTag.value : '',
+            q: searchBar ? searchBar.value.trim() : ''
+        };
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value) params.set(key, value);
         });
-        
-        // Show/hide no results message
-        if (noResultsMessage) {
-            noResultsMessage.style.display = visibleCount === 0 ? 'block' : 'none';
+        if (cursor) params.set('cursor', cursor);
+        return params;
+    }
+    
+    function updatePager(cursor) {
+        nextCursor = cursor ? String(cursor) : '';
+        if (loadMoreBtn) {
+            loadMoreBtn.hidden = !nextCursor;
         }
     }
     
+    // Fetch one page of sessions; replace the list unless we are appending
+    function fetchSessions(cursor) {
+        const requestId = ++requestCounter;
+        return fetch(`/api/sessions?${buildSessionQuery(cursor).toString()}`)
+            .then(response => response.json())
+            .then(data => {
+                // Ignore responses that were overtaken by a newer filter change
+                if (requestId !== requestCounter) return;
+                
+                if (cursor) {
+                    joinSessionsList.insertAdjacentHTML('beforeend', data.html);
+                } else {
+                    joinSessionsList.innerHTML = data.html;
+                }
+                updatePager(data.next_cursor);
+                
+                if (noResultsMessage) {
+                    const visibleCount = joinSessionsList.querySelectorAll('.session_card').length;
+                    noResultsMessage.style.display = visibleCount === 0 ? 'block' : 'none';
+                }
+            })
+            .catch(error => {
+                console.error('Error loading sessions:', error);
+            });
+    }
+    
+    function applyFilters() {
+        if (joinSessionsList) {
+            fetchSessions(null);
+        }
+    }
+    
+    let searchTimer = null;
+    function scheduleSearch() {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(applyFilters, 250);
+    }
+    
     function clearFilters() {
         document.getElementById('filterCourse').value = '';
         document.getElementById('filterLocation').value = '';
@@ -136,9 +205,17 @@ document.addEventListener('DOMContentLoaded', function() {
         clearFiltersBtn.addEventListener('click', clearFilters);
     }
     
-    // Apply filters when search bar changes
+    // Apply filters when search bar changes (debounced to one request per pause)
     if (searchBar) {
-        searchBar.addEventListener('input', applyFilters);
+        searchBar.addEventListener('input', scheduleSearch);
+    }
+    
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', function() {
+            if (nextCursor) {
+                fetchSessions(nextCursor);
+            }
+        });
     }
     
     // Apply filters when any filter changes
@@ -146,4 +223,87 @@ document.addEventListener('DOMContentLoaded', function() {
     filterSelects.forEach(select => {
         select.addEventListener('change', applyFilters);
     });
+    
+    // Live updates: patch cards in place instead of reloading the dashboard
+    const mySessionsList = document.querySelector('.sessions-section .sessions-list');
+    
+    function cardsFor(sessionId) {
+        return document.querySelectorAll(`.session_card[data-session-id="${sessionId}"]`);
+    }
+    
+    function filtersActive() {
+        return Array.from(buildSessionQuery(null).keys()).some(key => key !== 'html');
+    }
+    
+    function insertCard(list, sessionId, section) {
+        fetch(`/sessions/${sessionId}/card?section=${section}`)
+            .then(response => response.ok ? response.text() : '')
+            .then(html => {
+                if (html && cardsFor(sessionId).length === 0) {
+                    list.insertAdjacentHTML('beforeend', html);
+                }
+            })
+            .catch(error => console.error('Error loading session card:', error));
+    }
+    
+    // My Sessions is not paged, so fetch every page before replacing it
+    function refreshMySessions() {
+        if (!mySessionsList) return;
+        let html = '';
+        function fetchPage(cursor) {
+            const params = new URLSearchParams({ scope: 'mine', html: '1', limit: '100' });
+            if (cursor) params.set('cursor', cursor);
+            return fetch(`/api/sessions?${params.toString()}`)
+                .then(response => response.json())
+                .then(data => {
+                    html += data.html;
+                    return data.next_cursor ? fetchPage(data.next_cursor) : null;
+                });
+        }
+        fetchPage(null)
+            .then(() => {
+                mySessionsList.innerHTML = html;
+            })
+            .catch(error => console.error('Error loading my sessions:', error));
+    }
+    
+    if (window.EventSource && joinSessionsList) {
+        const liveEvents = new EventSource('/events');
+        
+        liveEvents.addEventListener('attendees_changed', event => {
+            const data = JSON.parse(event.data);
+            const cards = Array.from(cardsFor(data.id));
+            // Joining as "You" moves the session to My Sessions, with its own card
+            if (data.scope === 'mine' && mySessionsList && !cards.some(card => mySessionsList.contains(card))) {
+                cards.forEach(card => card.remove());
+                insertCard(mySessionsList, data.id, 'my_sessions');
+                return;
+            }
+            cards.forEach(card => {
+                const attendees = card.querySelector('.attendees span');
+                if (attendees) attendees.textContent = data.attendees;
+            });
+        });
+        
+        liveEvents.addEventListener('session_left', event => {
+            const data = JSON.parse(event.data);
+            cardsFor(data.id).forEach(card => card.remove());
+        });
+        
+        liveEvents.addEventListener('session_created', event => {
+            const data = JSON.parse(event.data);
+            if (data.scope === 'mine' && mySessionsList) {
+                insertCard(mySessionsList, data.id, 'my_sessions');
+            } else if (data.scope === 'join' && !nextCursor && !filtersActive()) {
+                // New sessions sort last; with more pages or a filter, the list fetch shows them
+                insertCard(joinSessionsList, data.id, 'join_sessions');
+            }
+        });
+        
+        // Sent when this client missed events; reload the lists from scratch
+        liveEvents.addEventListener('resync', () => {
+            refreshMySessions();
+            applyFilters();
+        });
+    }
 });
@@ -0,0 +1,316 @@
+"""Fingerprinted, precompressed static assets.
+
+Build them (after every change to static/, before starting the app):
+
+    python -m static_assets
+
+Every file under static/ is written to STATIC_BUILD_DIR under a name
+carrying a hash of its contents (css/style.3f9a0c1d2e.css), next to
+gzip and brotli copies of text files, and large images get WebP and
+narrower variants. Stylesheets are rewritten to point at the hashed
+names, and rules that set one of those images as a background also
+offer the WebP and, on narrow screens, the narrower variants.
+manifest.json maps each source name to what was built from it.
+
+At runtime `static_url(filename)` (a template global) returns the hashed
+URL for a built file and the plain /static URL otherwise. Hashed URLs
+never change content, so they are served with `Cache-Control: immutable`
+and a repeat visit does not even revalidate them. Old builds are left in
+place, so pages rendered before a deploy keep working.
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+import tempfile
+
+from flask import abort, current_app, request, send_file, url_for
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:  # Optional; text assets are only gzipped without it
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # Optional; images get no WebP or resized variants without it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+IMAGE_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+# Images at least this large get variants, at each of these widths narrower
+# than the original
+IMAGE_VARIANT_MIN_BYTES = 100 * 1024
+IMAGE_WIDTHS = (640, 1280)
+WEBP_QUALITY = 80
+HASH_LENGTH = 10
+MANIFEST_NAME = 'manifest.json'
+# Suffixes of the precompressed copies, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+?)\1\s*\)""")
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_BACKGROUND = re.compile(r'(?<![-\w])(background(?:-image)?)\s*:\s*([^;]*url\([^;]*)')
+
+
+def build(source_dir, build_dir):
+    """Build every file under `source_dir` into `build_dir`; returns the manifest."""
+    names = []
+    for directory, _, files in os.walk(source_dir):
+        for file_name in files:
+            names.append(os.path.relpath(os.path.join(directory, file_name), source_dir).replace(os.sep, '/'))
+    # Stylesheets go last, so everything they refer to already has its hashed name
+    names.sort(key=lambda name: (name.endswith('.css'), name))
+
+    manifest = {}
+    for name in names:
+        with open(os.path.join(source_dir, name), 'rb') as source:
+            data = source.read()
+        if name.endswith('.css'):
+            data = _rewrite_css(name, data.decode('utf-8'), manifest).encode('utf-8')
+        entry = {'path': _write(build_dir, _hashed_name(name, data), data)}
+        if name.endswith(TEXT_EXTENSIONS):
+            encodings = _precompress(build_dir, entry['path'], data)
+            if encodings:
+                entry['encodings'] = encodings
+        extension = os.path.splitext(name)[1].lower()
+        if Image is not None and extension in IMAGE_FORMATS and len(data) >= IMAGE_VARIANT_MIN_BYTES:
+            entry['variants'] = _image_variants(build_dir, name, data)
+        manifest[name] = entry
+    if Image is None:
+        logger.warning("Pillow is not installed; images were copied without WebP or resized variants")
+
+    _write(build_dir, MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'), replace=True)
+    return manifest
+
+
+def _hashed_name(name, data):
+    root, extension = posixpath.splitext(name)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{extension}"
+
+
+def _write(build_dir, name, data, replace=False):
+    path = os.path.join(build_dir, name)
+    # Hashed names never change content, so an existing file is already right
+    if replace or not os.path.exists(path):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(data)
+            # mkstemp creates files readable by their owner only
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return name
+
+
+def _precompress(build_dir, name, data):
+    """Write the compressed copies of `name` that are smaller than it; returns their encodings."""
+    compressed = {'gzip': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        compressed['br'] = brotli.compress(data, quality=11)
+    encodings = []
+    for encoding, suffix in ENCODINGS:
+        if encoding in compressed and len(compressed[encoding]) < len(data):
+            _write(build_dir, name + suffix, compressed[encoding])
+            encodings.append(encoding)
+    return encodings
+
+
+def _image_variants(build_dir, name, data):
+    """WebP at full size, plus WebP and original-format copies at each narrower width."""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.getbands() else 'RGB')
+    width, height = image.size
+    root, extension = posixpath.splitext(name)
+    original_format = IMAGE_FORMATS[extension.lower()]
+    formats = [('image/webp', 'WEBP', '.webp', {'quality': WEBP_QUALITY, 'method': 6}),
+               (mimetypes.guess_type(name)[0], original_format, extension,
+                {'optimize': True} if original_format == 'PNG' else {'quality': 85, 'optimize': True})]
+    variants = []
+    for variant_width in [candidate for candidate in IMAGE_WIDTHS if candidate < width] + [width]:
+        if variant_width == width:
+            resized = image
+        else:
+            resized = image.resize((variant_width, round(height * variant_width / width)), Image.Resampling.LANCZOS)
+        for mimetype, image_format, variant_extension, options in formats:
+            if variant_width == width and image_format == original_format:
+                continue
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            variant = buffer.getvalue()
+            variants.append({
+                'path': _write(build_dir, _hashed_name(f"{root}-{variant_width}w{variant_extension}", variant), variant),
+                'type': mimetype,
+                'width': variant_width,
+            })
+    return variants
+
+
+def _rewrite_css(name, text, manifest):
+    text = _responsive_backgrounds(name, text, manifest)
+
+    def hashed(match):
+        entry = _referenced_entry(name, match.group(2), manifest)
+        if entry is None:
+            return match.group(0)
+        return f"url({match.group(1)}{_relative_url(name, entry['path'])}{match.group(1)})"
+    return _CSS_URL.sub(hashed, text)
+
+
+def _referenced_entry(name, reference, manifest):
+    if re.match(r'^([a-z][a-z0-9+.-]*:|/|#)', reference, re.I):
+        return None
+    target = posixpath.normpath(posixpath.join(posixpath.dirname(name), reference.split('?')[0].split('#')[0]))
+    return manifest.get(target)
+
+
+def _relative_url(name, path):
+    return posixpath.relpath(path, posixpath.dirname(name) or '.')
+
+
+def _top_level_rules(text):
+    """(start, end, selector, body) of each rule outside any at-rule block."""
+    depth = 0
+    rule_start = 0
+    for match in re.finditer(r'/\*.*?\*/|[{}]', text, re.S):
+        token = match.group()
+        if token == '{':
+            if depth == 0:
+                body_start = match.end()
+                selector = _CSS_COMMENT.sub('', text[rule_start:match.start()]).strip()
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                if not selector.startswith('@'):
+                    yield rule_start, match.end(), selector, text[body_start:match.start()]
+                rule_start = match.end()
+
+
+def _responsive_backgrounds(name, text, manifest):
+    """Offer the variants of background images set by rules outside at-rules:
+    a background-image with an image-set() preferring the WebP after the
+    original declaration, and a media query per narrower width after the rule."""
+    pieces = []
+    last = 0
+    for start, end, selector, body in _top_level_rules(text):
+        declarations = []
+        for match in _BACKGROUND.finditer(_CSS_COMMENT.sub('', body)):
+            url = _CSS_URL.search(match.group(2))
+            entry = _referenced_entry(name, url.group(2), manifest)
+            if entry and entry.get('variants'):
+                declarations.append(entry)
+        if not declarations:
+            continue
+        rule = text[start:end - 1].rstrip() + "\n"
+        for entry in declarations:
+            rule += f"    background-image: {_image_set(name, entry, None)};\n"
+        rule += "}"
+        widths = {variant['width'] for entry in declarations for variant in entry['variants']}
+        for width in sorted(widths, reverse=True)[1:]:
+            rule += f"\n\n@media (max-width: {width}px) {{\n    {selector} {{\n"
+            for entry in declarations:
+                rule += f"        background-image: {_image_set(name, entry, width)};\n"
+            rule += "    }\n}"
+        pieces += [text[last:start], rule]
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+def _image_set(name, entry, width):
+    """image-set() of the variants `width` pixels wide (the full size when
+    None), WebP first; the original image is the full-size fallback."""
+    full_width = max(variant['width'] for variant in entry['variants'])
+    options = [variant for variant in entry['variants'] if variant['width'] == (width or full_width)]
+    if width is None or width == full_width:
+        options.append({'path': entry['path'], 'type': mimetypes.guess_type(entry['path'])[0]})
+    options.sort(key=lambda option: option['type'] != 'image/webp')
+    return "image-set({})".format(", ".join(
+        f'url("{_relative_url(name, option["path"])}") type("{option["type"]}")' for option in options))
+
+
+class StaticAssets:
+    """The manifest of a static build, and URLs into it."""
+
+    def __init__(self, build_dir):
+        self.build_dir = build_dir
+        self.manifest = {}
+        # Built file -> precompressed encodings available for it
+        self.files = {}
+        try:
+            with open(os.path.join(build_dir, MANIFEST_NAME), encoding='utf-8') as saved:
+                self.manifest = json.load(saved)
+        except FileNotFoundError:
+            return
+        for entry in self.manifest.values():
+            self.files[entry['path']] = tuple(entry.get('encodings', ()))
+            for variant in entry.get('variants', ()):
+                self.files[variant['path']] = ()
+
+    def url(self, filename):
+        """The hashed URL of a built static file, else its plain /static URL."""
+        entry = self.manifest.get(filename)
+        # The debug server serves sources as they are edited, not the last build
+        if entry is None or current_app.debug:
+            return url_for('static', filename=filename)
+        return url_for('built_asset', filename=entry['path'])
+
+    def stats(self):
+        return {'manifest_entries': len(self.manifest), 'files': len(self.files)}
+
+
+def init_static_assets(app):
+    """Serve the static build at /assets/ and add the static_url() template global."""
+    assets = StaticAssets(app.config['STATIC_BUILD_DIR'])
+    app.extensions['static_assets'] = assets
+    app.jinja_env.globals['static_url'] = assets.url
+
+    @app.route("/assets/<path:filename>")
+    def built_asset(filename):
+        encodings = assets.files.get(filename)
+        if encodings is None:
+            abort(404)
+        path = safe_join(assets.build_dir, filename)
+        encoding = request.accept_encodings.best_match(encodings) if encodings else None
+        suffix = dict(ENCODINGS).get(encoding, '')
+        # Name the file as requested, not as the compressed copy sent
+        response = send_file(path + suffix, mimetype=mimetypes.guess_type(filename)[0], conditional=True,
+                             download_name=posixpath.basename(filename))
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        if encodings:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+
+def main():
+    from config import Config
+
+    logging.basicConfig(level=logging.INFO)
+    source_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    manifest = build(source_dir, Config.STATIC_BUILD_DIR)
+    json.dump({name: entry['path'] for name, entry in manifest.items()}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,969 @@
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from booking_index import BookingIndex, booking_interval
+from cow import CopyOnWrite
+from id_sequence import IdSequence
+from recommendations import SessionRecommender
+from search_index import SearchIndex
+from session_index import SessionQueryIndex
+from time_index import SessionTimeIndex
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot(CopyOnWrite):
+    """One immutable version of the store's data, plus its indexes.
+
+    Records are plain dicts (the same shapes as the fixture data) and are
+    never modified once published; a change replaces the record. Readers
+    use a snapshot without locking. Writers get a draft from
+    `begin_write()` (see DataStore.update), and every mutation goes through
+    a method here so the indexes never drift from the primary maps.
+    """
+
+    _cow_children = ('course_search', 'location_search', 'session_index', 'session_times', 'bookings', 'recommender')
+
+    def __init__(self):
+        self.sessions = {}
+        # Ordered id sets (dicts keep insertion order and give O(1) removal)
+        self.my_session_ids = {}
+        self.join_session_ids = {}
+
+        self.courses = {}
+        self.locations = {}
+        self.room_types = {}
+        self.tags = {}
+        self.resources = {}
+        self.reminders = {}
+
+        self.tag_ids_by_session = {}
+        self.resource_ids_by_session = {}
+        self.reminder_ids_by_session = {}
+        self.session_ids_by_course = {}
+        self.session_ids_by_location = {}
+        # Normalized natural keys (see course_key/location_key) -> id, for
+        # O(1) duplicate checks
+        self.course_ids_by_key = {}
+        self.location_ids_by_key = {}
+
+        self.course_search = SearchIndex(('title', 'section', 'professor_name'))
+        self.location_search = SearchIndex(('address', 'room_number'))
+        self.session_index = SessionQueryIndex()
+        # Start/end datetimes, parsed once when a session is written
+        self.session_times = SessionTimeIndex()
+        # Room bookings: per-location interval trees over session times
+        self.bookings = BookingIndex()
+        # Joinable sessions scored by their similarity to "My Sessions"
+        self.recommender = SessionRecommender()
+
+        # Global data version plus the version at which each entity (and each
+        # kind of entity) last changed
+        self.version = 0
+        self.entity_versions = {}
+        self.kind_versions = {}
+        # When this version was published (seconds since the epoch)
+        self.published_at = time.time()
+        # Identifies the bulk load this line of versions started from; versions
+        # restart from 0 when a process loads its data afresh
+        self.origin = None
+        # The shared database's data version this snapshot reflects, the same
+        # in every process; None unless the store is shared
+        self.database_version = None
+
+        # Mutations made in this draft, as (operation, payload) for Database.apply
+        self.changes = ()
+
+    def begin_write(self):
+        draft = super().begin_write()
+        draft.changes = []
+        return draft
+
+    def end_write(self):
+        super().end_write()
+        self.changes = ()
+        self.published_at = time.time()
+
+    def load(self, my_sessions=(), join_sessions=(), courses=(), locations=(), room_types=(),
+             tags=(), session_tags=(), resources=(), reminders=()):
+        self.origin = uuid.uuid4().hex
+        # Copy records so fixture modules are never mutated through the store
+        for course in courses:
+            self._index_course(dict(course))
+        for location in locations:
+            self._index_location(dict(location))
+        for room_type in room_types:
+            self._own('room_types')[room_type['id']] = dict(room_type)
+        for tag in tags:
+            self._own('tags')[tag['id']] = dict(tag)
+        for session in my_sessions:
+            self._index_session(dict(session), mine=True)
+        for session in join_sessions:
+            self._index_session(dict(session), mine=False)
+        for link in session_tags:
+            self._own_entry('tag_ids_by_session', link['session_id'], list).append(link['tag_id'])
+        for resource in resources:
+            self._index_resource(dict(resource))
+        for reminder in reminders:
+            self._index_reminder(dict(reminder))
+        for session in self.sessions.values():
+            self._index_session_facets(session)
+        self._own_child('session_times').load(
+            (session['id'], session.get('start_time'), session.get('end_time'), self._time_keys(session))
+            for session in self.sessions.values()
+        )
+        self._own_child('bookings').load(
+            (session['location_id'], session['id']) + interval
+            for session in self.sessions.values()
+            if session.get('location_id')
+            for interval in [booking_interval(*self.session_times.times(session['id']))]
+            if interval is not None
+        )
+        sessions = self.sessions
+        self._own_child('recommender').load(
+            ((session_id, self._session_features(sessions[session_id])) for session_id in self.join_session_ids),
+            ((session_id, self._session_features(sessions[session_id])) for session_id in self.my_session_ids),
+        )
+
+    # Versions
+
+    def entity_version(self, kind, entity_id):
+        return self.entity_versions.get((kind, entity_id), 0)
+
+    def kind_version(self, kind):
+        return self.kind_versions.get(kind, 0)
+
+    def session_versions(self, session):
+        """Versions of a session and of the course/location it displays."""
+        return (
+            self.entity_version('session', session['id']),
+            self.entity_version('course', session.get('course_id')),
+            self.entity_version('location', session.get('location_id')),
+        )
+
+    def _bump(self, kind, entity_id):
+        self.version += 1
+        self._own('entity_versions')[(kind, entity_id)] = self.version
+        self._own('kind_versions')[kind] = self.version
+
+    # Lookups
+
+    def get_session(self, session_id):
+        return self.sessions.get(session_id)
+
+    def get_course(self, course_id):
+        if not course_id:
+            return None
+        return self.courses.get(course_id)
+
+    def get_location(self, location_id):
+        if not location_id:
+            return None
+        return self.locations.get(location_id)
+
+    def get_room_type(self, room_type_id):
+        if not room_type_id:
+            return None
+        return self.room_types.get(room_type_id)
+
+    def get_resource(self, resource_id):
+        return self.resources.get(resource_id)
+
+    def get_tags(self, tag_ids):
+        if not tag_ids:
+            return []
+        tags = self.tags
+        return [tags[tag_id] for tag_id in tag_ids if tag_id in tags]
+
+    def tag_ids_for_session(self, session_id):
+        return list(self.tag_ids_by_session.get(session_id, ()))
+
+    def session_tag_ids(self, session):
+        return session.get('tag_ids') or self.tag_ids_for_session(session['id'])
+
+    def resources_for_session(self, session_id):
+        resources = self.resources
+        return [resources[resource_id] for resource_id in self.resource_ids_by_session.get(session_id, ())]
+
+    def reminders_for_session(self, session_id):
+        reminders = self.reminders
+        return [reminders[reminder_id] for reminder_id in self.reminder_ids_by_session.get(session_id, ())]
+
+    def find_course(self, course):
+        """The stored course with the same natural key as `course`, if any."""
+        return self.courses.get(self.course_ids_by_key.get(course_key(course)))
+
+    def find_location(self, location):
+        """The stored location with the same natural key as `location`, if any."""
+        return self.locations.get(self.location_ids_by_key.get(location_key(location)))
+
+    def search_courses(self, query, limit):
+        return self.course_search.search(query, limit)
+
+    def search_locations(self, query, limit):
+        return self.location_search.search(query, limit)
+
+    def query_sessions(self, filters=None, text=None, scope='join', cursor=None, limit=20, window=None):
+        """One page of matching sessions and the cursor for the next.
+
+        Pages are in id order, or with `window=(start, end)` (datetimes,
+        either may be None) in start-time order over the sessions starting
+        in that range. The cursor is the last session id, or in a window its
+        (start, session_id) position.
+        """
+        if window is not None:
+            matches = self.session_index.matcher(filters=filters, text=text, scope=scope)
+            session_ids = []
+            for session_id in self.session_times.window('all', window[0], window[1], after=cursor):
+                if matches(session_id):
+                    session_ids.append(session_id)
+                    if len(session_ids) > limit:
+                        break
+            next_cursor = None
+            if len(session_ids) > limit:
+                session_ids = session_ids[:limit]
+                next_cursor = (self.session_times.times(session_ids[-1])[0], session_ids[-1])
+        else:
+            session_ids, next_cursor = self.session_index.query(
+                filters=filters, text=text, scope=scope, cursor=cursor, limit=limit
+            )
+        sessions = self.sessions
+        return [sessions[session_id] for session_id in session_ids], next_cursor
+
+    def sessions_between(self, start=None, end=None, course_id=None, scope=None):
+        """Yield the sessions starting in [start, end) in start order, for one
+        course or scope ('mine'/'join') or all of them."""
+        key = ('course', course_id) if course_id is not None else ('scope', scope) if scope else 'all'
+        sessions = self.sessions
+        for session_id in self.session_times.window(key, start, end):
+            yield sessions[session_id]
+
+    def session_datetimes(self, session_id):
+        """Parsed (start, end) datetimes of a session; either may be None."""
+        return self.session_times.times(session_id)
+
+    def booking_conflicts(self, location_id, start, end, exclude=None):
+        """Sessions booked at a location that overlap [start, end), by start.
+
+        A missing or equal `end` counts as the default booking length.
+        """
+        interval = booking_interval(start, end)
+        if not location_id or interval is None:
+            return []
+        sessions = self.sessions
+        return [
+            sessions[session_id]
+            for _, _, session_id in self.bookings.overlapping(location_id, *interval)
+            if session_id != exclude
+        ]
+
+    def location_availability(self, location_id, start, end):
+        """The bookings overlapping [start, end) at a location, as (start, end,
+        session) in start order, and the free (start, end) gaps between them."""
+        sessions = self.sessions
+        booked = [
+            (booked_start, booked_end, sessions[session_id])
+            for booked_start, booked_end, session_id in self.bookings.overlapping(location_id, start, end)
+        ]
+        return booked, self.bookings.free_slots(location_id, start, end)
+
+    def recommended_sessions(self, limit):
+        """Joinable sessions most like the ones in "My Sessions", best first."""
+        sessions = self.sessions
+        return [sessions[session_id] for session_id, _ in self.recommender.recommend(limit)]
+
+    def sessions_for_course(self, course_id):
+        return [self.sessions[session_id] for session_id in self.session_ids_by_course.get(course_id, ())]
+
+    def sessions_for_location(self, location_id):
+        return [self.sessions[session_id] for session_id in self.session_ids_by_location.get(location_id, ())]
+
+    def my_sessions(self):
+        sessions = self.sessions
+        return [sessions[session_id] for session_id in self.my_session_ids]
+
+    def join_sessions(self):
+        sessions = self.sessions
+        return [sessions[session_id] for session_id in self.join_session_ids]
+
+    def all_courses(self):
+        return list(self.courses.values())
+
+    def all_locations(self):
+        return list(self.locations.values())
+
+    def all_room_types(self):
+        return list(self.room_types.values())
+
+    def all_tags(self):
+        return list(self.tags.values())
+
+    # Mutations (drafts only)
+
+    def add_session(self, session, tag_ids=()):
+        self._index_session(session, mine=True)
+        for tag_id in tag_ids:
+            self._own_entry('tag_ids_by_session', session['id'], list).append(tag_id)
+        self._index_session_facets(session)
+        self._index_session_times(session)
+        self._index_session_features(session)
+        self.changes.append(('add_session', (session, 'mine', list(tag_ids))))
+        self._bump('session', session['id'])
+        return session
+
+    def add_resource(self, resource):
+        self._index_resource(resource)
+        self._append_to_session(resource['session_id'], 'resource_ids', resource['id'])
+        self.changes.append(('add_resource', resource))
+        self._bump('session', resource['session_id'])
+        return resource
+
+    def add_reminder(self, reminder):
+        self._index_reminder(reminder)
+        self._append_to_session(reminder['session_id'], 'reminder_ids', reminder['id'])
+        self.changes.append(('add_reminder', reminder))
+        self._bump('session', reminder['session_id'])
+        return reminder
+
+    def add_course(self, course):
+        self._index_course(course)
+        self.changes.append(('add_course', course))
+        self._bump('course', course['id'])
+        return course
+
+    def add_location(self, location):
+        self._index_location(location)
+        self.changes.append(('add_location', location))
+        self._bump('location', location['id'])
+        return location
+
+    def add_courses(self, courses):
+        """Add each course whose natural key is not taken yet.
+
+        Returns a list parallel to `courses` holding the added record, or
+        None where the course duplicates a stored one or an earlier one in
+        the list.
+        """
+        added = []
+        for course in courses:
+            if self.find_course(course) is not None:
+                added.append(None)
+                continue
+            self._index_course(course)
+            self._bump('course', course['id'])
+            added.append(course)
+        new_courses = [course for course in added if course is not None]
+        if new_courses:
+            self.changes.append(('add_courses', new_courses))
+        return added
+
+    def add_locations(self, locations):
+        """Like add_courses, for locations."""
+        added = []
+        for location in locations:
+            if self.find_location(location) is not None:
+                added.append(None)
+                continue
+            self._index_location(location)
+            self._bump('location', location['id'])
+            added.append(location)
+        new_locations = [location for location in added if location is not None]
+        if new_locations:
+            self.changes.append(('add_locations', new_locations))
+        return added
+
+    def leave_session(self, session_id):
+        """Drop a session from "My Sessions"; returns the removed record or None."""
+        if session_id not in self.my_session_ids:
+            return None
+        del self._own('my_session_ids')[session_id]
+        session = self._own('sessions').pop(session_id)
+        for table_name, key in (('session_ids_by_course', session.get('course_id')),
+                                ('session_ids_by_location', session.get('location_id'))):
+            if key in getattr(self, table_name):
+                self._own_entry(table_name, key, dict).pop(session_id, None)
+        self._own_child('session_index').remove(session_id)
+        self._own_child('session_times').remove(session_id)
+        self._own_child('bookings').remove(session_id)
+        self._own_child('recommender').remove_from_profile(session_id)
+        self.changes.append(('leave_session', session_id))
+        self._bump('session', session_id)
+        return session
+
+    def join_session(self, session_id, attendee, waitlist=False, mine=False):
+        """Give `attendee` a seat in a session, or a waitlist place when it is full.
+
+        The seat check and the increment happen in the same draft, so a
+        session is never oversold however many joins are batched together.
+        Returns (outcome, session) with an outcome from `join_outcome`, or
+        (None, None) for an unknown session. With `mine`, a joined session
+        moves to "My Sessions".
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None, None
+        outcome = join_outcome(session, attendee, waitlist)
+        if outcome == 'joined':
+            session = dict(session)
+            session['attendees'] = seats_taken(session) + 1
+            attendee_list = session.get('attendee_list')
+            if isinstance(attendee_list, list):
+                session['attendee_list'] = attendee_list + [attendee]
+            elif isinstance(attendee_list, dict) and 'Confirmed' in attendee_list:
+                # Some sessions only carry a summary of their attendees
+                session['attendee_list'] = dict(attendee_list, Confirmed=session['attendees'])
+        elif outcome == 'waitlisted':
+            session = dict(session)
+            session['waitlist'] = list(session.get('waitlist', ())) + [attendee]
+        else:
+            return outcome, session
+        self._replace_session(session, mine=mine and outcome == 'joined')
+        return outcome, session
+
+    def mark_reminders_sent(self, reminder_ids):
+        """Flag reminders as sent; returns the ids that were still pending."""
+        marked = []
+        for reminder_id in reminder_ids:
+            reminder = self.reminders.get(reminder_id)
+            if reminder is None or reminder.get('reminder_sent'):
+                continue
+            self._own('reminders')[reminder_id] = dict(reminder, reminder_sent=True)
+            self._bump('session', reminder['session_id'])
+            marked.append(reminder_id)
+        if marked:
+            self.changes.append(('mark_reminders_sent', marked))
+        return marked
+
+    def replay(self, operation, payload):
+        """Redo a change another process made (an entry of its `changes`)."""
+        if operation == 'add_session':
+            session, _, tag_ids = payload
+            self.add_session(session, tag_ids)
+        elif operation == 'update_session':
+            session, scope = payload
+            self._replace_session(session, mine=scope == 'mine')
+        else:
+            getattr(self, operation)(payload)
+
+    def _replace_session(self, session, mine=False):
+        session_id = session['id']
+        self._own('sessions')[session_id] = session
+        if mine and session_id not in self.my_session_ids:
+            del self._own('join_session_ids')[session_id]
+            self._own('my_session_ids')[session_id] = None
+            self._index_session_facets(session)
+            self._index_session_times(session)
+            self._index_session_features(session)
+        scope = 'mine' if session_id in self.my_session_ids else 'join'
+        self.changes.append(('update_session', (session, scope)))
+        self._bump('session', session_id)
+
+    def _append_to_session(self, session_id, key, value):
+        session = self.sessions.get(session_id)
+        if session is not None:
+            # Published records are shared with readers, so replace rather than modify
+            session = dict(session)
+            session[key] = list(session.get(key, ())) + [value]
+            self._own('sessions')[session_id] = session
+
+    def _index_course(self, course):
+        self._own('courses')[course['id']] = course
+        self._own('course_ids_by_key').setdefault(course_key(course), course['id'])
+        self._own_child('course_search').add(course)
+
+    def _index_location(self, location):
+        self._own('locations')[location['id']] = location
+        self._own('location_ids_by_key').setdefault(location_key(location), location['id'])
+        self._own_child('location_search').add(location)
+
+    def _index_session(self, session, mine):
+        session_id = session['id']
+        self._own('sessions')[session_id] = session
+        self._own('my_session_ids' if mine else 'join_session_ids')[session_id] = None
+        if session.get('course_id'):
+            self._own_entry('session_ids_by_course', session['course_id'], dict)[session_id] = None
+        if session.get('location_id'):
+            self._own_entry('session_ids_by_location', session['location_id'], dict)[session_id] = None
+
+    def _index_session_facets(self, session):
+        course = self.get_course(session.get('course_id')) or {}
+        location = self.get_location(session.get('location_id')) or {}
+        tags = self.get_tags(self.session_tag_ids(session))
+        self._own_child('session_index').add(
+            session,
+            scope='mine' if session['id'] in self.my_session_ids else 'join',
+            facets={
+                'course': [course.get('title')],
+                'location': [location.get('address')],
+                'year': [course.get('year')],
+                'term': [course.get('term')],
+                'professor': [course.get('professor_name')],
+                'tag': [tag['tag_name'] for tag in tags],
+            },
+        )
+
+    def _time_keys(self, session):
+        keys = ['all', ('scope', 'mine' if session['id'] in self.my_session_ids else 'join')]
+        if session.get('course_id'):
+            keys.append(('course', session['course_id']))
+        return keys
+
+    def _index_session_times(self, session):
+        self._own_child('session_times').add(
+            session['id'], session.get('start_time'), session.get('end_time'), self._time_keys(session)
+        )
+        interval = booking_interval(*self.session_times.times(session['id']))
+        if session.get('location_id') and interval is not None:
+            self._own_child('bookings').add(session['location_id'], session['id'], *interval)
+
+    def _session_features(self, session):
+        """The (kind, value) features sessions are recommended by."""
+        course = self.get_course(session.get('course_id')) or {}
+        features = [('tag', tag_id) for tag_id in self.session_tag_ids(session)]
+        for kind, value in (('course', session.get('course_id')), ('professor', course.get('professor_name')),
+                            ('chill_level', session.get('chill_level')), ('room_type', session.get('room_type_id'))):
+            if value:
+                features.append((kind, value))
+        return list(dict.fromkeys(features))
+
+    def _index_session_features(self, session):
+        recommender = self._own_child('recommender')
+        features = self._session_features(session)
+        if session['id'] in self.my_session_ids:
+            recommender.remove_candidate(session['id'])
+            recommender.add_to_profile(session['id'], features)
+        else:
+            recommender.add_candidate(session['id'], features)
+
+    def _index_resource(self, resource):
+        self._own('resources')[resource['id']] = resource
+        self._own_entry('resource_ids_by_session', resource['session_id'], list).append(resource['id'])
+
+    def _index_reminder(self, reminder):
+        self._own('reminders')[reminder['id']] = reminder
+        self._own_entry('reminder_ids_by_session', reminder['session_id'], list).append(reminder['id'])
+
+
+def attendee_names(session):
+    """Names on a session's attendee list, without the "(Host)"-style suffixes."""
+    attendee_list = session.get('attendee_list')
+    if not isinstance(attendee_list, list):
+        return []
+    return [entry.split(' (', 1)[0] for entry in attendee_list]
+
+
+def seats_taken(session):
+    attendees = session.get('attendees')
+    if isinstance(attendees, int):
+        return attendees
+    attendee_list = session.get('attendee_list')
+    return len(attendee_list) if isinstance(attendee_list, list) else 0
+
+
+def join_outcome(session, attendee, waitlist=False):
+    """What joining `session` would do now: 'joined', 'waitlisted', 'full',
+    'already_joined' or 'already_waitlisted'.
+
+    Sessions without a `max_attendees` have no limit.
+    """
+    if attendee in attendee_names(session):
+        return 'already_joined'
+    if attendee in session.get('waitlist', ()):
+        return 'already_waitlisted'
+    capacity = session.get('max_attendees')
+    if capacity is None or seats_taken(session) < capacity:
+        return 'joined'
+    return 'waitlisted' if waitlist else 'full'
+
+
+def course_key(course):
+    """Natural key of a course offering: two with the same key are duplicates."""
+    return (course['title'].lower(), course['section'].lower(), course['year'], course['term'])
+
+
+def location_key(location):
+    return (location['address'].lower(), location['room_number'].lower())
+
+
+# Bump when Snapshot's attributes change, so old saved snapshots are rebuilt
+SNAPSHOT_FORMAT = 6
+
+
+class _PendingWrite:
+    __slots__ = ('apply', 'result', 'error', 'done')
+
+    def __init__(self, apply):
+        self.apply = apply
+        self.result = None
+        self.error = None
+        self.done = False
+
+
+class DataStore:
+    """Publishes Snapshots of the data and serializes writes to them.
+
+    `snapshot()` returns the current published version; it never changes,
+    so a request can read it (and templates can iterate it) without locks
+    and without ever seeing half of a write.
+
+    Writes are group-committed: each `update()` call queues its change,
+    and whichever writer gets the write lock applies everything queued so
+    far to a single draft, persists the batch in one transaction and
+    publishes the new version with one reference swap. A burst of creates
+    therefore costs one copy of each touched container and one publish.
+
+    A `shared` store is one of several worker processes' stores on the same
+    database, and its snapshots are a local read cache of it. `refresh()`
+    replays the batches other processes committed since (see
+    Database.changes_since), and a batch only commits on top of the
+    latest database version: when another process got there first, the
+    store catches up and redoes the batch, so checks such as free seats
+    and duplicate keys always see every worker's writes.
+    """
+
+    def __init__(self, database=None, shared=False):
+        # Optional durable backend (database.Database); mutations write through to it
+        self.database = database
+        self.shared = shared
+        # The database data version the published snapshot reflects (shared stores)
+        self.database_version = None
+        self.ids = IdSequence(allocator=database.allocate_ids if database else None)
+        self._current = Snapshot()
+        self._pending = deque()
+        self._write_lock = threading.Lock()
+        self._listeners = []
+
+    @classmethod
+    def from_fixtures(cls, seed_data=None):
+        store = cls()
+        store.load(**(seed_data or fixture_data)())
+        return store
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the store for an app: database-backed when persistence is on.
+
+        `SEED_DATA` may name a callable returning load() kwargs to use
+        instead of the fixtures (see benchmarks/synthetic_data.py). With
+        `DATA_SNAPSHOT_PATH` set, the built snapshot is saved there and
+        reused by later starts for as long as its source data is unchanged.
+        """
+        seed_data = config.get('SEED_DATA')
+        snapshot_path = config.get('DATA_SNAPSHOT_PATH')
+        shared = config.get('SHARED_STORE_ENABLED', False)
+        if shared and not config.get('PERSISTENCE_ENABLED'):
+            raise ValueError("SHARED_STORE_ENABLED needs PERSISTENCE_ENABLED")
+        if not config.get('PERSISTENCE_ENABLED'):
+            store = cls()
+            # Custom seed data has no cheap fingerprint, so only fixtures are saved
+            source = None if seed_data else ('fixtures', fixture_mtime())
+            if not store.restore_snapshot(snapshot_path, source):
+                store.load(**(seed_data or fixture_data)())
+                store.save_snapshot(snapshot_path, source)
+            return store
+
+        from database import Database, is_memory_uri
+
+        if shared and is_memory_uri(config['SQLALCHEMY_DATABASE_URI']):
+            raise ValueError("SHARED_STORE_ENABLED needs a database every worker can open, not an in-memory one")
+        database = Database(config['SQLALCHEMY_DATABASE_URI'], config.get('SQLALCHEMY_ENGINE_OPTIONS'),
+                            change_log_size=config.get('SHARED_STORE_LOG_SIZE', 1000))
+        database.create_all()
+        if database.is_empty():
+            database.seed(**(seed_data or fixture_data)())
+        store = cls(database=database, shared=shared)
+        version = database.data_version()
+        if not store.restore_snapshot(snapshot_path, ('database', database.uri, version)):
+            data, version = database.load_versioned()
+            store.load(**data)
+            store.save_snapshot(snapshot_path, ('database', database.uri, version))
+        store.database_version = version
+        if shared:
+            # Publish an empty batch so a new draft records the version; the
+            # published snapshot is read-only
+            store.update(lambda draft: None)
+        # Writes may have landed since a restored snapshot's version was read
+        store.refresh()
+        return store
+
+    def snapshot(self):
+        return self._current
+
+    def refresh(self):
+        """Catch up with the writes other processes committed to a shared database.
+
+        A no-op for a store that is not shared. Otherwise it costs one data
+        version query when there is nothing new; missed batches are
+        replayed from the change log (or, if the log no longer reaches
+        back far enough, everything is reloaded) and published as one
+        version, which listeners hear about like a local write.
+        """
+        if not self.shared or self.database.data_version() == self.database_version:
+            return
+        with self._write_lock:
+            self._catch_up()
+
+    def start_polling(self, interval):
+        """Refresh every `interval` seconds from a background thread, so
+        listeners follow other processes' writes while no requests come in."""
+        thread = threading.Thread(target=self._poll, args=(interval,), name='store-poller', daemon=True)
+        thread.start()
+        return thread
+
+    def _poll(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Catching up with the shared database failed")
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def load(self, **data):
+        """Bulk load records that are already stored (nothing is persisted)."""
+        with self._write_lock:
+            draft = self._current.begin_write()
+            draft.load(**data)
+            draft.end_write()
+            self._current = draft
+        self._seed_ids(draft)
+
+    def save_snapshot(self, path, source):
+        """Pickle the current snapshot to `path`, tagged with its `source` key."""
+        if not path or source is None:
+            return
+        payload = {'format': SNAPSHOT_FORMAT, 'source': source, 'snapshot': self._current}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as out, _deep_recursion():
+                pickle.dump(payload, out, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def restore_snapshot(self, path, source):
+        """Publish the snapshot saved at `path` if it was built from `source`; returns success."""
+        if not path or source is None or not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as saved, _deep_recursion():
+                payload = pickle.load(saved)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return False
+        if payload.get('format') != SNAPSHOT_FORMAT or payload.get('source') != source:
+            return False
+        with self._write_lock:
+            self._current = payload['snapshot']
+        self._seed_ids(self._current)
+        return True
+
+    def _seed_ids(self, data):
+        for entity, table in (('session', data.sessions), ('course', data.courses),
+                              ('location', data.locations), ('resource', data.resources),
+                              ('reminder', data.reminders)):
+            self.ids.seed(entity, max(table, default=0))
+
+    def add_listener(self, listener):
+        """Call `listener(snapshot, changes)` after each published batch of writes.
+
+        Listeners run while the write lock is held, so they must be quick.
+        """
+        self._listeners.append(listener)
+
+    def next_id(self, entity):
+        return self.ids.next_id(entity)
+
+    def reserve_ids(self, entity, count):
+        return self.ids.reserve(entity, count)
+
+    def update(self, apply):
+        """Run `apply(draft)` as part of the next published version; returns its result.
+
+        `apply` should only touch the draft, since a batch is replayed on a
+        fresh draft when one of its writes fails. It may raise to reject the
+        change; the exception is re-raised here and the rest of the batch is
+        unaffected.
+        """
+        write = _PendingWrite(apply)
+        self._pending.append(write)
+        with self._write_lock:
+            if not write.done:
+                self._commit_pending()
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def add_session(self, session, tag_ids=()):
+        return self.update(lambda draft: draft.add_session(session, tag_ids))
+
+    def add_resource(self, resource):
+        return self.update(lambda draft: draft.add_resource(resource))
+
+    def add_reminder(self, reminder):
+        return self.update(lambda draft: draft.add_reminder(reminder))
+
+    def add_course(self, course):
+        return self.update(lambda draft: draft.add_course(course))
+
+    def add_location(self, location):
+        return self.update(lambda draft: draft.add_location(location))
+
+    def add_courses(self, courses):
+        return self.update(lambda draft: draft.add_courses(courses))
+
+    def add_locations(self, locations):
+        return self.update(lambda draft: draft.add_locations(locations))
+
+    def leave_session(self, session_id):
+        return self.update(lambda draft: draft.leave_session(session_id))
+
+    def join_session(self, session_id, attendee, waitlist=False, mine=False):
+        return self.update(lambda draft: draft.join_session(session_id, attendee, waitlist, mine))
+
+    def mark_reminders_sent(self, reminder_ids):
+        return self.update(lambda draft: draft.mark_reminders_sent(reminder_ids))
+
+    def _commit_pending(self):
+        batch = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        self._commit(batch)
+        for write in batch:
+            write.done = True
+
+    def _commit(self, batch):
+        while True:
+            draft, applied = self._draft(batch)
+            if draft is None:
+                return
+            try:
+                if self.database is not None and \
+                        not self.database.apply(draft.changes, self.database_version if self.shared else None):
+                    # Another process committed first; redo the batch on top of its writes
+                    self._catch_up()
+                    continue
+            except Exception as error:
+                if len(applied) == 1:
+                    applied[0].result, applied[0].error = None, error
+                else:
+                    # Any one write may have broken the batch; commit each on its own so only it fails
+                    for write in applied:
+                        self._commit([write])
+                return
+            if self.shared and draft.changes:
+                self.database_version += 1
+            self._publish(draft)
+            return
+
+    def _draft(self, batch):
+        """Apply `batch` to a new draft; returns it and the writes that succeeded.
+
+        A write that raises keeps its error and is left out, and the rest
+        are redone on a fresh draft, since the failed one may have changed
+        part of it. The draft is None when every write failed.
+        """
+        applied = list(batch)
+        for write in applied:
+            write.result = write.error = None
+        while applied:
+            draft = self._current.begin_write()
+            for write in applied:
+                try:
+                    write.result = write.apply(draft)
+                except Exception as error:
+                    write.error = error
+                    applied.remove(write)
+                    break
+            else:
+                return draft, applied
+        return None, applied
+
+    def _catch_up(self):
+        """Replay what other processes committed since database_version; needs the write lock."""
+        batches = self.database.changes_since(self.database_version)
+        if batches is None:
+            data, version = self.database.load_versioned()
+            draft = Snapshot().begin_write()
+            draft.load(**data)
+            draft.database_version = version
+            draft.end_write()
+            self._current = draft
+            self.database_version = version
+            self._seed_ids(draft)
+            return
+        if not batches:
+            return
+        draft = self._current.begin_write()
+        for _, operations in batches:
+            for operation, payload in operations:
+                draft.replay(operation, payload)
+        self.database_version = batches[-1][0]
+        self._publish(draft)
+
+    def _publish(self, draft):
+        changes = draft.changes
+        if self.shared:
+            draft.database_version = self.database_version
+        draft.end_write()
+        self._current = draft
+        # Still under the write lock, so listeners see batches in publish order
+        for listener in self._listeners:
+            listener(draft, changes)
+
+
+@contextmanager
+def _deep_recursion():
+    # Trie nodes nest one level per character, deeper than pickle's default limit allows
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 20000))
+    try:
+        yield
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def fixture_mtime():
+    """Last modification time of the fixture modules, without importing them."""
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests')
+    return max(
+        (entry.stat().st_mtime for entry in os.scandir(directory) if entry.name.endswith('_data.py')),
+        default=0,
+    )
+
+
+def fixture_data():
+    """The hand-written sample data under tests/, in DataStore.load's shape."""
+    from tests.my_session_data import test_sessions as my_sessions
+    from tests.join_session_data import test_sessions as join_sessions
+    from tests.location_data import test_locations
+    from tests.course_offering_data import test_course_offerings
+    from tests.room_type_data import test_room_types
+    from tests.tag_data import test_tags, test_session_tags
+    from tests.resource_data import test_resources
+    from tests.reminder_data import test_reminders
+
+    return {
+        'my_sessions': my_sessions,
+        'join_sessions': join_sessions,
+        'courses': test_course_offerings,
+        'locations': test_locations,
+        'room_types': test_room_types,
+        'tags': test_tags,
+        'session_tags': test_session_tags,
+        'resources': test_resources,
+        'reminders': test_reminders,
+    }
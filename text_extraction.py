@@ -0,0 +1,125 @@
+"""Plain text from uploaded resources, for the resource search index.
+
+Text files are decoded as UTF-8 (falling back to Latin-1). PDFs go
+through pypdf when it is installed; otherwise the text-showing operators
+of the page content streams are read directly, which covers PDFs with
+simple (non-CID) fonts, the usual output of note-taking apps and office
+suites.
+"""
+import re
+import zlib
+
+try:
+    import pypdf
+except ImportError:  # Optional; PDFs fall back to the built-in reader
+    pypdf = None
+
+_STREAM = re.compile(rb'stream\r?\n')
+_END_STREAM = re.compile(rb'\r?\nendstream')
+# Literal strings (one level of nested parentheses), numbers (TJ spacing),
+# the text-showing operators Tj, TJ, ' and ", and the operators that move
+# to a new line
+_TEXT_TOKEN = re.compile(
+    rb'\((?:\\.|\((?:\\.|[^\\()])*\)|[^\\()])*\)|-?\d*\.?\d+|\]\s*TJ|\bT[j*]\b|\bT[dD]\b|\bET\b|\'|"', re.S
+)
+# A TJ adjustment wider than this (thousandths of an em) separates words
+_WORD_GAP = -200
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+_ESCAPE = re.compile(rb'\\([0-7]{1,3}|\r\n|.)', re.S)
+# Streams that hold images and fonts rather than page content
+_BINARY_STREAM = re.compile(rb'/Subtype\s*/Image|/FontFile|/Length1')
+
+
+def extract_text(path, content_type, max_chars):
+    """The text of the file at `path`, cut at `max_chars` characters."""
+    if content_type == 'application/pdf':
+        return _pdf_text(path, max_chars)
+    with open(path, 'rb') as source:
+        raw = source.read(max_chars * 4)
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError as error:
+        if error.start >= len(raw) - 3:
+            # The read stopped in the middle of a character
+            text = raw[:error.start].decode('utf-8')
+        else:
+            text = raw.decode('latin-1')
+    return text[:max_chars]
+
+
+def _pdf_text(path, max_chars):
+    if pypdf is not None:
+        parts, size = [], 0
+        for page in pypdf.PdfReader(path).pages:
+            text = page.extract_text() or ""
+            parts.append(text)
+            size += len(text)
+            if size >= max_chars:
+                break
+        return "\n".join(parts)[:max_chars]
+    with open(path, 'rb') as source:
+        data = source.read()
+    parts, size = [], 0
+    for content in _content_streams(data, max_chars * 8):
+        text = _shown_text(content)
+        parts.append(text)
+        size += len(text)
+        if size >= max_chars:
+            break
+    return "\n".join(parts)[:max_chars]
+
+
+def _content_streams(data, max_bytes):
+    position = 0
+    while True:
+        match = _STREAM.search(data, position)
+        if match is None:
+            return
+        end = _END_STREAM.search(data, match.end())
+        if end is None:
+            return
+        header = data[max(0, data.rfind(b'<<', 0, match.start()) - 256):match.start()]
+        body = data[match.end():end.start()]
+        position = end.end()
+        if _BINARY_STREAM.search(header):
+            continue
+        if b'/FlateDecode' in header:
+            try:
+                body = zlib.decompressobj().decompress(body, max_bytes)
+            except zlib.error:
+                continue
+        elif b'/Filter' in header:
+            continue
+        if b'BT' in body:
+            yield body
+
+
+def _shown_text(content):
+    pieces = []
+    pending = []
+    for match in _TEXT_TOKEN.finditer(content):
+        token = match.group()
+        if token.startswith(b'('):
+            pending.append(_unescape(token[1:-1]))
+        elif token[-1:].isdigit():
+            if pending and float(token) < _WORD_GAP:
+                pending.append(b" ")
+        elif token.endswith(b'TJ') or token in (b'Tj', b"'", b'"'):
+            # The strings of one operator form a run of text
+            pieces.append(b"".join(pending))
+            pending = []
+        else:
+            pending = []
+            pieces.append(b"\n")
+    return " ".join(piece.decode('latin-1') for piece in pieces if piece).replace(" \n ", "\n")
+
+
+def _unescape(value):
+    def replace(match):
+        escaped = match.group(1)
+        if escaped[:1].isdigit():
+            return bytes([int(escaped, 8) & 0xFF])
+        if escaped in (b'\r\n', b'\n', b'\r'):
+            return b""
+        return _ESCAPES.get(escaped, escaped)
+    return _ESCAPE.sub(replace, value)
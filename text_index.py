@@ -0,0 +1,230 @@
+import math
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from cow import CopyOnWrite
+from ranking import best_first, top_positions
+
+_WORD = re.compile(r"[^\W_]+")
+MAX_TERM_LENGTH = 40
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with".split()
+)
+CHUNK_SIZE = 4096
+# A posting packs (document ordinal, term count) into one unsigned 64-bit value
+_COUNT_BITS = 32
+_COUNT_MASK = (1 << _COUNT_BITS) - 1
+# A segment is merged into the one before it once that one holds at most
+# this many times its postings, which keeps O(log n) segments
+MERGE_FACTOR = 2
+# A pruned query looks up its remaining terms' postings by binary search
+# when they are this many times longer than the documents left to score
+PRUNE_RATIO = 8
+
+
+def tokenize(text):
+    """Lower-cased words of `text`, without stop words and one-letter words."""
+    return [
+        word for word in _WORD.findall(text.lower())
+        if 1 < len(word) <= MAX_TERM_LENGTH and word not in STOP_WORDS
+    ]
+
+
+class _Column:
+    """An append-only typed array kept as full, sealed chunks plus a short
+    tail. Copying it (once per copy-on-write batch) copies the tail but
+    shares the chunks, so growing a long column stays cheap."""
+    __slots__ = ('typecode', 'chunks', 'tail')
+
+    def __init__(self, typecode, chunks=(), tail=None):
+        self.typecode = typecode
+        self.chunks = chunks
+        self.tail = tail if tail is not None else array(typecode)
+
+    def __len__(self):
+        return len(self.chunks) * CHUNK_SIZE + len(self.tail)
+
+    def __getitem__(self, index):
+        chunk, offset = divmod(index, CHUNK_SIZE)
+        return self.chunks[chunk][offset] if chunk < len(self.chunks) else self.tail[offset]
+
+    def extend(self, values):
+        tail = self.tail
+        tail.extend(values)
+        if len(tail) >= CHUNK_SIZE:
+            # Full chunks are never modified again, so copies can share them
+            full = len(tail) - len(tail) % CHUNK_SIZE
+            self.chunks += tuple(tail[start:start + CHUNK_SIZE] for start in range(0, full, CHUNK_SIZE))
+            self.tail = tail[full:]
+
+    def copy(self):
+        # Slicing copies the tail's buffer in one go
+        return _Column(self.typecode, self.chunks, self.tail[:])
+
+    def values(self):
+        """The column as one NumPy array."""
+        parts = [np.frombuffer(chunk, dtype=self.typecode) for chunk in self.chunks]
+        if self.tail or not parts:
+            parts.append(np.frombuffer(self.tail, dtype=self.typecode))
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+class _Segment:
+    """Immutable postings of a run of documents: term -> packed postings."""
+    __slots__ = ('postings', 'size')
+
+    def __init__(self, postings, size):
+        self.postings = postings
+        self.size = size
+
+    def merge(self, newer):
+        postings = dict(self.postings)
+        for term, packed in newer.postings.items():
+            existing = postings.get(term)
+            postings[term] = packed if existing is None else existing + packed
+        return _Segment(postings, self.size + newer.size)
+
+
+class TextIndex(CopyOnWrite):
+    """Inverted index of document texts, ranked with Okapi BM25.
+
+    Documents get dense ordinals in the order they are added. Their
+    postings, packed (ordinal, term count) values, live in immutable
+    segments: each batch of added documents becomes a new segment, and a
+    segment is merged into the previous one once they are of similar
+    size, so there are O(log n) segments and each posting is rewritten
+    O(log n) times. A batch therefore costs about its own size however
+    large the index is, and published segments are shared by every later
+    version. A query gathers the postings of its terms from each segment
+    and scores them with a few NumPy operations, then picks the top
+    results with a partial sort.
+
+    Document lengths are a column indexed by ordinal. Documents are only
+    ever added: callers drop hits for records that no longer exist.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.segments = ()
+        self._doc_ids = _Column('q')
+        self._doc_lengths = _Column('I')
+        self.total_length = 0
+        self._norms = None
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def add(self, doc_id, terms):
+        """Index a document from its `terms` (a list of tokens, or a Counter)."""
+        self.add_many([(doc_id, terms)])
+
+    def add_many(self, documents):
+        """Index (doc_id, terms) pairs as one new segment."""
+        ordinal = len(self._doc_ids)
+        doc_ids, lengths = [], []
+        # term -> packed postings of this batch
+        batch = {}
+        size = 0
+        for doc_id, terms in documents:
+            counts = terms if isinstance(terms, Counter) else Counter(terms)
+            doc_ids.append(doc_id)
+            lengths.append(sum(counts.values()))
+            shifted = ordinal << _COUNT_BITS
+            ordinal += 1
+            size += len(counts)
+            for term, count in counts.items():
+                postings = batch.get(term)
+                if postings is None:
+                    batch[term] = [shifted | count]
+                else:
+                    postings.append(shifted | count)
+        if not doc_ids:
+            return
+        self._own('_doc_ids').extend(doc_ids)
+        self._own('_doc_lengths').extend(lengths)
+        self.total_length += sum(lengths)
+        self._norms = None
+        segments = list(self.segments)
+        segments.append(_Segment({term: array('Q', postings) for term, postings in batch.items()}, size))
+        while len(segments) > 1 and segments[-2].size <= MERGE_FACTOR * segments[-1].size:
+            newer = segments.pop()
+            segments[-1] = segments[-1].merge(newer)
+        self.segments = tuple(segments)
+
+    def search(self, query, limit):
+        """Up to `limit` (doc_id, score) pairs for the documents matching any
+        word of `query`, best first."""
+        document_count = len(self._doc_ids)
+        if not document_count or limit <= 0:
+            return []
+        norms = self._length_norms()
+        k1 = self.k1
+        terms = []
+        for term in dict.fromkeys(tokenize(query)):
+            parts = [segment.postings[term] for segment in self.segments if term in segment.postings]
+            if parts:
+                packed = np.concatenate([np.frombuffer(part, dtype=np.uint64) for part in parts])
+                frequency = len(packed)
+                idf = math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+                terms.append((idf, packed))
+        if not terms:
+            return []
+        if len(terms) == 1:
+            idf, packed = terms[0]
+            matched = (packed >> _COUNT_BITS).astype(np.intp)
+            counts = (packed & _COUNT_MASK).astype(np.float64)
+            scores = idf * (k1 + 1) * counts / (counts + norms[matched])
+        else:
+            matched, scores = self._sum_scores(terms, norms, limit)
+        top = best_first(matched, scores, top_positions(scores, limit))
+        doc_ids = self._doc_ids
+        return [(doc_ids[ordinal], float(score)) for ordinal, score in zip(matched[top].tolist(), scores[top].tolist())]
+
+    def _sum_scores(self, terms, norms, limit):
+        # Terms are scored most selective first. A term adds at most
+        # idf * (k1 + 1) to a score, so once the terms left could not lift a
+        # document that matched none of the terms so far above the current
+        # limit-th best score, the remaining terms only need to score the
+        # documents already matched (MaxScore pruning), looked up in their
+        # postings by binary search when that is cheaper than a full pass.
+        k1 = self.k1
+        terms.sort(key=lambda term: -term[0])
+        bound = sum(idf for idf, _ in terms) * (k1 + 1)
+        dense = np.zeros(len(norms))
+        candidates = None
+        for idf, packed in terms:
+            bound -= idf * (k1 + 1)
+            ordinals = (packed >> _COUNT_BITS).astype(np.intp)
+            if candidates is not None and len(candidates) * PRUNE_RATIO < len(ordinals):
+                # Postings are sorted by ordinal
+                positions = np.searchsorted(ordinals, candidates).clip(max=len(ordinals) - 1)
+                positions = positions[ordinals[positions] == candidates]
+                ordinals, packed = ordinals[positions], packed[positions]
+            scores = (packed & _COUNT_MASK).astype(np.float64)
+            denominators = norms[ordinals]
+            denominators += scores
+            scores *= idf * (k1 + 1)
+            scores /= denominators
+            # A document appears at most once in a term's postings, so its
+            # scores can be added in place
+            dense[ordinals] += scores
+            if candidates is None and bound:
+                floor = dense[top_positions(dense, limit)].min()
+                if bound < floor:
+                    candidates = np.flatnonzero(dense)
+        matched = np.flatnonzero(dense)
+        return matched, dense[matched]
+
+    def _length_norms(self):
+        # k1 * (1 - b + b * length / average length) for every document,
+        # computed once per published version
+        norms = self._norms
+        if norms is None:
+            lengths = self._doc_lengths.values()
+            average_length = self.total_length / len(lengths)
+            norms = self._norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        return norms
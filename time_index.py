@@ -0,0 +1,129 @@
+import bisect
+from datetime import datetime
+
+from cow import CopyOnWrite
+
+
+def parse_session_time(value):
+    """A naive local datetime from an ISO string (or datetime), or None."""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def format_window_cursor(position):
+    """The /api/sessions cursor for a (start, session_id) position in a time window."""
+    start, session_id = position
+    return f"{start.isoformat()}_{session_id}"
+
+
+def parse_window_cursor(value):
+    """The (start, session_id) position of a window cursor, or None if invalid."""
+    start, _, session_id = (value or '').rpartition('_')
+    start = parse_session_time(start)
+    if start is None or not session_id.isdigit():
+        return None
+    return start, int(session_id)
+
+
+class SessionTimeIndex(CopyOnWrite):
+    """Sessions ordered by start time, with their times parsed once.
+
+    Sessions are kept in sorted lists of (start, session_id) under a few
+    keys: 'all', ('scope', 'mine'|'join') and ('course', course_id). A
+    window query bisects to the first start in range and walks forward, so
+    it costs O(log n + k) for k results. Sessions without a parseable
+    start time are not listed, but their parsed end time (if any) is still
+    available from `times()`.
+
+    Updates are copy-on-write like SessionQueryIndex: a batch copies only
+    the lists it touches.
+    """
+
+    def __init__(self):
+        self._times = {}
+        self._keys_by_session = {}
+        self._ordered = {}
+
+    def __len__(self):
+        return len(self._keys_by_session)
+
+    def times(self, session_id):
+        """The parsed (start, end) of a session; either may be None."""
+        return self._times.get(session_id, (None, None))
+
+    def add(self, session_id, start_time, end_time, keys):
+        if session_id in self._times:
+            self.remove(session_id)
+        start = parse_session_time(start_time)
+        end = parse_session_time(end_time)
+        self._own('_times')[session_id] = (start, end)
+        if start is None:
+            return
+        entry = (start, session_id)
+        self._own('_keys_by_session')[session_id] = tuple(keys)
+        for key in keys:
+            bisect.insort(self._own_entry('_ordered', key, list), entry)
+
+    def load(self, sessions):
+        """Index many sessions at once: (session_id, start, end, keys) tuples."""
+        times = self._own('_times')
+        keys_by_session = self._own('_keys_by_session')
+        entries = []
+        for session_id, start_time, end_time, keys in sessions:
+            start = parse_session_time(start_time)
+            times[session_id] = (start, parse_session_time(end_time))
+            if start is not None:
+                keys_by_session[session_id] = keys = tuple(keys)
+                entries.append((start, session_id, keys))
+        # Sort once and deal the entries out in order, rather than sorting
+        # (or insorting into) every list
+        entries.sort()
+        lists = {}
+        unsorted = []
+        for start, session_id, keys in entries:
+            for key in keys:
+                ordered = lists.get(key)
+                if ordered is None:
+                    ordered = lists[key] = self._own_entry('_ordered', key, list)
+                    if ordered:
+                        # Entries from before this load; merge by sorting
+                        unsorted.append(ordered)
+                ordered.append((start, session_id))
+        for ordered in unsorted:
+            ordered.sort()
+
+    def remove(self, session_id):
+        start, _ = self._own('_times').pop(session_id, (None, None))
+        keys = self._own('_keys_by_session').pop(session_id, ())
+        entry = (start, session_id)
+        for key in keys:
+            ordered = self._own_entry('_ordered', key, list)
+            position = bisect.bisect_left(ordered, entry)
+            if position < len(ordered) and ordered[position] == entry:
+                del ordered[position]
+            if not ordered:
+                del self._ordered[key]
+
+    def window(self, key='all', start=None, end=None, after=None):
+        """Yield session ids under `key` starting in [start, end), in start order.
+
+        `after` is the (start, session_id) position of the last session of
+        a previous page; the walk resumes right after it, even if that
+        session has since been removed or moved.
+        """
+        ordered = self._ordered.get(key, ())
+        position = bisect.bisect_left(ordered, (start,)) if start is not None else 0
+        if after is not None:
+            position = max(position, bisect.bisect_right(ordered, after))
+        stop = bisect.bisect_left(ordered, (end,), lo=position) if end is not None else len(ordered)
+        for index in range(position, stop):
+            yield ordered[index][1]
+
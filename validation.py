@@ -0,0 +1,68 @@
+"""Validation of course and location records sent to the API.
+
+Each validator takes the decoded JSON for one record and returns
+`(fields, None)` with the cleaned fields on success, or `(None, message)`
+with the message the single-item endpoints answer 400 with. The bulk
+import endpoints apply the same rules to every row.
+"""
+
+COURSE_REQUIRED_FIELDS = ('title', 'section', 'year', 'term', 'professor_name')
+
+
+def validate_course(data):
+    if not isinstance(data, dict):
+        return None, 'Each course must be a JSON object'
+
+    # Validate required fields
+    for field in COURSE_REQUIRED_FIELDS:
+        if field not in data or not data[field]:
+            return None, f'{field.replace("_", " ").title()} is required'
+    for field in ('title', 'section', 'professor_name'):
+        if not isinstance(data[field], str):
+            return None, f'{field.replace("_", " ").capitalize()} must be text'
+
+    # Validate field lengths
+    if len(data['title']) > 100:
+        return None, 'Title must be 100 characters or less'
+    if len(data['section']) > 20:
+        return None, 'Section must be 20 characters or less'
+    if len(data['professor_name']) > 50:
+        return None, 'Professor name must be 50 characters or less'
+
+    # Validate year and term
+    try:
+        year = int(data['year'])
+        term = int(data['term'])
+    except (TypeError, ValueError):
+        return None, 'Invalid year or term'
+    if year < 2020 or year > 2100:
+        return None, 'Year must be between 2020 and 2100'
+    if term not in [1, 2, 3]:
+        return None, 'Term must be 1 (Fall), 2 (Spring), or 3 (Summer)'
+
+    return {
+        'title': data['title'],
+        'section': data['section'],
+        'year': year,
+        'term': term,
+        'professor_name': data['professor_name'],
+    }, None
+
+
+def validate_location(data):
+    if not isinstance(data, dict):
+        return None, 'Each location must be a JSON object'
+
+    # Validate required fields
+    if not data.get('address') or not data.get('room_number'):
+        return None, 'Address and room number are required'
+    if not isinstance(data['address'], str) or not isinstance(data['room_number'], str):
+        return None, 'Address and room number must be text'
+
+    # Validate field lengths
+    if len(data['address']) > 100:
+        return None, 'Address must be 100 characters or less'
+    if len(data['room_number']) > 20:
+        return None, 'Room number must be 20 characters or less'
+
+    return {'address': data['address'], 'room_number': data['room_number']}, None
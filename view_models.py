@@ -0,0 +1,99 @@
+from datetime import datetime
+
+INTENSITY_CLASSES = {"😎": "chill", "🤓": "moderate", "😤": "intense"}
+
+
+def format_datetime(dt):
+    # Remove leading zero from day component in a cross-platform safe way
+    formatted = dt.strftime("%B %d, %Y %I:%M %p")
+    return formatted.replace(" 0", " ").lstrip("0")
+
+
+def format_datetime_string(value):
+    if not value:
+        return None
+    try:
+        return format_datetime(datetime.fromisoformat(value))
+    except ValueError:
+        return value
+
+
+def format_session_times(session, times=None):
+    """Return the (start, end) display strings for a session record.
+
+    `times` are the session's already parsed (start, end) datetimes (see
+    Snapshot.session_datetimes); without them the ISO strings are parsed.
+    """
+    start, end = times or (None, None)
+    # Prefer explicit start/end times; fall back to generic time if needed
+    start_display = session.get('start_time')
+    end_display = session.get('end_time')
+    if start is not None:
+        start_display = format_datetime(start)
+    elif start_display and "T" in start_display:
+        start_display = format_datetime_string(start_display)
+    if end is not None:
+        end_display = format_datetime(end)
+    elif end_display and "T" in end_display:
+        end_display = format_datetime_string(end_display)
+
+    if not start_display:
+        start_display = session.get('time') or "TBD"
+    if not end_display:
+        end_display = session.get('end_time_display') or "TBD"
+    return start_display, end_display
+
+
+def build_session_views(store, sessions):
+    """Resolve everything a session card shows for a list of sessions.
+
+    Course, location, room type and tag names come straight from the
+    store's primary-key maps, so this is one pass over `sessions` and the
+    card template only formats fields.
+    """
+    courses = store.courses
+    locations = store.locations
+    room_types = store.room_types
+    tags = store.tags
+    tag_ids_by_session = store.tag_ids_by_session
+
+    views = []
+    for session in sessions:
+        course = courses.get(session.get('course_id')) or {}
+        location = locations.get(session.get('location_id')) or {}
+        tag_ids = session.get('tag_ids') or tag_ids_by_session.get(session['id'], ())
+        start_display, end_display = format_session_times(session, store.session_datetimes(session['id']))
+        title = session.get('title') or ""
+
+        views.append({
+            'id': session['id'],
+            'title': title,
+            'intensity': INTENSITY_CLASSES.get(title[:1], ""),
+            'location': session.get('location'),
+            'time': session.get('time'),
+            'attendees': session.get('attendees'),
+            'course_id': session.get('course_id') or "",
+            'location_id': session.get('location_id') or "",
+            'course_name': course.get('title', ""),
+            'course_year': course.get('year', ""),
+            'course_term': course.get('term', ""),
+            'professor_name': course.get('professor_name', ""),
+            'location_address': location.get('address', ""),
+            'room_type': room_types.get(session.get('room_type_id')),
+            'tag_names': [tags[tag_id]['tag_name'] for tag_id in tag_ids if tag_id in tags],
+            'start_display': start_display,
+            'end_display': end_display,
+        })
+    return views
+
+
+def build_filter_options(store):
+    """Distinct, sorted values for the dashboard filter panel."""
+    courses = store.courses.values()
+    return {
+        'course_titles': sorted({course['title'] for course in courses}),
+        'location_addresses': sorted({location['address'] for location in store.locations.values()}),
+        'tag_names': sorted(tag['tag_name'] for tag in store.tags.values()),
+        'years': sorted({course['year'] for course in courses}, reverse=True),
+        'professors': sorted({course['professor_name'] for course in courses}),
+    }